@@ -1,5 +1,36 @@
+import logging
+import os
+import time
 import requests
 
+import deadline
+import metrics
+import weather_transport
+from service_logging import get_station_logger
+from upstream_guard import UpstreamGuard, UpstreamUnavailable, CONCURRENCY_MAX
+from rate_limiter import RateLimiter
+from hedging import Hedger
+
+station_log = get_station_logger()
+
+# Circuit breaker and adaptive concurrency limit for every fetch in this process,
+# behind a token bucket shared with the other workers
+UPSTREAM_GUARD = UpstreamGuard(rate_limiter=RateLimiter())
+# Opt-in (UPSTREAM_HEDGE=1): duplicate calls still running at the observed p95. The guard
+# lets at most CONCURRENCY_MAX calls through at once, each a primary and possibly a hedge
+UPSTREAM_HEDGER = Hedger(max_workers=2 * int(CONCURRENCY_MAX))
+
+# Point at a local stand-in (see stub_weather_server.py) for load tests
+AVIATION_WEATHER_BASE_URL = os.environ.get("AVIATION_WEATHER_BASE_URL", "https://aviationweather.gov").rstrip("/")
+# Per-call timeout; shortened further when the request's deadline is closer
+UPSTREAM_TIMEOUT_SECONDS = 10
+
+def _upstream_failed(response, error):
+    """Outcomes that say the upstream itself is struggling, as opposed to a bad station"""
+    if error is not None:
+        return isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+    return response.status_code >= 500 or response.status_code == 429
+
 def get_metar_data(airport_id, format_type="raw"):
     """
     Fetch METAR data for a given airport ID.
@@ -9,41 +40,131 @@ def get_metar_data(airport_id, format_type="raw"):
         format_type (str): The format of the data ("raw" or "json")
     
     Returns:
-        str: The METAR data in the specified format
+        str: The METAR data in the specified format; empty when the station has
+        no current report, "Error fetching data: ..." when the fetch failed
+    
+    Raises:
+        UpstreamUnavailable: The circuit breaker is open or no concurrency slot
+            freed up in time; nothing was sent upstream
+        DeadlineExceeded: The request's deadline ran out before an answer came back
     """
-    URL = "https://aviationweather.gov/api/data/metar"
+    URL = f"{AVIATION_WEATHER_BASE_URL}/api/data/metar"
     
     PARAMS = {
         "ids": airport_id,
         "format": format_type
     }
     
+    timeout, truncated = deadline.clamp(UPSTREAM_TIMEOUT_SECONDS)
+    
+    def is_failure(response, error):
+        # A timeout we imposed for the request's deadline says nothing about upstream health
+        if truncated and isinstance(error, requests.exceptions.Timeout):
+            return False
+        return _upstream_failed(response, error)
+    
+    started = time.perf_counter()
+    status = "error"
     try:
-        print(f"   🌐 Fetching from: {URL}?ids={airport_id}&format={format_type}")
-        r = requests.get(url=URL, params=PARAMS, timeout=10)
+        station_log.debug("Fetching METAR", extra={'station': airport_id, 'url': URL, 'format': format_type})
+        # Hedged inside the guard, so the hedge delay counts only time spent upstream, not queueing
+        r = UPSTREAM_GUARD.call(UPSTREAM_HEDGER.hedged(weather_transport.get), URL,
+                                params=PARAMS, timeout=timeout, is_failure=is_failure)
+        status = r.status_code
         r.raise_for_status()  # Raises an HTTPError for bad responses
         
         response_text = r.text.strip()
-        print(f"   📡 Response length: {len(response_text)} characters")
         
-        # Check if we got a valid response
+        # An empty answer means the station has no current METAR, which isn't an upstream error
         if not response_text:
-            return f"Error fetching data: No data returned from aviationweather.gov for {airport_id}"
+            station_log.debug("No METAR returned", extra={'station': airport_id})
+            return ""
         
         # Log first 100 characters of response for debugging
-        preview = response_text[:100] + "..." if len(response_text) > 100 else response_text
-        print(f"   📄 Response preview: {preview}")
+        if station_log.isEnabledFor(logging.DEBUG):
+            preview = response_text[:100] + "..." if len(response_text) > 100 else response_text
+            station_log.debug("METAR response", extra={'station': airport_id, 'length': len(response_text),
+                                                       'preview': preview})
         
         return response_text
         
+    except UpstreamUnavailable:
+        status = "rejected"
+        raise
+    except deadline.DeadlineExceeded:
+        status = "deadline"
+        raise
     except requests.exceptions.Timeout:
+        if truncated:
+            status = "deadline"
+            raise deadline.DeadlineExceeded() from None
+        status = "timeout"
         return f"Error fetching data: Request timeout for {airport_id}"
     except requests.exceptions.ConnectionError:
+        status = "connection_error"
         return f"Error fetching data: Connection error - unable to reach aviationweather.gov for {airport_id}"
     except requests.exceptions.HTTPError as e:
         return f"Error fetching data: HTTP {e.response.status_code} error for {airport_id}"
     except requests.exceptions.RequestException as e:
         return f"Error fetching data: {e} for {airport_id}"
+    finally:
+        metrics.observe_upstream(airport_id, status, time.perf_counter() - started)
+
+def split_reports(response_text):
+    """
+    Split a multi-station raw response into one report per station.
+
+    Returns:
+        dict: ICAO -> first (most recent) report line for that station
+    """
+    reports = {}
+    for line in response_text.splitlines():
+        tokens = line.split()
+        while tokens and tokens[0] in ('METAR', 'SPECI', 'COR'):
+            tokens = tokens[1:]
+        if tokens:
+            reports.setdefault(tokens[0].upper(), line.strip())
+    return reports
+
+def get_metar_bulk(airport_ids):
+    """
+    Fetch raw METARs for several airports in one upstream request (ids=A,B,C).
+
+    Args:
+        airport_ids (list): ICAO codes; keep batches to a few dozen so the URL stays short
+
+    Returns:
+        dict: ICAO -> raw METAR for the stations that reported; empty when the
+        request failed (the per-station path reports the details)
+
+    Raises:
+        UpstreamUnavailable: The circuit breaker is open or the rate limiter
+            had no token for this caller's priority
+    """
+    URL = f"{AVIATION_WEATHER_BASE_URL}/api/data/metar"
+    PARAMS = {
+        "ids": ",".join(airport_ids),
+        "format": "raw"
+    }
+
+    started = time.perf_counter()
+    status = "error"
+    try:
+        r = UPSTREAM_GUARD.call(weather_transport.get, URL, params=PARAMS,
+                                timeout=UPSTREAM_TIMEOUT_SECONDS, is_failure=_upstream_failed)
+        status = r.status_code
+        r.raise_for_status()
+        return split_reports(r.text)
+    except UpstreamUnavailable:
+        status = "rejected"
+        raise
+    except requests.exceptions.RequestException as e:
+        if isinstance(e, requests.exceptions.Timeout):
+            status = "timeout"
+        station_log.info("Bulk METAR fetch failed", extra={'stations': len(airport_ids), 'error': str(e)})
+        return {}
+    finally:
+        metrics.observe_upstream('bulk', status, time.perf_counter() - started)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,362 @@
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from metar_parse import parse_metar_string
+from sigmet_domestic_parse import parse_sigmet
+from sigc_parser import parse_sigc
+from airmet_parser import parse_airmet
+from pirep_parser import parse_pirep
+from briefing_records import RoutePoint
+import route_weather_service
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'bench_corpus')
+AIRPORT_DB_SIZES = (250, 10000, 70000)
+# A component regresses when its p50 grows (or throughput drops) by more than this fraction
+DEFAULT_REGRESSION_THRESHOLD = 0.20
+
+# Continental US, where the real airport table and recorded corpora live
+LAT_RANGE = (25.0, 49.0)
+LNG_RANGE = (-124.0, -67.0)
+
+
+def load_recorded_corpus(name):
+    """Load a recorded message corpus from bench_corpus/<name>.txt, one message per line"""
+    with open(os.path.join(CORPUS_DIR, f'{name}.txt'), 'r') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def generate_metars(rng, count):
+    """Generate plausible METAR strings covering the usual groups"""
+    covers = ['FEW', 'SCT', 'BKN', 'OVC']
+    weather = ['', '-RA ', 'RA BR ', '+TSRA ', '-SN ', 'HZ ', 'FG ']
+    metars = []
+    for _ in range(count):
+        station = 'K' + ''.join(rng.choice(string.ascii_uppercase) for _ in range(3))
+        wind = f"{rng.randrange(0, 360, 10):03d}{rng.randint(0, 35):02d}"
+        if rng.random() < 0.2:
+            wind += f"G{rng.randint(20, 50)}"
+        clouds = " ".join(f"{rng.choice(covers)}{rng.randint(3, 250):03d}" for _ in range(rng.randint(0, 3))) or "CLR"
+        temp = rng.randint(-20, 40)
+        dew = temp - rng.randint(0, 15)
+        fmt = lambda t: f"M{abs(t):02d}" if t < 0 else f"{t:02d}"
+        metars.append(
+            f"{station} {rng.randint(1, 28):02d}{rng.randint(0, 23):02d}53Z {wind}KT "
+            f"{rng.choice([1, 3, 5, 10])}SM {rng.choice(weather)}{clouds} {fmt(temp)}/{fmt(dew)} "
+            f"A{rng.randint(2900, 3080)}"
+        )
+    return metars
+
+
+def generate_pireps(rng, count):
+    """Generate PIREPs with turbulence, icing, sky and temperature groups"""
+    stations = ['DEN', 'ORD', 'LAX', 'ATL', 'DFW', 'JFK', 'SEA', 'BOS']
+    intensities = ['NEG', 'LGT', 'LGT-MOD', 'MOD', 'MOD-SEV', 'SEV', 'EXTRM']
+    pireps = []
+    for _ in range(count):
+        pireps.append(
+            f"{rng.choice(stations)} {rng.choice(['UA', 'UUA'])} /OV {rng.choice(stations)}"
+            f"{rng.randint(0, 359):03d}{rng.randint(0, 99):03d}/TM {rng.randint(0, 23):02d}{rng.randint(0, 59):02d}"
+            f"/FL{rng.randint(20, 410):03d}/TP B737/SK BKN{rng.randint(10, 90):03d}-TOP{rng.randint(91, 150):03d}"
+            f"/TA M{rng.randint(0, 40):02d}/TB {rng.choice(intensities)}/IC {rng.choice(intensities)} RIME"
+        )
+    return pireps
+
+
+def generate_sigmets(rng, count):
+    """Generate domestic SIGMETs by varying the recorded ones"""
+    templates = load_recorded_corpus('sigmet')
+    return [_shift_valid_times(rng, rng.choice(templates)) for _ in range(count)]
+
+
+def generate_sigcs(rng, count):
+    """Generate convective SIGMETs by varying the recorded ones"""
+    templates = load_recorded_corpus('sigc')
+    return [_shift_valid_times(rng, rng.choice(templates)) for _ in range(count)]
+
+
+def generate_airmets(rng, count):
+    """Generate AIRMETs by varying the recorded ones"""
+    templates = load_recorded_corpus('airmet')
+    return [_shift_valid_times(rng, rng.choice(templates)) for _ in range(count)]
+
+
+def _shift_valid_times(rng, message):
+    day = rng.randint(1, 28)
+    hour = rng.randint(0, 19)
+    valid = f"VALID {day:02d}{hour:02d}00/{day:02d}{hour + 4:02d}00"
+    start = message.find('VALID ')
+    if start < 0:
+        return message
+    return message[:start] + valid + message[start + len(valid):]
+
+
+def generate_airport_database(rng, size):
+    """
+    Build a synthetic airport database with the same shape as airports.json.
+
+    Args:
+        rng (random.Random): Seeded generator
+        size (int): Number of airports
+
+    Returns:
+        dict: ICAO -> {'name', 'lat', 'lng'}
+    """
+    database = {}
+    while len(database) < size:
+        # 'K' alone only gives 46,656 codes, not enough for the 70k table
+        icao = rng.choice('KCMP') + ''.join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(3))
+        if icao in database:
+            continue
+        database[icao] = {
+            'name': f'{icao} Airport',
+            'lat': round(rng.uniform(*LAT_RANGE), 4),
+            'lng': round(rng.uniform(*LNG_RANGE), 4)
+        }
+    return database
+
+
+def generate_routes(rng, database, count):
+    """Pick random departure/destination pairs as route points"""
+    icaos = list(database)
+    routes = []
+    for _ in range(count):
+        start, end = rng.sample(icaos, 2)
+        routes.append(tuple(
+            RoutePoint(icao, database[icao]['name'], database[icao]['lat'], database[icao]['lng'], kind)
+            for icao, kind in ((start, 'departure'), (end, 'destination'))
+        ))
+    return routes
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure(func, inputs, min_seconds=0.5):
+    """
+    Time func over the inputs, cycling until min_seconds has elapsed.
+
+    Returns:
+        dict: ops, throughput per second and p50/p99 latency in microseconds
+    """
+    latencies = []
+    started = time.perf_counter()
+    while True:
+        for item in inputs:
+            t0 = time.perf_counter_ns()
+            func(item)
+            latencies.append(time.perf_counter_ns() - t0)
+        if time.perf_counter() - started >= min_seconds:
+            break
+    total = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'ops': len(latencies),
+        'throughput_per_sec': round(len(latencies) / total, 1),
+        'p50_us': round(percentile(latencies, 50) / 1000, 1),
+        'p99_us': round(percentile(latencies, 99) / 1000, 1),
+    }
+
+
+def run_suite(seed=42, corpus_size=500, route_count=20, min_seconds=0.5, db_sizes=AIRPORT_DB_SIZES):
+    """
+    Run every benchmark component offline.
+
+    Returns:
+        dict: component name -> measurement
+    """
+    rng = random.Random(seed)
+    corpora = {
+        'parse_metar_string': (parse_metar_string, load_recorded_corpus('metar') + generate_metars(rng, corpus_size)),
+        'parse_sigmet': (parse_sigmet, load_recorded_corpus('sigmet') + generate_sigmets(rng, corpus_size)),
+        'parse_sigc': (parse_sigc, load_recorded_corpus('sigc') + generate_sigcs(rng, corpus_size)),
+        'parse_airmet': (parse_airmet, load_recorded_corpus('airmet') + generate_airmets(rng, corpus_size)),
+        'parse_pirep': (_parse_pirep_lenient, load_recorded_corpus('pirep') + generate_pireps(rng, corpus_size)),
+    }
+
+    results = {}
+    for name, (func, inputs) in corpora.items():
+        print(f"⏱️  {name} ({len(inputs)} messages)...", file=sys.stderr)
+        results[name] = measure(func, inputs, min_seconds)
+
+    original_database = route_weather_service.AIRPORT_DATABASE
+    try:
+        for size in db_sizes:
+            database = generate_airport_database(rng, size)
+            routes = generate_routes(rng, database, route_count)
+            route_weather_service.AIRPORT_DATABASE = database
+            name = f'find_airports_along_route[{size}]'
+            print(f"⏱️  {name} ({len(routes)} routes)...", file=sys.stderr)
+            results[name] = measure(lambda route: route_weather_service.find_airports_along_route(*route),
+                                    routes, min_seconds)
+    finally:
+        route_weather_service.AIRPORT_DATABASE = original_database
+
+    return results
+
+
+def build_briefings(routes, metars, concurrency):
+    """Corridor airports and weather entries for `concurrency` briefings, as a request holds them"""
+    briefings = []
+    for i in range(concurrency):
+        complete_route = route_weather_service.generate_complete_route_with_intermediates(list(routes[i % len(routes)]))
+        weather_data = {point.icao: route_weather_service.build_weather_entry(point.icao, metars[(i + j) % len(metars)])
+                        for j, point in enumerate(complete_route)}
+        briefings.append((complete_route, weather_data))
+    return briefings
+
+
+def as_dicts(briefings):
+    """The same briefings with every record as the dict it serializes to"""
+    return [([point.to_dict() for point in complete_route],
+             {icao: entry.to_dict() for icao, entry in weather_data.items()})
+            for complete_route, weather_data in briefings]
+
+
+def profile_memory(seed=42, concurrency=200, route_count=20, db_size=2000, top=5):
+    """
+    Memory held by `concurrency` in-flight briefings (route points, corridor
+    airports and weather entries), measured with tracemalloc, once as
+    records and once converted to plain dicts.
+
+    Returns:
+        dict: representation -> bytes and allocated blocks per briefing,
+        plus the top allocation sites for the records
+    """
+    rng = random.Random(seed)
+    database = generate_airport_database(rng, db_size)
+    routes = generate_routes(rng, database, route_count)
+    metars = load_recorded_corpus('metar')
+
+    original_database = route_weather_service.AIRPORT_DATABASE
+    route_weather_service.AIRPORT_DATABASE = database
+    try:
+        # Warm up once so lazily created module state isn't counted against the first representation
+        build_briefings(routes, metars, 1)
+        results = {}
+        for name, convert in (('records', None), ('dicts', as_dicts)):
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            briefings = build_briefings(routes, metars, concurrency)
+            if convert is not None:
+                briefings = convert(briefings)
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # parsed_metar is shared by both representations; only the containers differ
+            stats = after.compare_to(before, 'lineno')
+            held = sum(stat.size_diff for stat in stats)
+            blocks = sum(stat.count_diff for stat in stats)
+            results[name] = {
+                'held_bytes_per_briefing': round(held / concurrency),
+                'blocks_per_briefing': round(blocks / concurrency, 1),
+                'peak_kib': round(peak / 1024, 1),
+            }
+            if convert is None:
+                results[name]['top_sites'] = [
+                    (f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                     round(stat.size_diff / concurrency))
+                    for stat in stats[:top]
+                ]
+            del briefings
+    finally:
+        route_weather_service.AIRPORT_DATABASE = original_database
+    return results
+
+
+def print_memory(results, concurrency):
+    print(f"\nmemory held by {concurrency} concurrent briefings (tracemalloc)")
+    print(f"{'representation':<16} {'bytes/briefing':>16} {'blocks/briefing':>16} {'peak (KiB)':>12}")
+    for name, r in results.items():
+        print(f"{name:<16} {r['held_bytes_per_briefing']:>16} {r['blocks_per_briefing']:>16} {r['peak_kib']:>12}")
+    print("top allocation sites (records, bytes/briefing):")
+    for site, size in results['records']['top_sites']:
+        print(f"   {site:<40} {size:>10}")
+
+
+def _parse_pirep_lenient(pirep_str):
+    # The recorded corpus keeps a few malformed reports on purpose
+    try:
+        return parse_pirep(pirep_str)
+    except ValueError:
+        return None
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """
+    Compare results to a stored baseline.
+
+    Returns:
+        list: (component, reason) for every regression found
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        if previous['p50_us'] and current['p50_us'] > previous['p50_us'] * (1 + threshold):
+            regressions.append((name, f"p50 {previous['p50_us']}us -> {current['p50_us']}us"))
+        if previous['p99_us'] and current['p99_us'] > previous['p99_us'] * (1 + threshold * 2):
+            regressions.append((name, f"p99 {previous['p99_us']}us -> {current['p99_us']}us"))
+        if current['throughput_per_sec'] < previous['throughput_per_sec'] * (1 - threshold):
+            regressions.append((name, f"throughput {previous['throughput_per_sec']}/s -> {current['throughput_per_sec']}/s"))
+    return regressions
+
+
+def print_results(results):
+    print(f"{'component':<36} {'ops':>8} {'ops/sec':>12} {'p50 (us)':>12} {'p99 (us)':>12}")
+    for name, r in results.items():
+        print(f"{name:<36} {r['ops']:>8} {r['throughput_per_sec']:>12} {r['p50_us']:>12} {r['p99_us']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline parser and geometry benchmarks")
+    parser.add_argument("--save", help="Write results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="Compare against a JSON baseline and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--corpus-size", type=int, default=500, help="Generated messages per parser")
+    parser.add_argument("--routes", type=int, default=20, help="Random routes per airport database")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="Minimum run time per component")
+    parser.add_argument("--db-sizes", default=",".join(str(s) for s in AIRPORT_DB_SIZES))
+    parser.add_argument("--memory", type=int, metavar="CONCURRENCY", default=0,
+                        help="Also profile memory held by this many concurrent briefings")
+    args = parser.parse_args()
+
+    results = run_suite(seed=args.seed, corpus_size=args.corpus_size, route_count=args.routes,
+                        min_seconds=args.min_seconds,
+                        db_sizes=[int(s) for s in args.db_sizes.split(",") if s])
+    print_results(results)
+    if args.memory:
+        print_memory(profile_memory(seed=args.seed, concurrency=args.memory, route_count=args.routes), args.memory)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'created_at': datetime.now().isoformat(), 'python': sys.version.split()[0],
+                       'seed': args.seed, 'results': results}, f, indent=2)
+        print(f"💾 Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {args.compare}:")
+            for name, reason in regressions:
+                print(f"   - {name}: {reason}")
+            sys.exit(1)
+        print(f"\n✅ No regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
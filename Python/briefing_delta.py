@@ -0,0 +1,110 @@
+import hashlib
+import os
+
+from response_encoding import dumps
+from station_events import report_digest
+
+# How long a briefing token can be used for a delta refresh
+BRIEFING_TOKEN_TTL = float(os.environ.get("BRIEFING_TOKEN_TTL", "3600"))
+# Sent in every delta: cheap and always different
+ALWAYS_SENT = ('status', 'received_at')
+# Top-level fields that aren't compared as sections
+_NOT_SECTIONS = ALWAYS_SENT + ('weather_data', 'versions', 'briefing_token')
+
+
+def _digest(data):
+    return hashlib.blake2b(data if isinstance(data, bytes) else data.encode(), digest_size=8).hexdigest()
+
+
+def entry_version(entry):
+    """
+    Version of one weather_data entry (a WeatherEntry). Only what a client would display
+    counts: the report text, or the kind of error. Fetch time, the cached
+    flag and the like don't.
+    """
+    if entry.status == 'success':
+        return report_digest(entry.metar) + ('s' if entry.stale else '')
+    return _digest(f"{entry.status}:{entry.error_type}")
+
+
+def section_digest(value):
+    return _digest(dumps(value, sort_keys=True))
+
+
+def briefing_versions(response_data):
+    """{'stations': {icao: version}, 'sections': {field: digest}} for a full briefing"""
+    return {
+        'stations': {icao: entry_version(entry) for icao, entry in response_data.get('weather_data', {}).items()},
+        'sections': {key: section_digest(value) for key, value in response_data.items() if key not in _NOT_SECTIONS},
+    }
+
+
+def briefing_token(versions):
+    """Content-addressed: the same briefing state always gets the same token"""
+    return _digest(dumps(versions, sort_keys=True))
+
+
+def check_versions(versions):
+    """
+    Check a client-supplied versions object ('since').
+
+    Raises:
+        ValueError: Not an object, or 'stations'/'sections' present but not
+            an object of version strings
+    """
+    if not isinstance(versions, dict):
+        raise ValueError("expected a versions object")
+    for key in ('stations', 'sections'):
+        held = versions.get(key)
+        if held is None:
+            continue
+        if not isinstance(held, dict) or not all(isinstance(name, str) and isinstance(version, str)
+                                                 for name, version in held.items()):
+            raise ValueError(f"'{key}' must map names to version strings")
+
+
+def build_delta(response_data, versions, previous):
+    """
+    The parts of a full briefing that differ from what the client holds.
+
+    Args:
+        response_data (dict): Full briefing
+        versions (dict): briefing_versions(response_data)
+        previous (dict): The client's {'stations': {...}, 'sections': {...}},
+            passed through check_versions(); a missing 'sections' means the
+            client has none
+
+    Returns:
+        dict: status and received_at, changed weather_data entries,
+        removed_stations, and every top-level field whose digest changed
+    """
+    held_stations = previous.get('stations') or {}
+    held_sections = previous.get('sections') or {}
+    delta = {key: response_data[key] for key in ALWAYS_SENT if key in response_data}
+    delta['delta'] = True
+    delta['weather_data'] = {icao: response_data['weather_data'][icao]
+                             for icao, version in versions['stations'].items() if held_stations.get(icao) != version}
+    delta['removed_stations'] = [icao for icao in held_stations if icao not in versions['stations']]
+    for key, digest in versions['sections'].items():
+        if held_sections.get(key) != digest:
+            delta[key] = response_data[key]
+    return delta
+
+
+class BriefingTokens:
+    """Briefing versions by token, in the shared cache so any worker can answer the refresh"""
+
+    def __init__(self, cache, ttl=BRIEFING_TOKEN_TTL):
+        self.cache = cache
+        self.ttl = ttl
+
+    def issue(self, versions):
+        token = briefing_token(versions)
+        self.cache.set(f"briefing:{token}", versions, ttl=self.ttl)
+        return token
+
+    def lookup(self, token):
+        """Versions the token was issued for, or None once it has expired"""
+        if not isinstance(token, str):
+            return None
+        return self.cache.get(f"briefing:{token}")
@@ -0,0 +1,100 @@
+import math
+from dataclasses import dataclass
+
+# Sent only when set, as the dict-based entries did
+_OPTIONAL_ENTRY_FIELDS = ('cached', 'stale', 'observed_at', 'stale_reason', 'source',
+                          'negative_cached', 'consecutive_failures', 'retry_after')
+
+
+@dataclass(slots=True)
+class RoutePoint:
+    """
+    An airport on a briefing route: departure, waypoint, destination or an
+    intermediate airport found along the corridor (which also carries its
+    distances). The same object is shared by every list of the response
+    that mentions the airport.
+    """
+    icao: str
+    name: str
+    lat: float
+    lng: float
+    type: str
+    distance_from_path: float = None
+    distance_to_start: float = None
+    distance_to_end: float = None
+
+    @classmethod
+    def from_dict(cls, point):
+        """
+        A client-supplied route point ({'icao', 'lat', 'lng', ...}).
+
+        Raises:
+            ValueError: Not an object, no ICAO code, or lat/lng not numbers in range
+        """
+        if not isinstance(point, dict):
+            raise ValueError("route points must be objects")
+        icao = point.get('icao')
+        if not icao or not isinstance(icao, str):
+            raise ValueError("every route point needs an icao code")
+        lat = _coordinate(point, 'lat', 90)
+        lng = _coordinate(point, 'lng', 180)
+        return cls(icao, point.get('name') or icao, lat, lng, point.get('type', 'waypoint'))
+
+    def to_dict(self):
+        data = {'icao': self.icao, 'name': self.name, 'lat': self.lat, 'lng': self.lng, 'type': self.type}
+        if self.distance_from_path is not None:
+            data['distance_from_path'] = self.distance_from_path
+            data['distance_to_start'] = self.distance_to_start
+            data['distance_to_end'] = self.distance_to_end
+        return data
+
+
+def _coordinate(point, name, limit):
+    value = point.get(name, 0)
+    # bool is an int subclass, but true/false is never a coordinate
+    if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+            or not -limit <= value <= limit):
+        raise ValueError(f"{point.get('icao')}: {name} must be a number between -{limit} and {limit}")
+    return float(value)
+
+
+@dataclass(slots=True)
+class WeatherEntry:
+    """
+    One station's weather_data entry. The shared cache holds to_dict() of
+    it; everything else passes the object along and the response encoder
+    serializes it once.
+    """
+    status: str
+    metar: str = None
+    parsed_metar: object = None
+    fetched_at: str = None
+    parse_error: str = None
+    error: str = None
+    error_type: str = None
+    cached: bool = False
+    stale: bool = False
+    observed_at: str = None
+    stale_reason: str = None
+    source: str = None
+    negative_cached: bool = False
+    consecutive_failures: int = None
+    retry_after: str = None
+
+    @classmethod
+    def from_dict(cls, entry):
+        """Rebuild an entry from its cached form, ignoring keys it no longer has"""
+        return cls(**{name: entry[name] for name in cls.__slots__ if name in entry})
+
+    def to_dict(self):
+        if self.status == 'success':
+            data = {'status': self.status, 'metar': self.metar, 'parsed_metar': self.parsed_metar,
+                    'parse_error': self.parse_error, 'fetched_at': self.fetched_at}
+        else:
+            data = {'status': self.status, 'error': self.error, 'error_type': self.error_type,
+                    'metar': self.metar, 'parsed_metar': self.parsed_metar, 'fetched_at': self.fetched_at}
+        for name in _OPTIONAL_ENTRY_FIELDS:
+            value = getattr(self, name)
+            if value is not None and value is not False:
+                data[name] = value
+        return data
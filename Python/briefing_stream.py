@@ -0,0 +1,144 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import metrics
+
+# Stations one subscription may watch; a long route's corridor stays well under this
+BRIEFING_STREAM_MAX_STATIONS = int(os.environ.get("BRIEFING_STREAM_MAX_STATIONS", "50"))
+# Each open stream holds one of the worker's request threads (gthread) for as long as it
+# is open, so streams are capped per worker and some threads always stay free for
+# briefings. serve.py exports WEB_THREADS (including -t) before the app is loaded.
+WEB_THREADS = int(os.environ.get("WEB_THREADS", "4"))
+BRIEFING_STREAM_RESERVED_THREADS = max(1, int(os.environ.get("BRIEFING_STREAM_RESERVED_THREADS", "2")))
+# Defaults to every thread not reserved, and never more; 0 turns streaming off (503)
+BRIEFING_STREAM_MAX = max(0, min(
+    int(os.environ.get("BRIEFING_STREAM_MAX", str(WEB_THREADS - BRIEFING_STREAM_RESERVED_THREADS))),
+    WEB_THREADS - BRIEFING_STREAM_RESERVED_THREADS))
+BRIEFING_STREAM_KEEPALIVE = float(os.environ.get("BRIEFING_STREAM_KEEPALIVE", "15"))
+# Streams end after this long; EventSource reconnects with Last-Event-ID and misses nothing
+BRIEFING_STREAM_MAX_SECONDS = float(os.environ.get("BRIEFING_STREAM_MAX_SECONDS", "900"))
+# Watched stations count as requested this often, so the prefetcher keeps them fresh
+BRIEFING_STREAM_DEMAND_INTERVAL = float(os.environ.get("BRIEFING_STREAM_DEMAND_INTERVAL", "300"))
+
+OPEN_STREAMS = metrics.Gauge('briefing_streams_open', 'Open briefing update streams in this worker')
+STREAM_UPDATES = metrics.Counter('briefing_stream_updates_total', 'Station updates pushed to briefing streams')
+metrics.REGISTRY.extend([OPEN_STREAMS, STREAM_UPDATES])
+
+_slots = threading.BoundedSemaphore(BRIEFING_STREAM_MAX)
+
+
+def format_event(event, data, event_id=None):
+    """One server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class StationUpdateStream:
+    """
+    Response body for one subscription. Holds one of this worker's stream
+    slots from open() until the server closes the response, whether or not
+    the client ever read from it.
+    """
+
+    def __init__(self, body):
+        self._body = body
+        self._lock = threading.Lock()
+        self._open = False
+
+    @classmethod
+    def open(cls, *args, **kwargs):
+        """A stream for station_updates(*args, **kwargs), or None when every slot is taken"""
+        if not _slots.acquire(blocking=False):
+            return None
+        OPEN_STREAMS.inc()
+        stream = cls(station_updates(*args, **kwargs))
+        stream._open = True
+        return stream
+
+    def __iter__(self):
+        return self._body
+
+    def close(self):
+        self._body.close()
+        with self._lock:
+            if not self._open:
+                return
+            self._open = False
+        OPEN_STREAMS.dec()
+        _slots.release()
+
+
+def station_updates(events, stations, last_event_id, load_entries, record_demand):
+    """
+    Server-sent events for a briefing's stations. Only METAR changes are
+    pushed; briefings carry no TAFs or advisories to update.
+
+    Sends 'ready' with each station's current version, then a 'weather' event
+    whenever any of the stations gets a new report, carrying only those
+    stations' weather_data entries. On reconnect (last_event_id) it first
+    sends every station that changed since that event. Event ids are change
+    sequence numbers from station_events, so they only ever grow.
+
+    Args:
+        events (StationEvents): Change feed to subscribe to
+        stations (list): ICAO codes to watch
+        last_event_id (int): Last sequence the client saw, or None
+        load_entries: load_entries(icao_codes) -> {icao: weather_data entry}
+        record_demand: record_demand(icao_codes), called periodically
+    """
+    watched = set(stations)
+    changed = queue.Queue()
+
+    def on_changes(batch):
+        relevant = [(seq, station) for seq, station, _ in batch if station in watched]
+        if relevant:
+            changed.put(relevant)
+
+    unsubscribe = events.subscribe(on_changes)
+    try:
+        versions = events.versions(stations)
+        # Never send a lower id than before, or a reconnect would replay what the client has
+        event_id = max(events.last_seq(), last_event_id or 0)
+        yield format_event('ready', {'stations': stations, 'versions': versions}, event_id=event_id)
+
+        if last_event_id is not None:
+            missed = {station: seq for station, seq in versions.items() if seq > last_event_id}
+            if missed:
+                yield _weather_event(missed, load_entries, event_id)
+
+        record_demand(stations)
+        demand_recorded = started = time.monotonic()
+        while time.monotonic() - started < BRIEFING_STREAM_MAX_SECONDS:
+            try:
+                batch = changed.get(timeout=BRIEFING_STREAM_KEEPALIVE)
+            except queue.Empty:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                if time.monotonic() - demand_recorded >= BRIEFING_STREAM_DEMAND_INTERVAL:
+                    record_demand(stations)
+                    demand_recorded = time.monotonic()
+                continue
+            updates = {station: seq for seq, station in batch}
+            # Fold in anything else already queued so a burst goes out as one event
+            while True:
+                try:
+                    updates.update({station: seq for seq, station in changed.get_nowait()})
+                except queue.Empty:
+                    break
+            event_id = max(event_id, *updates.values())
+            yield _weather_event(updates, load_entries, event_id)
+    finally:
+        unsubscribe()
+
+
+def _weather_event(versions, load_entries, event_id):
+    entries = load_entries(sorted(versions))
+    STREAM_UPDATES.inc(amount=len(entries))
+    return format_event('weather', {'weather_data': entries, 'versions': versions}, event_id=event_id)
@@ -0,0 +1,51 @@
+import contextvars
+import os
+import time
+
+# Whole-request budget for a briefing; clients may ask for less (or up to the max)
+BRIEFING_DEADLINE_SECONDS = float(os.environ.get("BRIEFING_DEADLINE_SECONDS", "20"))
+BRIEFING_DEADLINE_MAX_SECONDS = float(os.environ.get("BRIEFING_DEADLINE_MAX_SECONDS", "60"))
+
+# Absolute time.monotonic() deadline for the current request, or None for no deadline
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before this step could finish"""
+
+
+def set_deadline(seconds):
+    """Give the current request `seconds` from now; None clears the deadline"""
+    _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def remaining():
+    """Seconds left before the deadline, or None when there is no deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def clamp(seconds):
+    """
+    Shorten a timeout to what's left of the deadline.
+
+    Returns:
+        tuple: (timeout, truncated) where truncated is True when the deadline,
+        not the given timeout, is the limit
+
+    Raises:
+        DeadlineExceeded: The deadline has already passed
+    """
+    left = remaining()
+    if left is None or left >= seconds:
+        return seconds, False
+    if left <= 0:
+        raise DeadlineExceeded()
+    return left, True
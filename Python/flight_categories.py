@@ -0,0 +1,66 @@
+import math
+from array import array
+
+from metar_decode import FLIGHT_CATEGORIES
+
+# numpy classifies a whole airport table in one pass; the pure-Python loop gives the same answers
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Category index for a station with no usable report
+UNKNOWN_CATEGORY = -1
+
+# Thresholds match metar_decode.flight_category
+_LIFR, _IFR, _MVFR, _VFR = (FLIGHT_CATEGORIES.index(name) for name in ("LIFR", "IFR", "MVFR", "VFR"))
+
+
+def classify(ceiling_ft, visibility_sm, has_report=None):
+    """
+    Flight category index (into FLIGHT_CATEGORIES) for many stations at once.
+
+    Args:
+        ceiling_ft: Sequence of ceilings in feet, negative for no ceiling
+        visibility_sm: Sequence of visibilities in statute miles, NaN when not reported
+        has_report: Optional sequence of booleans; stations without a report
+            get UNKNOWN_CATEGORY
+
+    Returns:
+        array('b'): One category index per station
+    """
+    if np is not None:
+        return _classify_numpy(ceiling_ft, visibility_sm, has_report)
+    categories = array('b', [UNKNOWN_CATEGORY]) * len(ceiling_ft)
+    for i, (ceiling, visibility) in enumerate(zip(ceiling_ft, visibility_sm)):
+        if has_report is not None and not has_report[i]:
+            continue
+        if ceiling < 0:
+            ceiling = math.inf
+        if math.isnan(visibility):
+            visibility = math.inf
+        if ceiling < 500 or visibility < 1:
+            categories[i] = _LIFR
+        elif ceiling < 1000 or visibility < 3:
+            categories[i] = _IFR
+        elif ceiling <= 3000 or visibility <= 5:
+            categories[i] = _MVFR
+        else:
+            categories[i] = _VFR
+    return categories
+
+
+def _classify_numpy(ceiling_ft, visibility_sm, has_report):
+    ceiling = np.asarray(ceiling_ft, dtype=np.float64)
+    ceiling = np.where(ceiling < 0, np.inf, ceiling)
+    visibility = np.nan_to_num(np.asarray(visibility_sm, dtype=np.float64), nan=np.inf)
+    categories = np.select(
+        [(ceiling < 500) | (visibility < 1), (ceiling < 1000) | (visibility < 3), (ceiling <= 3000) | (visibility <= 5)],
+        [_LIFR, _IFR, _MVFR],
+        default=_VFR
+    ).astype(np.int8)
+    if has_report is not None:
+        categories[~np.asarray(has_report, dtype=bool)] = UNKNOWN_CATEGORY
+    result = array('b')
+    result.frombytes(categories.tobytes())
+    return result
@@ -0,0 +1,149 @@
+import collections
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import metrics
+
+# Opt-in: duplicate a slow upstream call once it passes the observed p95
+UPSTREAM_HEDGE = os.environ.get("UPSTREAM_HEDGE", "").lower() in ("1", "true", "yes")
+UPSTREAM_HEDGE_PERCENTILE = float(os.environ.get("UPSTREAM_HEDGE_PERCENTILE", "95"))
+# Hedges allowed per primary call, e.g. 0.05 caps the extra upstream load at 5%
+UPSTREAM_HEDGE_MAX_RATIO = float(os.environ.get("UPSTREAM_HEDGE_MAX_RATIO", "0.05"))
+# Hedge delay floor, so a fast upstream isn't hit twice for every hiccup
+UPSTREAM_HEDGE_MIN_DELAY = float(os.environ.get("UPSTREAM_HEDGE_MIN_DELAY_MS", "50")) / 1000.0
+
+# Need this many observed latencies before the percentile means anything
+_MIN_SAMPLES = 20
+_WINDOW = 500
+# Unused hedge budget carried over, in hedges
+_MAX_BUDGET = 10.0
+
+HEDGES = metrics.Counter('upstream_hedges_total', 'Hedged upstream requests by outcome', labels=('outcome',))
+metrics.REGISTRY.append(HEDGES)
+
+
+class LatencyWindow:
+    """Recent upstream latencies, with a percentile recomputed every few samples"""
+
+    def __init__(self, size=_WINDOW, percentile=UPSTREAM_HEDGE_PERCENTILE):
+        self.percentile = percentile
+        self._samples = collections.deque(maxlen=size)
+        self._cached = None
+        self._since_compute = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_compute += 1
+
+    def value(self):
+        """Current percentile in seconds, or None until there are enough samples"""
+        with self._lock:
+            if len(self._samples) < _MIN_SAMPLES:
+                return None
+            if self._cached is None or self._since_compute >= 25:
+                ordered = sorted(self._samples)
+                index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+                self._cached = ordered[index]
+                self._since_compute = 0
+            return self._cached
+
+
+class Hedger:
+    """
+    Run a call and, if it hasn't finished by the observed percentile
+    latency, start an identical one and take whichever succeeds first. Each
+    primary call earns max_ratio of a hedge, and a hedge is sent only when a
+    whole one has been earned, so the extra load stays at or below max_ratio.
+    The losing call still finishes in the background; its result is discarded.
+
+    Hedge only the request itself (see hedged()), inside any rate limiter or
+    concurrency guard: the delay is learned from, and measured against, the
+    time a request actually spends upstream, not time spent queued for a slot.
+    A primary and its hedge share the caller's slot.
+
+    Args:
+        max_workers: Pool size, two per call that can be in flight at once
+            (a primary and its hedge)
+    """
+
+    def __init__(self, enabled=UPSTREAM_HEDGE, max_ratio=UPSTREAM_HEDGE_MAX_RATIO,
+                 min_delay=UPSTREAM_HEDGE_MIN_DELAY, max_workers=32):
+        self.enabled = enabled
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.latency = LatencyWindow()
+        self._budget = 0.0
+        self._budget_lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _pool(self):
+        # Created lazily per process; an executor's threads don't survive fork()
+        if self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upstream-hedge")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def hedged(self, func):
+        """func wrapped so that each call goes through run()"""
+        def call(*args, **kwargs):
+            return self.run(lambda: func(*args, **kwargs))
+        return call
+
+    def _attempt(self, func, started=None):
+        if started is not None:
+            started.set()
+        began = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.latency.observe(time.perf_counter() - began)
+
+    def _take_hedge(self):
+        with self._budget_lock:
+            if self._budget >= 1.0:
+                self._budget -= 1.0
+                return True
+            return False
+
+    def run(self, func):
+        """Call func(), hedging it when enabled; returns the first successful result"""
+        if not self.enabled:
+            return func()
+
+        with self._budget_lock:
+            self._budget = min(_MAX_BUDGET, self._budget + self.max_ratio)
+        delay = self.latency.value()
+        if delay is None:
+            return self._attempt(func)
+
+        pool = self._pool()
+        started = threading.Event()
+        # Copy the context so the rate-limit priority and request ID follow the call into the pool
+        primary = pool.submit(contextvars.copy_context().run, self._attempt, func, started)
+        # The hedge delay runs from when the primary starts, not from when it was queued in the pool
+        started.wait()
+        done, _ = wait([primary], timeout=max(delay, self.min_delay))
+        if done:
+            return primary.result()
+        if not self._take_hedge():
+            HEDGES.inc('skipped_budget')
+            return primary.result()
+
+        HEDGES.inc('sent')
+        hedge = pool.submit(contextvars.copy_context().run, self._attempt, func)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    HEDGES.inc('won' if future is hedge else 'lost')
+                    return future.result()
+        # Both failed: surface the primary's error
+        return primary.result()
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+AIRPORTS_JSON = os.path.join(os.path.dirname(__file__), '..', 'src', 'data', 'airports.json')
+
+# Demand is concentrated on a few hubs; these get most of the route endpoints
+HUB_AIRPORTS = ['KATL', 'KORD', 'KDFW', 'KDEN', 'KLAX', 'KJFK', 'KSFO', 'KSEA', 'KLAS', 'KMCO']
+
+
+def build_route_mix(rng, airports, count, hub_share=0.6, max_waypoints=2):
+    """
+    Build a realistic mix of routes: mostly hub-to-hub or hub-to-regional
+    pairs, with an occasional waypoint, and repeats of popular routes.
+
+    Args:
+        rng (random.Random): Seeded generator
+        airports (list): ICAO codes available in the service's database
+        count (int): Number of routes to build
+        hub_share (float): Probability that an endpoint is a hub
+        max_waypoints (int): Maximum intermediate waypoints per route
+
+    Returns:
+        list: Routes as lists of ICAO codes
+    """
+    hubs = [a for a in HUB_AIRPORTS if a in airports] or airports[:10]
+    popular = []
+    routes = []
+    while len(routes) < count:
+        # Roughly a third of briefings re-request a route someone already asked for
+        if popular and rng.random() < 0.35:
+            routes.append(list(rng.choice(popular)))
+            continue
+        pick = lambda: rng.choice(hubs) if rng.random() < hub_share else rng.choice(airports)
+        route = [pick()]
+        for _ in range(rng.randint(0, max_waypoints)):
+            route.append(rng.choice(airports))
+        route.append(pick())
+        if route[0] == route[-1]:
+            continue
+        routes.append(route)
+        if len(popular) < 20:
+            popular.append(route)
+    return routes
+
+
+def fetch_stub_stats(stub_url):
+    if not stub_url:
+        return None
+    try:
+        return requests.get(f"{stub_url}/stub/stats", timeout=5).json()
+    except requests.exceptions.RequestException:
+        return None
+
+
+def fetch_service_counter(service_url, name):
+    """
+    Sum a counter from the service's /api/metrics by its first label. With
+    several workers this is whichever worker answered, so compare it on a
+    single-process service.
+    """
+    try:
+        text = requests.get(f"{service_url}/api/metrics", timeout=5).text
+    except requests.exceptions.RequestException:
+        return {}
+    values = {}
+    for line in text.splitlines():
+        if line.startswith(name + "{"):
+            labels, value = line.rsplit(" ", 1)
+            label = labels.split('"')[1]
+            values[label] = values.get(label, 0) + float(value)
+    return values
+
+
+def run_load(service_url, routes, concurrency, duration=None):
+    """
+    Replay routes against /api/generate-briefing from a pool of workers.
+
+    Returns:
+        list: Per-request (latency_seconds, status_code, airports_queried)
+    """
+    results = []
+    results_lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+    next_index = [0]
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with results_lock:
+                if deadline is None and next_index[0] >= len(routes):
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                route = routes[next_index[0] % len(routes)]
+                next_index[0] += 1
+            started = time.perf_counter()
+            try:
+                r = session.post(f"{service_url}/api/generate-briefing", json={'routeString': route}, timeout=120)
+                status = r.status_code
+                queried = r.json().get('weather_summary', {}).get('total_airports_queried', 0) if r.ok else 0
+            except (requests.exceptions.RequestException, ValueError):
+                status = 0
+                queried = 0
+            with results_lock:
+                results.append((time.perf_counter() - started, status, queried))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return results
+
+
+def summarize(results, elapsed, stats_before=None, stats_after=None, hedges_before=None, hedges_after=None):
+    """Throughput, latency percentiles and upstream calls per briefing"""
+    latencies = sorted(r[0] * 1000 for r in results)
+    ok = [r for r in results if r[1] == 200]
+    summary = {
+        'briefings': len(results),
+        'succeeded': len(ok),
+        'failed': len(results) - len(ok),
+        'elapsed_seconds': round(elapsed, 2),
+        'throughput_per_sec': round(len(results) / elapsed, 2) if elapsed else 0,
+        'latency_ms': {},
+        'airports_per_briefing': round(statistics.mean(r[2] for r in ok), 2) if ok else 0,
+    }
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        summary['latency_ms'] = {
+            'min': round(latencies[0], 1),
+            'p50': round(cuts[49], 1),
+            'p90': round(cuts[89], 1),
+            'p99': round(cuts[98], 1),
+            'max': round(latencies[-1], 1),
+        }
+    if stats_before and stats_after and ok:
+        calls = stats_after['requests'] - stats_before['requests']
+        summary['upstream_calls'] = calls
+        summary['upstream_calls_per_briefing'] = round(calls / len(ok), 2)
+        summary['upstream_outcomes'] = {
+            k: v - stats_before['by_outcome'].get(k, 0) for k, v in stats_after['by_outcome'].items()
+        }
+    if hedges_after:
+        summary['hedges'] = {k: int(v - (hedges_before or {}).get(k, 0)) for k, v in hedges_after.items()}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay route mixes against the briefing service")
+    parser.add_argument("--service", default="http://localhost:5000", help="Route weather service base URL")
+    parser.add_argument("--stub", default="http://localhost:5050",
+                        help="Stub weather server base URL for upstream call counts ('' to skip)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Briefings to send (ignored with --duration)")
+    parser.add_argument("-d", "--duration", type=float, default=None, help="Run for this many seconds instead")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    with open(AIRPORTS_JSON, 'r') as f:
+        airports = sorted(json.load(f))
+    rng = random.Random(args.seed)
+    routes = build_route_mix(rng, airports, args.requests)
+
+    print(f"🚀 {len(routes)} routes, concurrency {args.concurrency} -> {args.service}", file=sys.stderr)
+    stats_before = fetch_stub_stats(args.stub)
+    hedges_before = fetch_service_counter(args.service, 'upstream_hedges_total')
+    started = time.perf_counter()
+    results = run_load(args.service, routes, args.concurrency, args.duration)
+    elapsed = time.perf_counter() - started
+    stats_after = fetch_stub_stats(args.stub)
+    hedges_after = fetch_service_counter(args.service, 'upstream_hedges_total')
+
+    summary = summarize(results, elapsed, stats_before, stats_after, hedges_before, hedges_after)
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import collections
+import math
+import os
+import threading
+import time
+
+import metrics
+
+# Airport grid cells; a 1° cell holds a handful of airports even in dense regions
+GRID_CELL_DEG = 1.0
+# Rendered tiles kept per worker
+TILE_CACHE_SIZE = int(os.environ.get("TILE_CACHE_SIZE", "2048"))
+# Rebuild a tile at least this often even if none of its stations changed
+TILE_CACHE_TTL = float(os.environ.get("TILE_CACHE_TTL", "300"))
+MAX_ZOOM = 22
+# Web Mercator stops here; tiles never reach the poles
+MAX_MERCATOR_LAT = 85.0511287798
+
+TILE_STATIONS = metrics.Histogram('map_tile_stations', 'Airports per map tile response',
+                                  buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000))
+metrics.REGISTRY.append(TILE_STATIONS)
+
+
+def parse_bbox(value):
+    """
+    Parse "min_lng,min_lat,max_lng,max_lat" (Leaflet's toBBoxString order).
+
+    Returns:
+        tuple: (min_lng, min_lat, max_lng, max_lat) with longitudes in
+        [-180, 180); min_lng > max_lng means the box crosses the antimeridian
+
+    Raises:
+        ValueError: Not four numbers, or latitudes out of range / inverted
+    """
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != 4 or not all(math.isfinite(part) for part in parts):
+        raise ValueError("bbox must be four numbers: min_lng,min_lat,max_lng,max_lat")
+    min_lng, min_lat, max_lng, max_lat = parts
+    if not -90 <= min_lat <= max_lat <= 90:
+        raise ValueError("bbox latitudes must satisfy -90 <= min_lat <= max_lat <= 90")
+    if max_lng - min_lng >= 360:
+        return -180.0, min_lat, 180.0, max_lat
+    # Leaflet reports longitudes past ±180 once the map has been panned around the globe
+    return (min_lng + 180) % 360 - 180, min_lat, (max_lng + 180) % 360 - 180, max_lat
+
+
+def tile_bbox(z, x, y):
+    """
+    Bounds of a Web Mercator (slippy map) tile.
+
+    Raises:
+        ValueError: Zoom or tile coordinates out of range
+    """
+    if not 0 <= z <= MAX_ZOOM:
+        raise ValueError(f"zoom must be between 0 and {MAX_ZOOM}")
+    tiles = 1 << z
+    if not (0 <= x < tiles and 0 <= y < tiles):
+        raise ValueError(f"tile x and y must be between 0 and {tiles - 1} at zoom {z}")
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / tiles))))
+
+    return x / tiles * 360 - 180, lat(y + 1), (x + 1) / tiles * 360 - 180, lat(y)
+
+
+class AirportGrid:
+    """
+    Spatial index over the airport table: positions bucketed into fixed
+    lat/lng cells, so a bbox query only looks at airports in the cells it
+    overlaps.
+    """
+
+    def __init__(self, lat, lng, cell_deg=GRID_CELL_DEG):
+        self.lat = lat
+        self.lng = lng
+        self.cell_deg = cell_deg
+        self.cells = collections.defaultdict(list)
+        for i, (y, x) in enumerate(zip(lat, lng)):
+            self.cells[self._cell(y, x)].append(i)
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def query(self, bbox):
+        """Positions of airports inside bbox, in airport-table order"""
+        min_lng, min_lat, max_lng, max_lat = bbox
+        if min_lng > max_lng:
+            return sorted(self.query((min_lng, min_lat, 180.0, max_lat)) +
+                          self.query((-180.0, min_lat, max_lng, max_lat)))
+        low_row, low_col = self._cell(min_lat, min_lng)
+        high_row, high_col = self._cell(max_lat, max_lng)
+        found = []
+        for row in range(low_row, high_row + 1):
+            for col in range(low_col, high_col + 1):
+                for i in self.cells.get((row, col), ()):
+                    if min_lat <= self.lat[i] <= max_lat and min_lng <= self.lng[i] <= max_lng:
+                        found.append(i)
+        found.sort()
+        return found
+
+
+class TileCache:
+    """
+    Serialized tile bodies per worker, LRU-bounded. An entry is only served
+    while the version it was built for still matches the caller's current
+    version, so a change to any station in the tile invalidates it.
+    """
+
+    def __init__(self, max_entries=TILE_CACHE_SIZE, ttl=TILE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or time.monotonic() - entry[2] > self.ttl:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, body):
+        with self._lock:
+            self._entries[key] = (version, body, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
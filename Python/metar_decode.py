@@ -0,0 +1,145 @@
+import re
+
+# Structured METAR decoding straight from the raw tokens. Unlike metar_parse
+# (prose for display) this keeps the numbers, so callers can classify, rank
+# and re-encode stations without going back through the text.
+
+FLIGHT_CATEGORIES = ["VFR", "MVFR", "IFR", "LIFR"]
+
+CEILING_COVERS = ("BKN", "OVC", "VV")
+
+_WIND = re.compile(r'^(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?(KT|MPS)$')
+_VIS_SM = re.compile(r'^([MP])?(?:(\d+)|(\d+)/(\d+))SM$')
+_VIS_METERS = re.compile(r'^(\d{4})(?:NDV)?$')
+_SKY = re.compile(r'^(FEW|SCT|BKN|OVC|VV)(\d{3}|///)(CB|TCU)?$')
+_TEMP = re.compile(r'^(M?\d{2})/(M?\d{2})?$')
+_ALTIMETER = re.compile(r'^([AQ])(\d{4})$')
+_OBS_TIME = re.compile(r'^(\d{2})(\d{2})(\d{2})Z$')
+_WEATHER = re.compile(
+    r'^(?:[-+]|VC)?(?:MI|PR|BC|DR|BL|SH|TS|FZ)?'
+    r'(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)*$'
+)
+
+METERS_PER_SM = 1609.344
+HPA_PER_INHG = 33.8639
+
+
+def _temperature(value):
+    if not value:
+        return None
+    return -int(value[1:]) if value.startswith('M') else int(value)
+
+
+def flight_category(ceiling_ft, visibility_sm):
+    """
+    VFR/MVFR/IFR/LIFR from ceiling (lowest BKN/OVC/VV layer) and visibility.
+    Missing values don't lower the category.
+    """
+    ceiling = float('inf') if ceiling_ft is None else ceiling_ft
+    visibility = float('inf') if visibility_sm is None else visibility_sm
+    if ceiling < 500 or visibility < 1:
+        return "LIFR"
+    if ceiling < 1000 or visibility < 3:
+        return "IFR"
+    if ceiling <= 3000 or visibility <= 5:
+        return "MVFR"
+    return "VFR"
+
+
+def decode_metar(raw):
+    """
+    Decode the body of a METAR/SPECI (everything before RMK) into numbers.
+
+    Returns:
+        dict: station, time (DDHHMM), wind_dir (degrees or 'VRB'), wind_kt,
+        gust_kt, visibility_sm, sky (list of (cover, base_ft)), ceiling_ft,
+        weather (list of codes), temp_c, dewpoint_c, altimeter_inhg and
+        flight_category; fields that aren't reported are None.
+        Returns None for an empty report.
+    """
+    tokens = (raw or "").split()
+    if tokens and tokens[0] in ("METAR", "SPECI"):
+        tokens = tokens[1:]
+    if not tokens:
+        return None
+    if "RMK" in tokens:
+        tokens = tokens[:tokens.index("RMK")]
+
+    decoded = {
+        'station': tokens[0], 'time': None,
+        'wind_dir': None, 'wind_kt': None, 'gust_kt': None,
+        'visibility_sm': None, 'sky': [], 'ceiling_ft': None, 'weather': [],
+        'temp_c': None, 'dewpoint_c': None, 'altimeter_inhg': None,
+    }
+
+    whole_miles = None
+    for token in tokens[1:]:
+        if token in ("AUTO", "COR", "NOSIG", "$"):
+            continue
+
+        match = _OBS_TIME.match(token)
+        if match:
+            decoded['time'] = token[:-1]
+            continue
+
+        match = _WIND.match(token)
+        if match:
+            factor = 1.944 if match.group(4) == 'MPS' else 1
+            decoded['wind_dir'] = match.group(1) if match.group(1) == 'VRB' else int(match.group(1))
+            decoded['wind_kt'] = round(int(match.group(2)) * factor)
+            decoded['gust_kt'] = round(int(match.group(3)) * factor) if match.group(3) else None
+            continue
+
+        # "1 1/2SM" arrives as two tokens
+        if token.isdigit() and len(token) == 1 and decoded['visibility_sm'] is None:
+            whole_miles = int(token)
+            continue
+
+        match = _VIS_SM.match(token)
+        if match:
+            if match.group(2):
+                visibility = float(match.group(2))
+            else:
+                visibility = int(match.group(3)) / int(match.group(4)) + (whole_miles or 0)
+            decoded['visibility_sm'] = visibility
+            continue
+
+        if token == "CAVOK":
+            decoded['visibility_sm'] = 10.0
+            continue
+
+        match = _VIS_METERS.match(token)
+        if match and decoded['visibility_sm'] is None and decoded['time'] is not None:
+            decoded['visibility_sm'] = round(int(match.group(1)) / METERS_PER_SM, 2)
+            continue
+
+        match = _SKY.match(token)
+        if match:
+            base = None if match.group(2) == '///' else int(match.group(2)) * 100
+            decoded['sky'].append((match.group(1), base))
+            if (match.group(1) in CEILING_COVERS and base is not None
+                    and (decoded['ceiling_ft'] is None or base < decoded['ceiling_ft'])):
+                decoded['ceiling_ft'] = base
+            continue
+
+        if token in ("CLR", "SKC", "NSC", "NCD"):
+            decoded['sky'].append(("CLR", None))
+            continue
+
+        match = _TEMP.match(token)
+        if match:
+            decoded['temp_c'] = _temperature(match.group(1))
+            decoded['dewpoint_c'] = _temperature(match.group(2))
+            continue
+
+        match = _ALTIMETER.match(token)
+        if match:
+            value = int(match.group(2))
+            decoded['altimeter_inhg'] = value / 100 if match.group(1) == 'A' else round(value / HPA_PER_INHG, 2)
+            continue
+
+        if len(token) >= 2 and _WEATHER.match(token) and not token.isdigit():
+            decoded['weather'].append(token)
+
+    decoded['flight_category'] = flight_category(decoded['ceiling_ft'], decoded['visibility_sm'])
+    return decoded
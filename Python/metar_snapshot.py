@@ -0,0 +1,381 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from datetime import datetime, timezone
+
+import requests
+
+import metrics
+from flight_categories import classify
+from metar_decode import FLIGHT_CATEGORIES, decode_metar
+from rate_limiter import priority
+from service_logging import get_logger
+from upstream_guard import UpstreamUnavailable
+
+# Whole-network METAR dump, refreshed upstream every minute or so (.csv.gz or .xml.gz)
+METAR_SNAPSHOT_URL = os.environ.get("METAR_SNAPSHOT_URL", "")
+# Seconds between downloads; 0 turns the snapshot off
+METAR_SNAPSHOT_INTERVAL = float(os.environ.get("METAR_SNAPSHOT_INTERVAL", "0"))
+# A snapshot older than this (e.g. the feed went away) is no longer used for briefings
+METAR_SNAPSHOT_MAX_AGE = float(os.environ.get("METAR_SNAPSHOT_MAX_AGE", str(max(600.0, 3 * METAR_SNAPSHOT_INTERVAL))))
+_DOWNLOAD_TIMEOUT = 60
+
+# Column sentinels; array columns can't hold None
+MISSING = -1
+NAN = float('nan')
+VARIABLE_WIND = -2
+
+INGESTS = metrics.Counter('metar_snapshot_ingests_total', 'METAR dump downloads by result', labels=('result',))
+INGEST_SECONDS = metrics.Histogram('metar_snapshot_ingest_seconds', 'Time to download and parse a METAR dump',
+                                   buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+metrics.REGISTRY.extend([INGESTS, INGEST_SECONDS])
+
+log = get_logger('metar_snapshot')
+
+
+class MetarSnapshot:
+    """
+    Latest METAR per airport in column arrays. Position i in every column
+    belongs to stations[i], in the airport table's order, so a lookup is
+    one dict hit plus array reads. Stations in the dump but not in the
+    airport table are counted and dropped. Missing values are MISSING for
+    integer columns and NaN for float columns; a station with no report
+    has observed_at NaN. Snapshots are never modified after they're built.
+    """
+
+    def __init__(self, stations, source=None):
+        count = len(stations)
+        self.stations = tuple(stations)
+        self.index = {icao: i for i, icao in enumerate(self.stations)}
+        self.observed_at = array('d', [NAN]) * count     # epoch seconds
+        self.wind_dir = array('h', [MISSING]) * count    # degrees, VARIABLE_WIND for VRB
+        self.wind_kt = array('h', [MISSING]) * count
+        self.gust_kt = array('h', [MISSING]) * count
+        self.visibility_sm = array('f', [NAN]) * count
+        self.ceiling_ft = array('i', [MISSING]) * count  # MISSING when there's no ceiling
+        self.temp_c = array('f', [NAN]) * count
+        self.category = array('b', [MISSING]) * count    # index into FLIGHT_CATEGORIES, set by finish()
+        self.raw = [None] * count
+        self.source = source
+        self.loaded_at = time.time()
+        self.reports = 0
+        self.unmatched = 0
+
+    def __len__(self):
+        return self.reports
+
+    def add(self, station, observed_at, raw, wind_dir=None, wind_kt=None, gust_kt=None,
+            visibility_sm=None, ceiling_ft=None, temp_c=None):
+        """Store one report, keeping the newest when a station appears twice"""
+        i = self.index.get(station)
+        if i is None:
+            self.unmatched += 1
+            return
+        previous = self.observed_at[i]
+        if previous == previous and previous >= observed_at:
+            return
+        if previous != previous:
+            self.reports += 1
+        self.observed_at[i] = observed_at
+        self.raw[i] = raw
+        self.wind_dir[i] = VARIABLE_WIND if wind_dir == 'VRB' else _int_or_missing(wind_dir)
+        self.wind_kt[i] = _int_or_missing(wind_kt)
+        self.gust_kt[i] = _int_or_missing(gust_kt)
+        self.visibility_sm[i] = NAN if visibility_sm is None else visibility_sm
+        self.ceiling_ft[i] = _int_or_missing(ceiling_ft)
+        self.temp_c[i] = NAN if temp_c is None else temp_c
+
+    def finish(self):
+        """Classify every station in one pass once all reports are in"""
+        self.category = classify(self.ceiling_ft, self.visibility_sm,
+                                 [observed == observed for observed in self.observed_at])
+        return self
+
+    def get(self, station):
+        """One station's row as a dict (None for missing values), or None without a report"""
+        i = self.index.get(station)
+        if i is None or self.raw[i] is None:
+            return None
+        wind_dir = self.wind_dir[i]
+        return {
+            'station': station,
+            'observed_at': datetime.fromtimestamp(self.observed_at[i], timezone.utc).isoformat(),
+            'raw': self.raw[i],
+            'wind_dir': 'VRB' if wind_dir == VARIABLE_WIND else _none_if_missing(wind_dir),
+            'wind_kt': _none_if_missing(self.wind_kt[i]),
+            'gust_kt': _none_if_missing(self.gust_kt[i]),
+            'visibility_sm': _none_if_nan(self.visibility_sm[i]),
+            'ceiling_ft': _none_if_missing(self.ceiling_ft[i]),
+            'temp_c': _none_if_nan(self.temp_c[i]),
+            'flight_category': FLIGHT_CATEGORIES[self.category[i]] if self.category[i] >= 0 else None,
+        }
+
+    def station_reports(self):
+        """(station, raw, observed_at epoch seconds) for every station with a report"""
+        for i, raw in enumerate(self.raw):
+            if raw is not None:
+                yield self.stations[i], raw, self.observed_at[i]
+
+    def summary(self):
+        return {
+            'source': self.source,
+            'loaded_at': datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat(),
+            'age_seconds': round(time.time() - self.loaded_at, 1),
+            'stations': len(self.stations),
+            'reports': self.reports,
+            'unmatched': self.unmatched,
+        }
+
+
+def _int_or_missing(value):
+    return MISSING if value is None else int(value)
+
+
+def _none_if_missing(value):
+    return None if value == MISSING else value
+
+
+def _none_if_nan(value):
+    return None if math.isnan(value) else round(value, 2)
+
+
+def _number(text):
+    """Dump numbers: '' is missing and '10+' (visibility) means at least 10"""
+    text = (text or "").strip().rstrip('+')
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _epoch(observation_time):
+    return datetime.fromisoformat(observation_time.strip().replace('Z', '+00:00')).timestamp()
+
+
+def _ceiling(layers, vert_vis_ft):
+    """Lowest BKN/OVC layer; OVX (obscured) uses the vertical visibility"""
+    bases = []
+    for cover, base in layers:
+        if cover in ('BKN', 'OVC') and base is not None:
+            bases.append(base)
+        elif cover == 'OVX':
+            bases.append(vert_vis_ft if vert_vis_ft is not None else 0)
+    return min(bases) if bases else None
+
+
+def _add_record(snapshot, raw, station, observation_time, wind_dir, wind_kt, gust_kt,
+                visibility, layers, vert_vis, temp_c):
+    """Add one dump record, decoding the raw text when the structured fields are absent"""
+    if not station or not observation_time:
+        return
+    if _number(wind_kt) is None and _number(visibility) is None and not layers and raw:
+        decoded = decode_metar(raw)
+        if decoded:
+            snapshot.add(station, _epoch(observation_time), raw, decoded['wind_dir'], decoded['wind_kt'],
+                         decoded['gust_kt'], decoded['visibility_sm'], decoded['ceiling_ft'], decoded['temp_c'])
+        return
+    snapshot.add(
+        station, _epoch(observation_time), raw,
+        'VRB' if wind_dir == 'VRB' else _number(wind_dir), _number(wind_kt), _number(gust_kt),
+        _number(visibility), _ceiling(layers, _number(vert_vis)), _number(temp_c)
+    )
+
+
+def _ingest_csv(lines, snapshot):
+    # A few status lines ("No errors", "data source=metars", ...) come before the header
+    for line in lines:
+        if line.startswith('raw_text,'):
+            header = next(csv.reader([line]))
+            break
+    else:
+        raise ValueError("METAR dump has no raw_text header row")
+    column = {name: i for i, name in reversed(list(enumerate(header)))}
+    # Sky layers repeat the same two column names
+    sky = [i for i, name in enumerate(header) if name == 'sky_cover']
+    width = len(header)
+
+    def field(row, name):
+        i = column.get(name)
+        return row[i] if i is not None else None
+
+    for row in csv.reader(lines):
+        if len(row) < width:
+            row += [''] * (width - len(row))
+        layers = [(row[i], _number(row[i + 1])) for i in sky if row[i]]
+        _add_record(snapshot, field(row, 'raw_text'), field(row, 'station_id'), field(row, 'observation_time'),
+                    field(row, 'wind_dir_degrees'), field(row, 'wind_speed_kt'), field(row, 'wind_gust_kt'),
+                    field(row, 'visibility_statute_mi'), layers, field(row, 'vert_vis_ft'), field(row, 'temp_c'))
+
+
+def _ingest_xml(stream, snapshot):
+    for _, element in ET.iterparse(stream):
+        if element.tag != 'METAR':
+            continue
+
+        def text(name):
+            child = element.find(name)
+            return child.text if child is not None else None
+
+        layers = [(sky.get('sky_cover'), _number(sky.get('cloud_base_ft_agl')))
+                  for sky in element.findall('sky_condition')]
+        _add_record(snapshot, text('raw_text'), text('station_id'), text('observation_time'),
+                    text('wind_dir_degrees'), text('wind_speed_kt'), text('wind_gust_kt'),
+                    text('visibility_statute_mi'), layers, text('vert_vis_ft'), text('temp_c'))
+        # Drop parsed records as we go so memory stays flat on a full dump
+        element.clear()
+
+
+def ingest(fileobj, stations, source=None):
+    """
+    Build a snapshot from a METAR dump, decompressing and parsing as it reads.
+
+    Args:
+        fileobj: Binary stream of the dump, gzip-compressed or plain, CSV or XML
+        stations (iterable): ICAO codes in airport-table order
+        source (str): Where the dump came from, kept for /api/health
+
+    Returns:
+        MetarSnapshot
+    """
+    stream = io.BufferedReader(fileobj) if not hasattr(fileobj, 'peek') else fileobj
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        stream = io.BufferedReader(gzip.GzipFile(fileobj=stream))
+    snapshot = MetarSnapshot(stations, source)
+    if stream.peek(64).lstrip()[:1] == b'<':
+        _ingest_xml(stream, snapshot)
+    else:
+        _ingest_csv(io.TextIOWrapper(stream, encoding='utf-8', newline=''), snapshot)
+    return snapshot.finish()
+
+
+def ingest_file(path, stations):
+    with open(path, 'rb') as f:
+        return ingest(f, stations, source=os.path.abspath(path))
+
+
+class SnapshotLoader:
+    """
+    Holds the current snapshot and replaces it with a fresh download every
+    interval. Readers take `current` once and use that object throughout;
+    the swap is a single attribute assignment, so a reader never sees a
+    half-built snapshot. Each worker keeps its own copy in memory; the
+    download skips unchanged dumps via ETag / Last-Modified and takes a
+    background-priority token from the shared upstream rate limiter.
+    on_load(snapshot), if given, is called after each snapshot is swapped in.
+    """
+
+    def __init__(self, stations, url=METAR_SNAPSHOT_URL, interval=METAR_SNAPSHOT_INTERVAL,
+                 max_age=METAR_SNAPSHOT_MAX_AGE, rate_limiter=None, on_load=None):
+        self.stations = tuple(stations)
+        self.url = url
+        self.interval = interval
+        self.max_age = max_age
+        self.rate_limiter = rate_limiter
+        self.on_load = on_load
+        self.current = None
+        self._confirmed_at = 0.0
+        self._validators = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.url) and self.interval > 0
+
+    def fresh(self):
+        """The current snapshot if it's recent enough to answer briefings, else None"""
+        if time.time() - self._confirmed_at > self.max_age:
+            return None
+        return self.current
+
+    def ensure_started(self):
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._validators = {}
+            threading.Thread(target=self._run, name="metar-snapshot", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                with priority('background'):
+                    self.refresh()
+            except Exception:
+                INGESTS.inc('error')
+                log.exception("METAR snapshot refresh failed", extra={'url': self.url})
+            time.sleep(self.interval)
+
+    def load(self, snapshot):
+        self.current = snapshot
+        self._confirmed_at = time.time()
+        if self.on_load is not None:
+            try:
+                self.on_load(snapshot)
+            except Exception:
+                # The snapshot is in and serving either way
+                log.exception("METAR snapshot load hook failed", extra={'source': snapshot.source})
+
+    def refresh(self):
+        """Download and swap in the dump if it changed; returns True when a new snapshot went in"""
+        if self.rate_limiter is not None:
+            try:
+                self.rate_limiter.acquire()
+            except UpstreamUnavailable:
+                INGESTS.inc('rate_limited')
+                return False
+        started = time.perf_counter()
+        with requests.get(self.url, headers=self._validators, stream=True, timeout=_DOWNLOAD_TIMEOUT) as response:
+            if response.status_code == 304:
+                INGESTS.inc('not_modified')
+                # Still what upstream is publishing, so keep serving it
+                self._confirmed_at = time.time()
+                return False
+            response.raise_for_status()
+            # Undo any transport encoding; ingest() recognises a gzip file body itself
+            response.raw.decode_content = True
+            # The gzip reader checks for EOF after the last block; don't let urllib3 close the stream first
+            response.raw.auto_close = False
+            snapshot = ingest(response.raw, self.stations, source=self.url)
+            self._validators = {name: response.headers[header] for name, header in
+                                (('If-None-Match', 'ETag'), ('If-Modified-Since', 'Last-Modified'))
+                                if header in response.headers}
+        self.load(snapshot)
+        INGESTS.inc('loaded')
+        INGEST_SECONDS.observe(time.perf_counter() - started)
+        log.info("Loaded METAR snapshot", extra=snapshot.summary())
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a METAR dump (e.g. metars.cache.csv.gz) into a snapshot")
+    parser.add_argument("dump", help="Path to a .csv/.xml dump, gzip-compressed or not")
+    parser.add_argument("--airports", default=os.path.join(os.path.dirname(__file__), '..', 'src', 'data',
+                                                           'airports.json'))
+    parser.add_argument("--station", action='append', default=[], help="Print this station's row (repeatable)")
+    args = parser.parse_args()
+
+    with open(args.airports) as f:
+        stations = list(json.load(f))
+    started = time.perf_counter()
+    snapshot = ingest_file(args.dump, stations)
+    print(f"{snapshot.reports} reports for {len(stations)} airports ({snapshot.unmatched} unmatched)"
+          f" in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for station in args.station:
+        print(json.dumps(snapshot.get(station.upper()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond parse work up to the 10 s upstream timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request stage durations, read back when building the Server-Timing header
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, with optional labels"""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, Prometheus style"""
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, ('le', repr(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values, ('le', '+Inf'))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(float(series[-2]))}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram('briefing_stage_seconds', 'Time spent per briefing pipeline stage', labels=('stage',))
+UPSTREAM_SECONDS = Histogram('upstream_request_seconds', 'Upstream weather API latency by station',
+                             labels=('station',))
+UPSTREAM_REQUESTS = Counter('upstream_requests_total', 'Upstream weather API requests by station and status',
+                            labels=('station', 'status'))
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by cache and result', labels=('cache', 'result'))
+
+REGISTRY = [STAGE_SECONDS, UPSTREAM_SECONDS, UPSTREAM_REQUESTS, CACHE_REQUESTS]
+
+
+def start_request():
+    """Begin collecting stage timings for the current request"""
+    _request_timings.set({})
+
+
+def request_timings():
+    """Stage name -> accumulated seconds for the current request (None outside a request)"""
+    return _request_timings.get()
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Time a pipeline stage. Repeated stages within one request (e.g. per-station
+    fetches) accumulate into a single Server-Timing entry.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def observe_upstream(station, status, elapsed):
+    """Record one upstream call; status is an HTTP code or an error kind such as 'timeout'"""
+    UPSTREAM_SECONDS.observe(elapsed, station)
+    UPSTREAM_REQUESTS.inc(station, str(status))
+
+
+def record_cache(cache, hit):
+    """Record a cache lookup so /api/metrics can report hit ratios"""
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+def server_timing_header(timings):
+    """Format stage timings as a Server-Timing header value (durations in ms)"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def render_prometheus():
+    """Render every registered metric, plus derived cache hit ratios, in Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    totals = {}
+    for (cache, result), value in CACHE_REQUESTS.samples().items():
+        hits, lookups = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (value if result == 'hit' else 0), lookups + value)
+    lines.append("# HELP cache_hit_ratio Fraction of cache lookups that were hits")
+    lines.append("# TYPE cache_hit_ratio gauge")
+    for cache, (hits, lookups) in sorted(totals.items()):
+        lines.append(f'cache_hit_ratio{{cache="{cache}"}} {hits / lookups if lookups else 0.0}')
+    return "\n".join(lines) + "\n"
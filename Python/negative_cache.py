@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from briefing_records import WeatherEntry
+from weather_cache import VAR_DIR
+from service_logging import get_logger
+from rate_limiter import priority
+
+NEGATIVE_CACHE_PATH = os.environ.get("NEGATIVE_CACHE_PATH", os.path.join(VAR_DIR, 'negative_cache.db'))
+
+
+def _backoff(value):
+    base, _, cap = value.partition(':')
+    return float(base), float(cap or base)
+
+
+# Backoff per error type as "base:max" seconds; doubles on every failed re-probe.
+# A station with no METAR rarely starts reporting, an upstream error usually clears quickly.
+NEGATIVE_BACKOFF = {
+    'no_data': _backoff(os.environ.get("NEGATIVE_BACKOFF_NO_DATA", "900:21600")),
+    'api_error': _backoff(os.environ.get("NEGATIVE_BACKOFF_API_ERROR", "30:900")),
+}
+# Stations nobody has asked for in this long are dropped instead of re-probed
+NEGATIVE_CACHE_IDLE = float(os.environ.get("NEGATIVE_CACHE_IDLE", "3600"))
+# How often the background prober looks for stations due for a retry
+NEGATIVE_PROBE_INTERVAL = float(os.environ.get("NEGATIVE_PROBE_INTERVAL", "5"))
+# A claimed probe is given this long before another worker may take it over
+_PROBE_LEASE = 60
+
+log = get_logger('negative_cache')
+
+
+def backoff_seconds(error_type, failures):
+    base, cap = NEGATIVE_BACKOFF[error_type]
+    return min(cap, base * 2 ** (failures - 1))
+
+
+class NegativeCache:
+    """
+    Stations whose last fetch failed, shared by all workers through SQLite.
+    While a station is listed, briefings answer from here instead of asking
+    upstream; a background prober retries it when its backoff expires.
+    """
+
+    def __init__(self, path=NEGATIVE_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS negative ("
+            " icao TEXT PRIMARY KEY,"
+            " error_type TEXT NOT NULL,"
+            " error TEXT NOT NULL,"
+            " failures INTEGER NOT NULL,"
+            " failed_at TEXT NOT NULL,"
+            " retry_at REAL NOT NULL,"
+            " last_requested_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, icao_codes):
+        """Return {icao: entry} for listed stations and note that they were asked for"""
+        if not icao_codes:
+            return {}
+        conn = self._connect()
+        placeholders = ",".join("?" * len(icao_codes))
+        rows = conn.execute(
+            f"SELECT icao, error_type, error, failures, failed_at, retry_at FROM negative"
+            f" WHERE icao IN ({placeholders})",
+            tuple(icao_codes)
+        ).fetchall()
+        if rows:
+            conn.execute(
+                f"UPDATE negative SET last_requested_at = ? WHERE icao IN ({','.join('?' * len(rows))})",
+                (time.time(), *(row[0] for row in rows))
+            )
+        return {
+            row[0]: {'error_type': row[1], 'error': row[2], 'failures': row[3],
+                     'failed_at': row[4], 'retry_at': row[5]}
+            for row in rows
+        }
+
+    def record_failure(self, icao, error_type, error, failed_at=None):
+        """List a station, or push its retry further out if it is already listed"""
+        if error_type not in NEGATIVE_BACKOFF:
+            return
+        conn = self._connect()
+        row = conn.execute("SELECT error_type, failures FROM negative WHERE icao = ?", (icao,)).fetchone()
+        # A change of error type restarts that type's backoff
+        failures = row[1] + 1 if row and row[0] == error_type else 1
+        now = time.time()
+        conn.execute(
+            "INSERT INTO negative (icao, error_type, error, failures, failed_at, retry_at, last_requested_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(icao) DO UPDATE SET error_type = excluded.error_type, error = excluded.error,"
+            " failures = excluded.failures, failed_at = excluded.failed_at, retry_at = excluded.retry_at",
+            (icao, error_type, error, failures, failed_at or datetime.now().isoformat(),
+             now + backoff_seconds(error_type, failures), now)
+        )
+
+    def clear(self, icao):
+        self._connect().execute("DELETE FROM negative WHERE icao = ?", (icao,))
+
+    def claim_due(self, limit=10):
+        """
+        Claim up to `limit` stations whose backoff has expired. Idle stations
+        are dropped instead. Claiming moves retry_at out by a lease, so only
+        one worker probes a station.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("DELETE FROM negative WHERE last_requested_at < ?", (now - NEGATIVE_CACHE_IDLE,))
+        due = conn.execute(
+            "SELECT icao, retry_at FROM negative WHERE retry_at <= ? ORDER BY retry_at LIMIT ?", (now, limit)
+        ).fetchall()
+        claimed = []
+        for icao, retry_at in due:
+            cursor = conn.execute(
+                "UPDATE negative SET retry_at = ? WHERE icao = ? AND retry_at = ?",
+                (now + _PROBE_LEASE, icao, retry_at)
+            )
+            if cursor.rowcount == 1:
+                claimed.append(icao)
+        return claimed
+
+
+class NegativeCacheProber:
+    """
+    Background thread that re-probes negatively cached stations once their
+    backoff expires. probe(icao) fetches the station and returns its
+    weather_data entry; like any fetch, it records a failure itself, which
+    re-lists the station with a longer backoff. Successes are dropped from
+    the negative cache here.
+
+    Start it lazily from the serving process: a thread started before a
+    pre-fork server forks does not exist in the workers.
+    """
+
+    def __init__(self, negative_cache, probe, interval=NEGATIVE_PROBE_INTERVAL):
+        self.negative_cache = negative_cache
+        self.probe = probe
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="negative-cache-prober", daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                # Re-probes only use rate-limit capacity interactive briefings leave spare
+                with priority('background'):
+                    self.probe_due()
+            except Exception:
+                log.exception("Negative cache probe pass failed")
+
+    def probe_due(self):
+        """Re-probe every station that is due; returns how many recovered"""
+        recovered = 0
+        for icao in self.negative_cache.claim_due():
+            entry = self.probe(icao)
+            if entry.status == 'success' and not entry.stale:
+                self.negative_cache.clear(icao)
+                recovered += 1
+            elif entry.error_type == 'unexpected_error':
+                self.negative_cache.clear(icao)
+            # no_data and api_error were already re-listed by the fetch; if the upstream refused
+            # the probe, the claim lease expires and it is retried
+            log.debug("Re-probed station", extra={'station': icao, 'status': entry.status})
+        return recovered
+
+
+def negative_entry(cached):
+    """The weather_data entry served for a negative-cache hit"""
+    return WeatherEntry(
+        status='error',
+        error=cached['error'],
+        error_type=cached['error_type'],
+        fetched_at=cached['failed_at'],
+        negative_cached=True,
+        consecutive_failures=cached['failures'],
+        retry_after=datetime.fromtimestamp(max(cached['retry_at'], time.time()), timezone.utc).isoformat()
+    )
@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from pirep_parser import (
+    parse_pirep,
+    severity_range,
+    sky_layers,
+    weather_codes,
+    temperature_c,
+)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def decode_pirep_record(pirep_str):
+    """
+    Decode one raw PIREP into a structured record.
+
+    Args:
+        pirep_str (str): Raw PIREP, e.g. "DEN UA /OV DEN090020/TM 1530/FL310/TP B737/TB LGT-MOD"
+
+    Returns:
+        dict: Structured fields (turbulence range, sky layers in feet, weather codes, temperature)
+    """
+    report = parse_pirep(pirep_str)
+    turbulence = severity_range(report.get('TB'))
+    icing = severity_range(report.get('IC'))
+    fl = report.get('FL', '')
+
+    return {
+        'station': report['station'],
+        'type': report['type'],
+        'location': report.get('OV'),
+        'time': report.get('TM'),
+        'flight_level': int(fl[:3]) if fl[:3].isdigit() else None,
+        'aircraft': report.get('TP'),
+        'turbulence': {'min': turbulence[0], 'max': turbulence[1]} if turbulence else None,
+        'icing': {'min': icing[0], 'max': icing[1]} if icing else None,
+        'sky': sky_layers(report.get('SK')),
+        'weather': weather_codes(report.get('WX')),
+        'temperature_c': temperature_c(report.get('TA')),
+        'remarks': report.get('RM'),
+    }
+
+
+def decode_batch(batch):
+    """
+    Decode a batch of (line_number, raw) pairs. Malformed reports become
+    error records so one bad line never aborts the batch.
+    """
+    results = []
+    for line_number, raw in batch:
+        try:
+            record = decode_pirep_record(raw)
+            record['line'] = line_number
+            results.append(record)
+        except Exception as e:
+            results.append({'line': line_number, 'error': str(e), 'raw': raw})
+    return results
+
+
+def iter_batches(lines, batch_size=DEFAULT_BATCH_SIZE):
+    """Group a line stream into numbered batches, skipping blank lines"""
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        batch.append((line_number, line))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def decode_stream(lines, out, errors_out=None, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream line-delimited PIREPs through the decoder and write NDJSON.
+
+    Args:
+        lines (iterable): Raw PIREP lines
+        out (file): Destination for decoded records, one JSON object per line
+        errors_out (file): Destination for malformed reports (defaults to out)
+        workers (int): Worker processes; 1 decodes in-process
+        batch_size (int): Reports handed to a worker at a time
+
+    Returns:
+        dict: Counts and throughput for the run
+    """
+    errors_out = errors_out or out
+    workers = workers or os.cpu_count() or 1
+    decoded = 0
+    failed = 0
+    started = time.perf_counter()
+
+    batches = iter_batches(lines, batch_size)
+    if workers == 1:
+        pool = None
+        results = map(decode_batch, batches)
+    else:
+        pool = Pool(processes=workers)
+        # imap keeps input order while only holding a few batches in flight
+        results = pool.imap(decode_batch, batches, chunksize=1)
+
+    try:
+        for batch in results:
+            for record in batch:
+                if 'error' in record:
+                    failed += 1
+                    errors_out.write(json.dumps(record) + "\n")
+                else:
+                    decoded += 1
+                    out.write(json.dumps(record) + "\n")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    elapsed = time.perf_counter() - started
+    total = decoded + failed
+    return {
+        'reports': total,
+        'decoded': decoded,
+        'malformed': failed,
+        'elapsed_seconds': round(elapsed, 3),
+        'reports_per_second': round(total / elapsed, 1) if elapsed > 0 else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-decode line-delimited PIREPs to NDJSON")
+    parser.add_argument("input", nargs="?", default="-", help="PIREP file, one report per line (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--errors", help="Write malformed reports here instead of the main output")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r")
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    errors_out = open(args.errors, "w") if args.errors else None
+
+    try:
+        stats = decode_stream(source, out, errors_out, workers=args.workers, batch_size=args.batch_size)
+    finally:
+        for f in (source, out, errors_out):
+            if f and f not in (sys.stdin, sys.stdout):
+                f.close()
+
+    print(f"Decoded {stats['decoded']} PIREPs ({stats['malformed']} malformed) "
+          f"in {stats['elapsed_seconds']}s - {stats['reports_per_second']} reports/sec", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
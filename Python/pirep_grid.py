@@ -0,0 +1,313 @@
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from pirep_parser import parse_pirep, severity_range, SEVERITY_ORDER
+from weather_cache import VAR_DIR
+
+PIREP_GRID_PATH = os.environ.get("PIREP_GRID_PATH", os.path.join(VAR_DIR, 'pirep_grid.db'))
+
+# Grid resolution: 1° cells (~60 NM), 4000 ft flight-level bands, hourly buckets
+CELL_SIZE_DEG = 1.0
+FL_BAND_SIZE = 40
+BUCKET_SECONDS = 3600
+# PIREPs older than this no longer say anything useful about the route
+RETENTION_SECONDS = 3 * 3600
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def offset_position(lat, lng, radial_deg, distance_nm):
+    """Move a point along a radial by a distance in nautical miles"""
+    lat1 = math.radians(lat)
+    lng1 = math.radians(lng)
+    bearing = math.radians(radial_deg)
+    d = distance_nm / EARTH_RADIUS_NM
+
+    lat2 = math.asin(math.sin(lat1) * math.cos(d) +
+                     math.cos(lat1) * math.sin(d) * math.cos(bearing))
+    lng2 = lng1 + math.atan2(math.sin(bearing) * math.sin(d) * math.cos(lat1),
+                             math.cos(d) - math.sin(lat1) * math.sin(lat2))
+    return math.degrees(lat2), (math.degrees(lng2) + 540) % 360 - 180
+
+
+def resolve_location(ov_str, airport_db):
+    """
+    Resolve a PIREP OV field to coordinates using the airport database.
+
+    Args:
+        ov_str (str): OV field, e.g. "UIN134015" or "KORD"
+        airport_db (dict): ICAO -> {'lat', 'lng', ...}
+
+    Returns:
+        tuple: (lat, lng) or None if the reference point is unknown
+    """
+    if not ov_str:
+        return None
+    ov_str = ov_str.strip().upper()
+
+    station = ov_str[:4] if ov_str[:4].isalpha() else ov_str[:3]
+    airport = airport_db.get(station) or airport_db.get('K' + station)
+    if not airport:
+        return None
+
+    suffix = ov_str[len(station):]
+    if len(suffix) >= 6 and suffix[:6].isdigit():
+        return offset_position(airport['lat'], airport['lng'], int(suffix[:3]), int(suffix[3:6]))
+    return airport['lat'], airport['lng']
+
+
+def report_time(tm_str, now):
+    """Turn a PIREP TM field (HHMM UTC) into the most recent matching datetime"""
+    if not tm_str or len(tm_str) < 4 or not tm_str[:4].isdigit():
+        return now
+    observed = now.replace(hour=int(tm_str[:2]) % 24, minute=int(tm_str[2:4]) % 60,
+                           second=0, microsecond=0)
+    if observed > now + timedelta(minutes=5):
+        observed -= timedelta(days=1)
+    return observed
+
+
+def _empty_cell():
+    return {
+        'reports': 0,
+        'turbulence': [0] * len(SEVERITY_ORDER),
+        'icing': [0] * len(SEVERITY_ORDER),
+    }
+
+
+# One count column per severity and kind, in SEVERITY_ORDER
+_TURBULENCE_COLUMNS = [f"turbulence_{i}" for i in range(len(SEVERITY_ORDER))]
+_ICING_COLUMNS = [f"icing_{i}" for i in range(len(SEVERITY_ORDER))]
+_COUNT_COLUMNS = ['reports'] + _TURBULENCE_COLUMNS + _ICING_COLUMNS
+# Route cells per summary query, well under SQLite's bound-parameter limit
+_CELLS_PER_QUERY = 400
+
+
+class PirepGrid:
+    """
+    Incrementally maintained turbulence/icing aggregates keyed by
+    (lat cell, lng cell, flight-level band) with hourly time buckets.
+
+    The aggregates live in SQLite, shared by all workers: PIREPs posted to
+    any worker show up in every worker's briefings.
+    """
+
+    def __init__(self, airport_db, path=PIREP_GRID_PATH, cell_size_deg=CELL_SIZE_DEG,
+                 fl_band_size=FL_BAND_SIZE, bucket_seconds=BUCKET_SECONDS, retention_seconds=RETENTION_SECONDS):
+        self.airport_db = airport_db
+        self.path = path
+        self.cell_size_deg = cell_size_deg
+        self.fl_band_size = fl_band_size
+        self.bucket_seconds = bucket_seconds
+        self.retention_buckets = max(1, retention_seconds // bucket_seconds)
+        self._newest_bucket = None
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS pirep_cells ("
+            " lat_idx INTEGER NOT NULL,"
+            " lng_idx INTEGER NOT NULL,"
+            " band INTEGER NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            + "".join(f" {column} INTEGER NOT NULL DEFAULT 0," for column in _COUNT_COLUMNS) +
+            " PRIMARY KEY (lat_idx, lng_idx, band, bucket))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS pirep_cells_bucket ON pirep_cells (bucket)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _cell_key(self, lat, lng):
+        return (math.floor(lat / self.cell_size_deg), math.floor(lng / self.cell_size_deg))
+
+    def _bucket(self, epoch_seconds):
+        return int(epoch_seconds // self.bucket_seconds)
+
+    def _oldest_live_bucket(self, now_bucket):
+        return now_bucket - self.retention_buckets + 1
+
+    def _place(self, pirep_str, now):
+        """The grid row one raw PIREP adds to, as (lat_idx, lng_idx, band, bucket, *counts), or None"""
+        try:
+            report = parse_pirep(pirep_str)
+        except (IndexError, ValueError):
+            return None
+
+        turbulence = severity_range(report.get('TB'))
+        icing = severity_range(report.get('IC'))
+        if not turbulence and not icing:
+            return None
+
+        position = resolve_location(report.get('OV'), self.airport_db)
+        fl = report.get('FL', '')
+        if not position or not fl[:3].isdigit():
+            return None
+
+        observed = report_time(report.get('TM'), now)
+        bucket = self._bucket(observed.timestamp())
+        if bucket < self._oldest_live_bucket(self._bucket(now.timestamp())):
+            return None
+
+        # Count the worst intensity reported; that's what a route briefing cares about
+        counts = _empty_cell()
+        if turbulence:
+            counts['turbulence'][SEVERITY_ORDER.index(turbulence[1])] = 1
+        if icing:
+            counts['icing'][SEVERITY_ORDER.index(icing[1])] = 1
+        return (*self._cell_key(*position), int(fl[:3]) // self.fl_band_size, bucket,
+                1, *counts['turbulence'], *counts['icing'])
+
+    def _add(self, rows, now):
+        conn = self._connect()
+        now_bucket = self._bucket(now.timestamp())
+        columns = ", ".join(_COUNT_COLUMNS)
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in _COUNT_COLUMNS)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._newest_bucket is None or now_bucket > self._newest_bucket:
+                self._newest_bucket = now_bucket
+                self._expire(conn, now_bucket)
+            conn.executemany(
+                f"INSERT INTO pirep_cells (lat_idx, lng_idx, band, bucket, {columns})"
+                f" VALUES ({', '.join('?' * (4 + len(_COUNT_COLUMNS)))})"
+                f" ON CONFLICT(lat_idx, lng_idx, band, bucket) DO UPDATE SET {updates}",
+                rows
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def ingest(self, pirep_str, now=None):
+        """
+        Parse one raw PIREP and fold its severities into the grid.
+
+        Returns:
+            bool: True if the report was placed in a cell
+        """
+        now = now or datetime.now(timezone.utc)
+        row = self._place(pirep_str, now)
+        if row is None:
+            return False
+        self._add([row], now)
+        return True
+
+    def ingest_many(self, pirep_strs, now=None):
+        """Ingest a batch of raw PIREPs in one transaction, returning (accepted, rejected) counts"""
+        now = now or datetime.now(timezone.utc)
+        rows = [row for row in (self._place(pirep_str, now) for pirep_str in pirep_strs) if row is not None]
+        if rows:
+            self._add(rows, now)
+        return len(rows), len(pirep_strs) - len(rows)
+
+    def expire(self, now=None):
+        """Drop time buckets that have aged out of the retention window"""
+        now = now or datetime.now(timezone.utc)
+        self._expire(self._connect(), self._bucket(now.timestamp()))
+
+    def _expire(self, conn, now_bucket):
+        conn.execute("DELETE FROM pirep_cells WHERE bucket < ?", (self._oldest_live_bucket(now_bucket),))
+
+    def _route_cells(self, route_points):
+        """Grid cells crossed by the straight-line segments of a route"""
+        cells = []
+        seen = set()
+        step = self.cell_size_deg / 2
+        for start, end in zip(route_points, route_points[1:] or route_points):
+            span = max(abs(end.lat - start.lat), abs(end.lng - start.lng))
+            samples = max(1, int(math.ceil(span / step)))
+            for i in range(samples + 1):
+                t = i / samples
+                key = self._cell_key(start.lat + (end.lat - start.lat) * t,
+                                     start.lng + (end.lng - start.lng) * t)
+                if key not in seen:
+                    seen.add(key)
+                    cells.append(key)
+        return cells
+
+    def summarize_route(self, route_points, now=None):
+        """
+        Summarize turbulence and icing along a route by reading only the
+        grid cells the route crosses.
+
+        Args:
+            route_points (list): RoutePoints
+            now (datetime): Reference time for the retention window
+
+        Returns:
+            dict: Worst intensities and counts overall and per flight-level band
+        """
+        now = now or datetime.now(timezone.utc)
+        oldest = self._oldest_live_bucket(self._bucket(now.timestamp()))
+        route_cells = self._route_cells(route_points) if route_points else []
+
+        bands = {}
+        conn = self._connect()
+        sums = ", ".join(f"SUM({column})" for column in _COUNT_COLUMNS)
+        for start in range(0, len(route_cells), _CELLS_PER_QUERY):
+            chunk = route_cells[start:start + _CELLS_PER_QUERY]
+            rows = conn.execute(
+                f"SELECT band, {sums} FROM pirep_cells"
+                f" WHERE (lat_idx, lng_idx) IN (VALUES {', '.join(['(?, ?)'] * len(chunk))}) AND bucket >= ?"
+                f" GROUP BY band",
+                (*(index for key in chunk for index in key), oldest)
+            ).fetchall()
+            for band, reports, *severities in rows:
+                totals = bands.setdefault(band, _empty_cell())
+                totals['reports'] += reports
+                for i in range(len(SEVERITY_ORDER)):
+                    totals['turbulence'][i] += severities[i]
+                    totals['icing'][i] += severities[len(SEVERITY_ORDER) + i]
+
+        overall = _empty_cell()
+        by_flight_level = []
+        for band in sorted(bands):
+            totals = bands[band]
+            if not totals['reports']:
+                continue
+            overall['reports'] += totals['reports']
+            for i in range(len(SEVERITY_ORDER)):
+                overall['turbulence'][i] += totals['turbulence'][i]
+                overall['icing'][i] += totals['icing'][i]
+            by_flight_level.append({
+                'fl_from': band * self.fl_band_size,
+                'fl_to': (band + 1) * self.fl_band_size - 1,
+                **_describe(totals),
+            })
+
+        return {
+            **_describe(overall),
+            'by_flight_level': by_flight_level,
+            'cells_read': len(route_cells),
+            'window_minutes': self.retention_buckets * self.bucket_seconds // 60,
+        }
+
+
+def _describe(totals):
+    def worst(counts):
+        for i in range(len(SEVERITY_ORDER) - 1, -1, -1):
+            if counts[i]:
+                return SEVERITY_ORDER[i]
+        return None
+
+    def as_dict(counts):
+        return {SEVERITY_ORDER[i]: n for i, n in enumerate(counts) if n}
+
+    return {
+        'reports': totals['reports'],
+        'max_turbulence': worst(totals['turbulence']),
+        'turbulence_counts': as_dict(totals['turbulence']),
+        'max_icing': worst(totals['icing']),
+        'icing_counts': as_dict(totals['icing']),
+    }
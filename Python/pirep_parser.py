@@ -9,6 +9,9 @@ TURBULENCE_LEVELS = {
     "NEG": "None reported"
 }
 
+# Turbulence/icing intensities ordered weakest to strongest
+SEVERITY_ORDER = ["NEG", "TRC", "LGT", "MOD", "SEV", "EXTRM"]
+
 # Mapping sky cover codes to full forms
 CLOUD_COVERAGE_FULL = {
     "FEW": "Few clouds",
@@ -75,6 +78,8 @@ REMARKS = {
 def parse_pirep(pirep_str):
     # Split on spaces, first two tokens are station and type
     parts = pirep_str.strip().split()
+    if len(parts) < 2:
+        raise ValueError(f"Malformed PIREP, expected station and report type: '{pirep_str.strip()}'")
     report = {}
     report['station'] = parts[0]
     report['type'] = parts[1]
@@ -107,6 +112,19 @@ def decode_turbulence(turb_str):
     else:
         return f"{level_desc} turbulence"
 
+def severity_range(intensity_str):
+    # Example: "OCNL LGT-MOD 270-290" => ("LGT", "MOD"); works for TB and IC fields
+    if not intensity_str:
+        return None
+    found = []
+    for token in intensity_str.upper().split():
+        for code in token.split('-'):
+            if code in SEVERITY_ORDER:
+                found.append(SEVERITY_ORDER.index(code))
+    if not found:
+        return None
+    return SEVERITY_ORDER[min(found)], SEVERITY_ORDER[max(found)]
+
 def decode_sky(sky_str):
     # Example: "OVC017-TOP020" => "Overcast at 1700 ft, tops at 2000 ft"
     if not sky_str:
@@ -125,6 +143,43 @@ def decode_sky(sky_str):
         result += f", tops at {top_ft} feet"
     return result
 
+def sky_layers(sky_str):
+    # Example: "BKN017-TOP020 OVC080" => [{'cover': 'BKN', 'base_ft': 1700, 'top_ft': 2000}, ...]
+    if not sky_str:
+        return []
+    layers = []
+    for layer in sky_str.upper().split():
+        parts = layer.split('-')
+        cover = parts[0][:3]
+        base = parts[0][3:]
+        top = parts[1][3:] if len(parts) > 1 else ""
+        layers.append({
+            'cover': cover,
+            'base_ft': int(base) * 100 if base.isdigit() else None,
+            'top_ft': int(top) * 100 if top.isdigit() else None
+        })
+    return layers
+
+def weather_codes(wx_str):
+    # Example: "FV03SM -RA BR" => ["RA", "BR"]; flight visibility and intensity are dropped
+    if not wx_str:
+        return []
+    codes = []
+    for p in wx_str.upper().replace(',', ' ').split():
+        code = p.lstrip('+-')
+        if code.isalpha():
+            codes.append(code)
+    return codes
+
+def temperature_c(ta_str):
+    # Example: "M05" => -5, "12" => 12
+    if not ta_str:
+        return None
+    value = ta_str.strip().upper()
+    sign = -1 if value[:1] in ('M', '-') else 1
+    value = value.lstrip('M-+')
+    return sign * int(value) if value.isdigit() else None
+
 def decode_weather(wx_str):
     # Decode weather phenomena abbreviations into full form
     if not wx_str:
@@ -184,7 +239,11 @@ def main():
         sys.exit(1)
     
     pirep_str = sys.argv[1]
-    report = parse_pirep(pirep_str)
+    try:
+        report = parse_pirep(pirep_str)
+    except ValueError as e:
+        print(f"Error parsing PIREP: {e}")
+        sys.exit(1)
 
     print(f"PIREP from station: {report.get('station', 'Unknown')}")
     print(f"Report type: {REPORT_TYPE.get(report.get('type', 'Unknown'), report.get('type', 'Unknown'))}")
@@ -0,0 +1,195 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import metrics
+from rate_limiter import priority
+from service_logging import get_logger
+from upstream_guard import UpstreamUnavailable
+from weather_cache import VAR_DIR, WEATHER_CACHE_TTL
+
+PREFETCH_PATH = os.environ.get("PREFETCH_PATH", os.path.join(VAR_DIR, 'prefetch.db'))
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "1").lower() in ("1", "true", "yes")
+# How many of the most-requested stations to keep warm
+PREFETCH_TOP_N = int(os.environ.get("PREFETCH_TOP_N", "50"))
+# Demand decays with this half-life, so yesterday's busy route doesn't stay hot forever
+PREFETCH_DEMAND_HALF_LIFE = float(os.environ.get("PREFETCH_DEMAND_HALF_LIFE", "3600"))
+# Stations below this decayed request count aren't worth a background fetch
+PREFETCH_MIN_SCORE = float(os.environ.get("PREFETCH_MIN_SCORE", "2"))
+PREFETCH_INTERVAL = float(os.environ.get("PREFETCH_INTERVAL", "15"))
+# Routine METARs are hourly and reach the feed a few minutes after observation time
+METAR_INTERVAL_SECONDS = 3600
+PREFETCH_PUBLISH_DELAY = float(os.environ.get("PREFETCH_PUBLISH_DELAY", "300"))
+# Re-check a station whose new observation hasn't appeared yet after this long
+PREFETCH_RETRY_SECONDS = float(os.environ.get("PREFETCH_RETRY_SECONDS", "120"))
+# Refresh before the shared cache entry expires so briefings never see a miss
+PREFETCH_REFRESH_AGE = WEATHER_CACHE_TTL * 0.8
+PREFETCH_BATCH_SIZE = int(os.environ.get("PREFETCH_BATCH_SIZE", "50"))
+_LEADER_LEASE = 3 * PREFETCH_INTERVAL
+
+PREFETCHED = metrics.Counter('prefetch_stations_total', 'Stations refreshed by the prefetcher, by result',
+                             labels=('result',))
+HOT_STATIONS = metrics.Gauge('prefetch_hot_stations', 'Stations the prefetcher is keeping warm')
+metrics.REGISTRY.extend([PREFETCHED, HOT_STATIONS])
+
+log = get_logger('prefetch')
+
+
+class DemandTracker:
+    """
+    Exponentially decayed request counts per station, shared by all workers
+    through SQLite. Scores are stored as of updated_at and decayed on read.
+    """
+
+    def __init__(self, path=PREFETCH_PATH, half_life=PREFETCH_DEMAND_HALF_LIFE):
+        self.path = path
+        self.decay = math.log(2) / half_life
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS demand (icao TEXT PRIMARY KEY, score REAL, updated_at REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS leader (name TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.create_function("decayed", 2, self._decayed, deterministic=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _decayed(self, score, age):
+        return score * math.exp(-self.decay * max(0.0, age))
+
+    def record(self, icao_codes):
+        """Count one request for each station"""
+        now = time.time()
+        self._connect().executemany(
+            "INSERT INTO demand (icao, score, updated_at) VALUES (?, 1, ?)"
+            " ON CONFLICT(icao) DO UPDATE SET score = decayed(score, excluded.updated_at - updated_at) + 1,"
+            " updated_at = excluded.updated_at",
+            [(icao, now) for icao in set(icao_codes)]
+        )
+
+    def hottest(self, limit=PREFETCH_TOP_N, min_score=PREFETCH_MIN_SCORE):
+        """[(icao, score)] for the most requested stations right now"""
+        now = time.time()
+        return self._connect().execute(
+            "SELECT icao, decayed(score, ? - updated_at) AS current FROM demand"
+            " WHERE current >= ? ORDER BY current DESC LIMIT ?",
+            (now, min_score, limit)
+        ).fetchall()
+
+    def acquire_leadership(self, owner, lease=_LEADER_LEASE):
+        """Take or renew the prefetch lease; only the holder runs the scheduler"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO leader (name, owner, expires_at) VALUES ('prefetch', ?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE leader.owner = excluded.owner OR leader.expires_at < ?",
+            (owner, now + lease, now)
+        )
+        return cursor.rowcount == 1
+
+
+def next_observation_due(observed_at):
+    """When the next routine METAR after observed_at should be available on the feed"""
+    observed = datetime.fromisoformat(observed_at)
+    return observed + timedelta(seconds=METAR_INTERVAL_SECONDS + PREFETCH_PUBLISH_DELAY)
+
+
+class Prefetcher:
+    """
+    Keeps the hottest stations warm in the shared cache. Every interval the
+    lease holder (one worker across the host) picks the top stations by
+    demand and refreshes those that are due, i.e. whose next routine
+    observation should now be published or whose cache entry is close to
+    expiring. It fetches them in bulk requests at background priority, so
+    the shared rate limiter serves interactive briefings first.
+
+    fetch_bulk(icao_codes) returns {icao: raw METAR}; accept(icao, raw)
+    stores a report; latest_observation(icao) returns the stored
+    observation time (ISO) or None.
+    """
+
+    def __init__(self, demand, fetch_bulk, accept, latest_observation, interval=PREFETCH_INTERVAL):
+        self.demand = demand
+        self.fetch_bulk = fetch_bulk
+        self.accept = accept
+        self.latest_observation = latest_observation
+        self.interval = interval
+        self._refreshed_at = {}   # icao -> epoch seconds of our last refresh
+        self._retry_at = {}       # icao -> epoch seconds before which we won't re-check
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if not PREFETCH_ENABLED or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="prefetcher", daemon=True).start()
+
+    def _run(self):
+        owner = f"{os.uname().nodename}:{os.getpid()}"
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.demand.acquire_leadership(owner):
+                    with priority('background'):
+                        self.run_once()
+            except Exception:
+                log.exception("Prefetch pass failed")
+
+    def due(self, icao, now):
+        if now < self._retry_at.get(icao, 0):
+            return False
+        refreshed_at = self._refreshed_at.get(icao)
+        if refreshed_at is None or now - refreshed_at >= PREFETCH_REFRESH_AGE:
+            return True
+        observed_at = self.latest_observation(icao)
+        if observed_at is None:
+            return True
+        expected = next_observation_due(observed_at).timestamp()
+        return now >= expected and refreshed_at < expected
+
+    def run_once(self):
+        """One scheduling pass; returns how many stations got a new observation"""
+        hot = self.demand.hottest()
+        HOT_STATIONS.set(len(hot))
+        now = time.time()
+        due = [icao for icao, _ in hot if self.due(icao, now)]
+        updated = 0
+        for start in range(0, len(due), PREFETCH_BATCH_SIZE):
+            batch = due[start:start + PREFETCH_BATCH_SIZE]
+            try:
+                reports = self.fetch_bulk(batch)
+            except UpstreamUnavailable as e:
+                log.info("Prefetch deferred", extra={'reason': e.reason, 'stations': len(batch)})
+                return updated
+            fetched_at = time.time()
+            for icao in batch:
+                before = self.latest_observation(icao)
+                raw = reports.get(icao)
+                if raw:
+                    self.accept(icao, raw)
+                    self._refreshed_at[icao] = fetched_at
+                new = raw is not None and self.latest_observation(icao) != before
+                if new:
+                    updated += 1
+                    self._retry_at.pop(icao, None)
+                else:
+                    # Not published yet (or not reporting): look again shortly, not every pass
+                    self._retry_at[icao] = fetched_at + PREFETCH_RETRY_SECONDS
+                PREFETCHED.inc('new_observation' if new else ('unchanged' if raw else 'missing'))
+        if due:
+            log.debug("Prefetch pass", extra={'hot': len(hot), 'due': len(due), 'updated': updated})
+        return updated
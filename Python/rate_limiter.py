@@ -0,0 +1,168 @@
+import contextvars
+import itertools
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import deadline
+import metrics
+from upstream_guard import UpstreamUnavailable
+from weather_cache import VAR_DIR
+
+RATE_LIMIT_PATH = os.environ.get("UPSTREAM_RATE_LIMIT_PATH", os.path.join(VAR_DIR, 'rate_limit.db'))
+# aviationweather.gov asks clients to stay under 100 requests/minute; 0 disables the limiter
+UPSTREAM_RATE_PER_SECOND = float(os.environ.get("UPSTREAM_RATE_PER_SECOND", "1.6"))
+UPSTREAM_RATE_BURST = float(os.environ.get("UPSTREAM_RATE_BURST", "20"))
+
+# Highest priority first
+PRIORITIES = ("interactive", "batch", "background")
+# Fraction of the burst each class must leave in the bucket, so lower classes can't drain it
+PRIORITY_RESERVE = {"interactive": 0.0, "batch": 0.2, "background": 0.5}
+# Longest each class waits for a token before giving up
+PRIORITY_MAX_WAIT = {
+    "interactive": float(os.environ.get("UPSTREAM_RATE_WAIT_INTERACTIVE", "5")),
+    "batch": float(os.environ.get("UPSTREAM_RATE_WAIT_BATCH", "30")),
+    "background": float(os.environ.get("UPSTREAM_RATE_WAIT_BACKGROUND", "60")),
+}
+# Waiter rows older than this belong to a process that died mid-wait
+_STALE_WAITER_SECONDS = max(PRIORITY_MAX_WAIT.values()) + 10
+_POLL_SECONDS = 0.05
+
+QUEUE_DEPTH = metrics.Gauge('upstream_rate_limit_queue_depth', 'Upstream calls waiting for a rate-limit token',
+                            labels=('priority',))
+WAIT_SECONDS = metrics.Histogram('upstream_rate_limit_wait_seconds', 'Time spent waiting for a rate-limit token',
+                                 labels=('priority',),
+                                 buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+metrics.REGISTRY.extend([QUEUE_DEPTH, WAIT_SECONDS])
+
+_priority = contextvars.ContextVar('upstream_priority', default="interactive")
+
+
+def current_priority():
+    return _priority.get()
+
+
+def set_priority(name):
+    """Set the priority class for upstream calls made from the current context"""
+    _priority.set(name if name in PRIORITIES else "interactive")
+
+
+@contextmanager
+def priority(name):
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every worker process through SQLite. Refill and
+    take happen in one write transaction. A caller may only take a token when
+    no higher-priority caller anywhere is waiting and the bucket holds more
+    than its class's reserve, so interactive briefings go first and
+    background refreshes only use spare capacity.
+    """
+
+    def __init__(self, path=RATE_LIMIT_PATH, rate=UPSTREAM_RATE_PER_SECOND, burst=UPSTREAM_RATE_BURST):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._local = threading.local()
+        self._waiter_ids = itertools.count()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS bucket (name TEXT PRIMARY KEY, tokens REAL, updated_at REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS waiting (id TEXT PRIMARY KEY, priority INTEGER, since REAL)")
+        conn.execute("INSERT OR IGNORE INTO bucket VALUES ('upstream', ?, ?)", (burst, time.time()))
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _try_take(self, rank):
+        """Take a token if this class may; otherwise return seconds to wait before retrying"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated_at = conn.execute("SELECT tokens, updated_at FROM bucket WHERE name = 'upstream'").fetchone()
+            tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM waiting WHERE priority < ? AND since > ?",
+                (rank, now - _STALE_WAITER_SECONDS)
+            ).fetchone()[0]
+            needed = 1 + PRIORITY_RESERVE[PRIORITIES[rank]] * self.burst
+            took = not ahead and tokens >= needed
+            if took:
+                tokens -= 1
+            conn.execute("UPDATE bucket SET tokens = ?, updated_at = ? WHERE name = 'upstream'", (tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if took:
+            return None
+        return _POLL_SECONDS if ahead else max(_POLL_SECONDS, (needed - tokens) / self.rate)
+
+    def acquire(self, priority_name=None):
+        """
+        Block until a token is available for this priority class.
+
+        Raises:
+            UpstreamUnavailable: No token within the class's maximum wait
+            DeadlineExceeded: The request's deadline came first
+        """
+        if self.rate <= 0:
+            return
+        priority_name = priority_name or current_priority()
+        rank = PRIORITIES.index(priority_name)
+        max_wait, truncated = deadline.clamp(PRIORITY_MAX_WAIT[priority_name])
+        started = time.monotonic()
+        waiter_id = None
+        try:
+            while True:
+                wait = self._try_take(rank)
+                if wait is None:
+                    return
+                waited = time.monotonic() - started
+                if waited + min(wait, _POLL_SECONDS) > max_wait:
+                    if truncated:
+                        raise deadline.DeadlineExceeded()
+                    raise UpstreamUnavailable('rate_limited', retry_after=wait)
+                if waiter_id is None:
+                    waiter_id = f"{os.getpid()}:{threading.get_ident()}:{next(self._waiter_ids)}"
+                    self._connect().execute("INSERT INTO waiting VALUES (?, ?, ?)", (waiter_id, rank, time.time()))
+                    QUEUE_DEPTH.inc(priority_name)
+                # Jitter so waiters in different workers don't retry in lockstep
+                time.sleep(min(wait, max_wait - waited) * random.uniform(0.8, 1.0))
+        finally:
+            if waiter_id is not None:
+                self._connect().execute("DELETE FROM waiting WHERE id = ?", (waiter_id,))
+                QUEUE_DEPTH.dec(priority_name)
+            WAIT_SECONDS.observe(time.monotonic() - started, priority_name)
+
+    def snapshot(self):
+        """Global bucket level and waiters per class, across all workers"""
+        conn = self._connect()
+        now = time.time()
+        tokens, updated_at = conn.execute("SELECT tokens, updated_at FROM bucket WHERE name = 'upstream'").fetchone()
+        waiting = dict(conn.execute(
+            "SELECT priority, COUNT(*) FROM waiting WHERE since > ? GROUP BY priority", (now - _STALE_WAITER_SECONDS,)
+        ).fetchall())
+        return {
+            'rate_per_second': self.rate,
+            'burst': self.burst,
+            'tokens': round(min(self.burst, tokens + max(0.0, now - updated_at) * self.rate), 2),
+            'waiting': {name: waiting.get(rank, 0) for rank, name in enumerate(PRIORITIES)}
+        }
@@ -0,0 +1,161 @@
+import cProfile
+import functools
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import request
+
+from service_logging import get_logger, current_request_id
+
+# Profiling a request requires X-Profile to match this token; unset disables the header entirely
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+# Profile every request to decorated endpoints, e.g. on a staging box
+PROFILE_ALL = os.environ.get("PROFILE_ALL", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(__file__), 'profiles'))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "2")) / 1000.0
+
+PROFILE_MODES = ("cprofile", "sample")
+
+log = get_logger('profiling')
+
+
+class StackSampler:
+    """
+    Sampling profiler for one thread. A background thread snapshots the target
+    thread's stack every interval and counts identical stacks, which maps
+    directly onto the collapsed ("folded") format flame graph tools read.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        """Collapsed stacks, one 'frame;frame;frame count' line per distinct stack"""
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.stacks.items())) + "\n"
+
+
+def _requested_profile():
+    """Return (mode, output) when this request should be profiled, else None"""
+    token = request.headers.get('X-Profile')
+    # Constant-time, so response timing doesn't reveal how much of a guess matched
+    if not PROFILE_ALL and not (PROFILE_TOKEN and token
+                                and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())):
+        return None
+    mode = request.headers.get('X-Profile-Mode', 'cprofile').lower()
+    if mode not in PROFILE_MODES:
+        mode = 'cprofile'
+    output = request.headers.get('X-Profile-Output', 'disk').lower()
+    return mode, 'inline' if output == 'inline' else 'disk'
+
+
+def _file_safe(value):
+    """value reduced to [A-Za-z0-9_-]; request ids come from the client's X-Request-ID"""
+    return re.sub(r'[^A-Za-z0-9_-]', '_', value or '')[:64] or 'request'
+
+
+def _profile_path(name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, name)
+
+
+def _write(name, content):
+    path = _profile_path(name)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def _cprofile_summary(profiler, limit=30):
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(limit)
+    return buffer.getvalue()
+
+
+def profiled(view):
+    """
+    Decorator for Flask views. Unprofiled requests pay one header lookup;
+    profiled ones run under cProfile (deterministic) or StackSampler
+    (sampling) and either save the profile under PROFILE_DIR or return it
+    inline in the JSON body under 'profile'.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        wanted = _requested_profile()
+        if wanted is None:
+            return view(*args, **kwargs)
+
+        mode, output = wanted
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            result = profiler.runcall(view, *args, **kwargs)
+        else:
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+            try:
+                result = view(*args, **kwargs)
+            finally:
+                profiler.stop()
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        response, *rest = result if isinstance(result, tuple) else (result,)
+        stem = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{_file_safe(current_request_id())}-{view.__name__}"
+        profile_info = {'mode': mode, 'elapsed_ms': elapsed_ms}
+
+        if output == 'disk':
+            if mode == 'cprofile':
+                # .prof loads in pstats, snakeviz and flameprof; .txt is the quick read
+                path = _profile_path(f"{stem}.prof")
+                profiler.dump_stats(path)
+                _write(f"{stem}.txt", _cprofile_summary(profiler))
+            else:
+                path = _write(f"{stem}.folded", profiler.folded())
+            response.headers['X-Profile-Path'] = path
+            log.info("Saved request profile", extra={'path': path, **profile_info})
+        elif response.is_json:
+            body = response.get_json()
+            if mode == 'cprofile':
+                profile_info.update({'format': 'pstats-text', 'data': _cprofile_summary(profiler)})
+            else:
+                profile_info.update({'format': 'folded', 'samples': profiler.samples, 'data': profiler.folded()})
+            body['profile'] = profile_info
+            response.set_data(json.dumps(body))
+
+        return (response, *rest) if rest else response
+
+    return wrapper
+
@@ -0,0 +1,124 @@
+import gzip
+import json
+
+from flask import Response
+
+import metrics
+
+# orjson is several times faster than the stdlib encoder; fall back when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Brotli compresses JSON noticeably better than gzip but is optional too
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this aren't worth the CPU to compress
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+RESPONSE_BYTES = metrics.Histogram(
+    'briefing_response_bytes', 'Briefing response body size on the wire', labels=('format', 'encoding'),
+    buckets=(512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+)
+metrics.REGISTRY.append(RESPONSE_BYTES)
+
+
+def encode_default(value):
+    """Encoder fallback: records (briefing_records) serialize through to_dict(), anything else as a string"""
+    to_dict = getattr(value, 'to_dict', None)
+    return to_dict() if to_dict is not None else str(value)
+
+
+def dumps(data, sort_keys=False):
+    """Serialize to compact JSON bytes with the fastest encoder available; sort_keys for a canonical form"""
+    if orjson is not None:
+        # orjson would write every dataclass field; records leave out the ones that aren't set
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, default=encode_default, option=option)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False, sort_keys=sort_keys,
+                      default=encode_default).encode('utf-8')
+
+
+def json_response(data, status=200):
+    """Build a JSON response without jsonify's key sorting and pretty-printing"""
+    return Response(dumps(data), status=status, mimetype='application/json')
+
+
+def select_fields(data, fields):
+    """
+    Keep only the requested fields. Dotted paths select nested keys, e.g.
+    ["weather_data", "extended_route.total_airports"]; 'status' is always kept.
+    """
+    selected = {'status': data.get('status')}
+    for field in fields:
+        source = data
+        target = selected
+        parts = field.split('.')
+        for part in parts[:-1]:
+            source = _as_dict(source)
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            source = _as_dict(source)
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return selected
+
+
+def _as_dict(value):
+    to_dict = getattr(value, 'to_dict', None)
+    return to_dict() if to_dict is not None else value
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, or None"""
+    offered = {}
+    for item in (accept_encoding or "").split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    if brotli is not None and offered.get('br', 0) > 0:
+        return 'br'
+    if offered.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encoding, response_format=None):
+    """
+    Compress a buffered JSON response in place when the client accepts it.
+    Only briefings pass response_format; their size is recorded under it.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    if encoding:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    response.headers.add('Vary', 'Accept-Encoding')
+    if response_format is not None:
+        RESPONSE_BYTES.observe(len(body), response_format, encoding or 'identity')
+    return response
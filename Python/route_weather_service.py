@@ -1,31 +1,94 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
 import json
+import logging
 import math
 import os
+import time
+from array import array
 from datetime import datetime
+from functools import lru_cache
+import deadline
+import metrics
+from request_profiling import profiled
+from response_encoding import json_response, select_fields, compress_response, dumps
+from service_logging import setup_logging, get_logger, get_station_logger, new_request_id
+
+setup_logging()
+log = get_logger('service')
+station_log = get_station_logger()
+
 # Import the get_metar_data function from aviation_api
+from upstream_guard import UpstreamUnavailable
+from rate_limiter import set_priority
 try:
-    from aviation_api import get_metar_data
+    from aviation_api import get_metar_data, get_metar_bulk, UPSTREAM_GUARD
 except ImportError:
-    print("❌ Could not import get_metar_data from aviation_api")
+    UPSTREAM_GUARD = None
+    log.error("Could not import get_metar_data from aviation_api")
     # Define a fallback function for now
     def get_metar_data(airport_id, format_type="raw"):
         return f"Error: Could not fetch METAR for {airport_id}"
+    def get_metar_bulk(airport_ids):
+        return {}
 
 # Import the METAR parsing function
 try:
     from metar_parse import parse_metar_string
-    print("✅ Successfully imported METAR parser")
+    log.info("Successfully imported METAR parser")
 except ImportError:
-    print("❌ Could not import parse_metar_string from metar_parse")
+    log.error("Could not import parse_metar_string from metar_parse")
     # Define a fallback function
     def parse_metar_string(metar_string):
         return f"Error: Could not parse METAR - parser not available"
 
+from pirep_grid import PirepGrid
+from weather_cache import SharedCache
+from weather_store import WeatherStore, WEATHER_STORE_WARM_MAX_AGE, observation_time
+from weather_digest import build_weather_digest, DIGEST_TOKEN_BUDGET
+from station_registry import StationRegistry, STATUS_RANK, UNKNOWN, SILENT
+from negative_cache import NegativeCache, NegativeCacheProber, negative_entry
+from prefetch import DemandTracker, Prefetcher
+from metar_snapshot import SnapshotLoader
+from metar_decode import decode_metar, flight_category, FLIGHT_CATEGORIES
+from flight_categories import classify
+from map_tiles import AirportGrid, TileCache, TILE_STATIONS, parse_bbox, tile_bbox
+from station_events import StationEvents
+from briefing_stream import StationUpdateStream, BRIEFING_STREAM_MAX_STATIONS
+from briefing_delta import BriefingTokens, briefing_versions, build_delta, check_versions
+from briefing_records import RoutePoint, WeatherEntry
+
+# Corridor limits when the caller asks for a digest: one dense line per station
+# costs a fraction of the prose METAR, so far more airports fit in the prompt
+DIGEST_MAX_AIRPORTS_PER_SEGMENT = int(os.environ.get("DIGEST_MAX_AIRPORTS_PER_SEGMENT", "6"))
+DIGEST_MAX_AIRPORTS = int(os.environ.get("DIGEST_MAX_AIRPORTS", "20"))
+
 app = Flask(__name__)
 CORS(app)
 
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+    metrics.start_request()
+    deadline.set_deadline(None)
+    # Briefings are interactive unless the caller marks itself as batch/background work
+    set_priority(request.headers.get('X-Request-Priority', 'interactive'))
+
+@app.after_request
+def finalize_response(response):
+    with metrics.stage_timer('compress'):
+        # Every JSON response is compressed, but only briefings (which set response_format) are measured
+        compress_response(response, request.headers.get('Accept-Encoding'), g.get('response_format'))
+    timings = dict(metrics.request_timings() or {})
+    if 'request_started' in g:
+        timings['total'] = time.perf_counter() - g.request_started
+    if timings:
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
 # Load airport database from JSON file
 def load_airport_database():
     """Load airport database from JSON file"""
@@ -35,7 +98,7 @@ def load_airport_database():
         with open(json_path, 'r') as f:
             return json.load(f)
     except FileNotFoundError:
-        print("⚠️ Could not find airports.json file, using fallback database")
+        log.warning("Could not find airports.json file, using fallback database")
         # Fallback to a minimal database
         return {
             'KLAX': {'name': 'LAX Airport', 'lat': 33.9425, 'lng': -118.4081},
@@ -46,7 +109,302 @@ def load_airport_database():
 
 # Load the airport database
 AIRPORT_DATABASE = load_airport_database()
-print(f"✅ Loaded {len(AIRPORT_DATABASE)} airports from database")
+log.info("Loaded %d airports from database", len(AIRPORT_DATABASE))
+
+# Turbulence/icing aggregates fed by /api/pireps, read per briefing; shared by every worker through SQLite
+PIREP_GRID = PirepGrid(AIRPORT_DATABASE)
+
+# Weather results shared by every worker process on this host
+WEATHER_CACHE = SharedCache()
+
+def weather_cache_key(icao_code):
+    return f"metar:{icao_code}"
+
+# Every fetched report, kept across restarts for warm starts and history
+WEATHER_STORE = WeatherStore()
+
+# Which stations actually issue METARs, so corridor slots go to real observations
+STATION_REGISTRY = StationRegistry()
+log.info("Loaded reporting-station registry", extra=STATION_REGISTRY.counts())
+
+# Change feed of station reports across workers; a station's latest sequence is its version
+STATION_EVENTS = StationEvents()
+
+def build_weather_entry(icao_code, raw_metar_data, fetched_at=None):
+    """Parse a raw METAR into the 'success' entry returned in weather_data"""
+    parse_error = None
+    try:
+        with metrics.stage_timer('parse'):
+            parsed_metar_data = parse_metar_string(raw_metar_data)
+    except Exception as e:
+        parse_error = str(e)
+        parsed_metar_data = f"Parse error: {parse_error}"
+    
+    return WeatherEntry(
+        status='success',
+        metar=raw_metar_data.strip(),
+        parsed_metar=parsed_metar_data,
+        parse_error=parse_error,
+        fetched_at=fetched_at or datetime.now().isoformat()
+    )
+
+def warm_weather_cache():
+    """Load recent METARs from the persistent store into the shared cache after a restart"""
+    latest = WEATHER_STORE.latest_all('metar', max_age_seconds=WEATHER_STORE_WARM_MAX_AGE)
+    if not latest:
+        return 0
+    already_cached = WEATHER_CACHE.get_many([weather_cache_key(icao) for icao in latest])
+    warmed = 0
+    for icao_code, report in latest.items():
+        if weather_cache_key(icao_code) in already_cached:
+            continue
+        WEATHER_CACHE.set(weather_cache_key(icao_code),
+                          build_weather_entry(icao_code, report['raw'], report['fetched_at']).to_dict())
+        warmed += 1
+    return warmed
+
+log.info("Warmed weather cache from persistent store", extra={'stations': warm_weather_cache()})
+
+def accept_metar(icao_code, raw_metar_data):
+    """Record a freshly fetched METAR in the registry, cache and store; returns its entry"""
+    entry = build_weather_entry(icao_code, raw_metar_data)
+    STATION_REGISTRY.record_report(icao_code)
+    WEATHER_CACHE.set(weather_cache_key(icao_code), entry.to_dict())
+    WEATHER_STORE.append(icao_code, 'metar', entry.metar, entry.fetched_at)
+    observed = observation_time(entry.metar)
+    STATION_EVENTS.publish(icao_code, 'metar', entry.metar, observed.timestamp() if observed else None)
+    return entry
+
+def fetch_weather_entry(icao_code):
+    """
+    Fetch one station from upstream and build its weather_data entry,
+    updating the caches, store and station registry with the result.
+    """
+    station_log.debug("Fetching weather", extra={'station': icao_code})
+    try:
+        with metrics.stage_timer('fetch'):
+            raw_metar_data = get_metar_data(icao_code)
+        
+        # Check if the API returned an error message
+        if raw_metar_data.startswith("Error fetching data:"):
+            entry = WeatherEntry(
+                status='error',
+                error=raw_metar_data,
+                error_type='api_error',
+                fetched_at=datetime.now().isoformat()
+            )
+            station_log.info("API error", extra={'station': icao_code, 'error': raw_metar_data})
+            NEGATIVE_CACHE.record_failure(icao_code, entry.error_type, entry.error, entry.fetched_at)
+            return entry
+        
+        # Check if we got empty or invalid data
+        if not raw_metar_data or raw_metar_data.strip() == "":
+            entry = WeatherEntry(
+                status='error',
+                error=f'No METAR data available for {icao_code}. This airport may not be reporting or may not be in the aviationweather.gov database.',
+                error_type='no_data',
+                fetched_at=datetime.now().isoformat()
+            )
+            station_log.info("No METAR data available", extra={'station': icao_code})
+            STATION_REGISTRY.record_no_data(icao_code)
+            NEGATIVE_CACHE.record_failure(icao_code, entry.error_type, entry.error, entry.fetched_at)
+            return entry
+        
+        # Parse the raw METAR data
+        entry = accept_metar(icao_code, raw_metar_data)
+        station_log.debug("Weather fetched", extra={'station': icao_code, 'parse_error': entry.parse_error})
+        return entry
+        
+    except deadline.DeadlineExceeded:
+        station_log.info("Deadline reached while fetching", extra={'station': icao_code})
+        return timed_out_entry(icao_code)
+    except UpstreamUnavailable as e:
+        # Upstream is being protected: answer from the last stored report, or fail fast
+        station_log.info("Upstream unavailable", extra={'station': icao_code, 'reason': e.reason})
+        stored = WEATHER_STORE.latest(icao_code, 'metar')
+        if stored:
+            entry = build_weather_entry(icao_code, stored['raw'], stored['fetched_at'])
+            entry.stale = True
+            entry.observed_at = stored['observed_at']
+            entry.stale_reason = e.reason
+            return entry
+        return WeatherEntry(
+            status='error',
+            error=f"Weather service temporarily unavailable ({e.reason}) for {icao_code}",
+            error_type='upstream_unavailable',
+            fetched_at=datetime.now().isoformat()
+        )
+    except Exception as e:
+        log.exception("Unexpected error fetching weather", extra={'station': icao_code})
+        return WeatherEntry(
+            status='error',
+            error=f"Unexpected error: {str(e)}",
+            error_type='unexpected_error',
+            fetched_at=datetime.now().isoformat()
+        )
+
+def timed_out_entry(icao_code):
+    """weather_data entry for a station the request's deadline didn't leave time for"""
+    return WeatherEntry(
+        status='timed_out',
+        error=f"Briefing deadline reached before weather for {icao_code} was fetched",
+        error_type='timed_out',
+        fetched_at=datetime.now().isoformat()
+    )
+
+# Stations that just failed are answered from here and retried in the background
+NEGATIVE_CACHE = NegativeCache()
+NEGATIVE_PROBER = NegativeCacheProber(NEGATIVE_CACHE, fetch_weather_entry)
+
+def latest_observation(icao_code):
+    stored = WEATHER_STORE.latest(icao_code, 'metar')
+    return stored['observed_at'] if stored else None
+
+# Popular stations are refreshed in bulk as new observations come out, so briefings hit the cache
+STATION_DEMAND = DemandTracker()
+PREFETCHER = Prefetcher(STATION_DEMAND, get_metar_bulk, accept_metar, latest_observation)
+
+def publish_snapshot_changes(snapshot):
+    """
+    Publish the stations whose report changed in a newly loaded snapshot, so
+    open briefing streams and map tiles pick them up. Their cached entries
+    are dropped so briefings answer from the snapshot instead.
+    """
+    changed = [weather_cache_key(icao_code) for icao_code, _ in
+               STATION_EVENTS.publish_many('metar', snapshot.station_reports())]
+    for start in range(0, len(changed), _CACHE_LOOKUP_CHUNK):
+        WEATHER_CACHE.delete_many(changed[start:start + _CACHE_LOOKUP_CHUNK])
+    log.info("Published METAR snapshot changes", extra={'stations': len(changed)})
+
+# Whole-network METAR dump held in memory per worker (opt-in: METAR_SNAPSHOT_URL and _INTERVAL)
+METAR_SNAPSHOT = SnapshotLoader(AIRPORT_DATABASE,
+                                rate_limiter=UPSTREAM_GUARD.rate_limiter if UPSTREAM_GUARD else None,
+                                on_load=publish_snapshot_changes)
+
+# The airport table as columns, in the same order as the snapshot's
+STATION_CODES = tuple(AIRPORT_DATABASE)
+STATION_LAT = array('d', (AIRPORT_DATABASE[icao]['lat'] for icao in STATION_CODES))
+STATION_LNG = array('d', (AIRPORT_DATABASE[icao]['lng'] for icao in STATION_CODES))
+AIRPORT_GRID = AirportGrid(STATION_LAT, STATION_LNG)
+# Rendered map tiles, each valid until one of its stations changes
+TILE_CACHE = TileCache()
+
+# Per-station and per-section versions of recent briefings, for delta refreshes
+BRIEFING_TOKENS = BriefingTokens(WEATHER_CACHE)
+# SQLite caps bound parameters per statement
+_CACHE_LOOKUP_CHUNK = 500
+
+@lru_cache(maxsize=4096)
+def decoded_report(raw_metar):
+    """decode_metar() remembered per report text, since cached reports repeat; don't modify the result"""
+    return decode_metar(raw_metar)
+
+def cached_reports(positions):
+    """{position: raw METAR} for airport positions with a successful report in the shared cache"""
+    reports = {}
+    for start in range(0, len(positions), _CACHE_LOOKUP_CHUNK):
+        chunk = positions[start:start + _CACHE_LOOKUP_CHUNK]
+        cached = WEATHER_CACHE.get_many([weather_cache_key(STATION_CODES[i]) for i in chunk])
+        for i in chunk:
+            entry = cached.get(weather_cache_key(STATION_CODES[i]))
+            if entry and entry.get('status') == 'success':
+                reports[i] = entry['metar']
+    return reports
+
+def station_categories(positions):
+    """
+    Flight category index for each airport position, classified in one pass.
+    Reads the METAR snapshot when there is a fresh one and falls back to the
+    shared weather cache for the rest; stations with neither are UNKNOWN.
+    """
+    count = len(positions)
+    ceiling = array('i', [-1]) * count
+    visibility = array('d', [math.nan]) * count
+    has_report = [False] * count
+    
+    snapshot = METAR_SNAPSHOT.fresh()
+    missing = []
+    for n, i in enumerate(positions):
+        if snapshot is not None and snapshot.raw[i] is not None:
+            ceiling[n] = snapshot.ceiling_ft[i]
+            visibility[n] = snapshot.visibility_sm[i]
+            has_report[n] = True
+        else:
+            missing.append(n)
+    
+    reports = cached_reports([positions[n] for n in missing])
+    for n in missing:
+        decoded = decoded_report(reports[positions[n]]) if positions[n] in reports else None
+        if not decoded:
+            continue
+        ceiling[n] = -1 if decoded['ceiling_ft'] is None else decoded['ceiling_ft']
+        visibility[n] = math.nan if decoded['visibility_sm'] is None else decoded['visibility_sm']
+        has_report[n] = True
+    
+    return classify(ceiling, visibility, has_report)
+
+def station_weather(positions):
+    """
+    Latest decoded weather per airport position, from the snapshot or the
+    shared cache, in the shape of MetarSnapshot.get(); None without a report.
+    """
+    snapshot = METAR_SNAPSHOT.fresh()
+    rows = [snapshot.get(STATION_CODES[i]) if snapshot is not None else None for i in positions]
+    reports = cached_reports([i for i, row in zip(positions, rows) if row is None])
+    for n, i in enumerate(positions):
+        decoded = decoded_report(reports[i]) if rows[n] is None and i in reports else None
+        if not decoded:
+            continue
+        observed = observation_time(reports[i])
+        rows[n] = {
+            'station': STATION_CODES[i],
+            'observed_at': observed.isoformat() if observed else None,
+            'raw': reports[i],
+            'wind_dir': decoded['wind_dir'],
+            'wind_kt': decoded['wind_kt'],
+            'gust_kt': decoded['gust_kt'],
+            'visibility_sm': decoded['visibility_sm'],
+            'ceiling_ft': decoded['ceiling_ft'],
+            'temp_c': decoded['temp_c'],
+            'flight_category': flight_category(decoded['ceiling_ft'], decoded['visibility_sm']),
+        }
+    return rows
+
+def tile_response(cache_key, bbox, area):
+    """
+    Stations in bbox with their latest weather. The serialized body is cached
+    per tile under the newest change sequence of its stations plus the
+    snapshot in use, so any station update rebuilds it; the same version is
+    sent as an ETag so browsers can revalidate for free.
+    """
+    positions = AIRPORT_GRID.query(bbox)
+    snapshot = METAR_SNAPSHOT.fresh()
+    versions = STATION_EVENTS.versions([STATION_CODES[i] for i in positions])
+    version = (max(versions.values(), default=0), snapshot.loaded_at if snapshot is not None else None)
+    etag = f"{version[0]}-{int((version[1] or 0) * 1000)}"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    body = TILE_CACHE.get(cache_key, version)
+    metrics.record_cache('tile', body is not None)
+    if body is None:
+        stations = []
+        for i, weather in zip(positions, station_weather(positions)):
+            stations.append({
+                'icao': STATION_CODES[i],
+                'name': AIRPORT_DATABASE[STATION_CODES[i]].get('name'),
+                'lat': STATION_LAT[i],
+                'lng': STATION_LNG[i],
+                'weather': weather
+            })
+        TILE_STATIONS.observe(len(stations))
+        body = dumps({'status': 'success', **area, 'stations': stations})
+        TILE_CACHE.put(cache_key, version, body)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
 
 def get_weather_for_route(icao_codes):
     """
@@ -56,72 +414,49 @@ def get_weather_for_route(icao_codes):
         icao_codes (list): List of ICAO airport codes
     
     Returns:
-        dict: Weather data for all airports
+        dict: ICAO code -> WeatherEntry
     """
+    NEGATIVE_PROBER.ensure_started()
+    PREFETCHER.ensure_started()
+    METAR_SNAPSHOT.ensure_started()
+    STATION_DEMAND.record(icao_codes)
+    snapshot = METAR_SNAPSHOT.fresh()
     weather_data = {}
+    cached = WEATHER_CACHE.get_many([weather_cache_key(icao_code) for icao_code in icao_codes])
+    misses = [icao_code for icao_code in icao_codes if weather_cache_key(icao_code) not in cached]
+    failing = NEGATIVE_CACHE.get_many(misses)
     
     for icao_code in icao_codes:
-        print(f"🌤️ Fetching weather for {icao_code}...")
-        try:
-            raw_metar_data = get_metar_data(icao_code)
-            
-            # Check if the API returned an error message
-            if raw_metar_data.startswith("Error fetching data:"):
-                weather_data[icao_code] = {
-                    'status': 'error',
-                    'error': raw_metar_data,
-                    'error_type': 'api_error',
-                    'metar': None,
-                    'parsed_metar': None,
-                    'fetched_at': datetime.now().isoformat()
-                }
-                print(f"   ❌ API Error: {icao_code} - {raw_metar_data}")
-                continue
-            
-            # Check if we got empty or invalid data
-            if not raw_metar_data or raw_metar_data.strip() == "":
-                weather_data[icao_code] = {
-                    'status': 'error',
-                    'error': f'No METAR data available for {icao_code}. This airport may not be reporting or may not be in the aviationweather.gov database.',
-                    'error_type': 'no_data',
-                    'metar': None,
-                    'parsed_metar': None,
-                    'fetched_at': datetime.now().isoformat()
-                }
-                print(f"   ❌ No Data: {icao_code} - No METAR data available")
-                continue
-            
-            # Parse the raw METAR data
-            parsed_metar_data = None
-            parse_status = ""
-            parse_error = None
-            
-            try:
-                parsed_metar_data = parse_metar_string(raw_metar_data)
-                parse_status = " (parsed successfully)"
-            except Exception as parse_error:
-                parse_status = f" (parse error: {str(parse_error)})"
-                parsed_metar_data = f"Parse error: {str(parse_error)}"
-            
-            weather_data[icao_code] = {
-                'status': 'success',
-                'metar': raw_metar_data.strip(),
-                'parsed_metar': parsed_metar_data,
-                'parse_error': str(parse_error) if parse_error else None,
-                'fetched_at': datetime.now().isoformat()
-            }
-            print(f"   ✅ Success: {icao_code}{parse_status}")
-            
-        except Exception as e:
-            weather_data[icao_code] = {
-                'status': 'error',
-                'error': f"Unexpected error: {str(e)}",
-                'error_type': 'unexpected_error',
-                'metar': None,
-                'parsed_metar': None,
-                'fetched_at': datetime.now().isoformat()
-            }
-            print(f"   ❌ Unexpected Error: {icao_code} - {str(e)}")
+        cached_entry = cached.get(weather_cache_key(icao_code))
+        metrics.record_cache('weather', cached_entry is not None)
+        if cached_entry is not None:
+            entry = WeatherEntry.from_dict(cached_entry)
+            entry.cached = True
+            weather_data[icao_code] = entry
+            continue
+        
+        report = snapshot.get(icao_code) if snapshot is not None else None
+        if snapshot is not None:
+            metrics.record_cache('snapshot', report is not None)
+        if report is not None:
+            entry = build_weather_entry(icao_code, report['raw'], datetime.fromtimestamp(snapshot.loaded_at).isoformat())
+            WEATHER_CACHE.set(weather_cache_key(icao_code), entry.to_dict())
+            entry.observed_at = report['observed_at']
+            entry.source = 'snapshot'
+            weather_data[icao_code] = entry
+            continue
+        
+        metrics.record_cache('negative', icao_code in failing)
+        if icao_code in failing:
+            weather_data[icao_code] = negative_entry(failing[icao_code])
+            continue
+        
+        # Out of time: return what we have instead of starting another fetch
+        if deadline.expired():
+            weather_data[icao_code] = timed_out_entry(icao_code)
+            continue
+        
+        weather_data[icao_code] = fetch_weather_entry(icao_code)
     
     return weather_data
 
@@ -188,61 +523,64 @@ def find_airports_along_route(start_point, end_point, max_distance_from_path=50,
     
     for icao, airport in AIRPORT_DATABASE.items():
         # Skip if it's one of the route endpoints
-        if icao == start_point['icao'] or icao == end_point['icao']:
+        if icao == start_point.icao or icao == end_point.icao:
             continue
             
         # Calculate distance from airport to the flight path
         distance_from_path = calculate_distance_from_line(
             airport['lat'], airport['lng'],
-            start_point['lat'], start_point['lng'],
-            end_point['lat'], end_point['lng']
+            start_point.lat, start_point.lng,
+            end_point.lat, end_point.lng
         )
         
         # Check if airport is within 50 NM of the flight path
         if distance_from_path <= max_distance_from_path:
             # Calculate distances to start and end points
             distance_to_start = calculate_great_circle_distance(
-                start_point['lat'], start_point['lng'],
+                start_point.lat, start_point.lng,
                 airport['lat'], airport['lng']
             )
             
             distance_to_end = calculate_great_circle_distance(
-                end_point['lat'], end_point['lng'],
+                end_point.lat, end_point.lng,
                 airport['lat'], airport['lng']
             )
             
             # Calculate total route distance
             total_route_distance = calculate_great_circle_distance(
-                start_point['lat'], start_point['lng'],
-                end_point['lat'], end_point['lng']
+                start_point.lat, start_point.lng,
+                end_point.lat, end_point.lng
             )
             
             # Check if airport is reasonably between the two points
             # (distance to start + distance to end shouldn't be much more than direct distance)
             if (distance_to_start + distance_to_end) <= (total_route_distance * 1.15):  # 15% tolerance (stricter)
-                airports_along_route.append({
-                    'icao': icao,
-                    'name': airport['name'],
-                    'lat': airport['lat'],
-                    'lng': airport['lng'],
-                    'type': 'intermediate',
-                    'distance_from_path': round(distance_from_path, 2),
-                    'distance_to_start': round(distance_to_start, 2),
-                    'distance_to_end': round(distance_to_end, 2)
-                })
+                airports_along_route.append(RoutePoint(
+                    icao=icao,
+                    name=airport['name'],
+                    lat=airport['lat'],
+                    lng=airport['lng'],
+                    type='intermediate',
+                    distance_from_path=round(distance_from_path, 2),
+                    distance_to_start=round(distance_to_start, 2),
+                    distance_to_end=round(distance_to_end, 2)
+                ))
     
-    # Sort by distance from start point
-    airports_along_route.sort(key=lambda x: x['distance_to_start'])
-    
-    # Limit to max_airports to prevent token issues
+    # Limit to max_airports to prevent token issues, preferring stations known to report
+    if len(airports_along_route) > max_airports:
+        statuses = STATION_REGISTRY.statuses()
+        airports_along_route.sort(key=lambda x: (STATUS_RANK[statuses.get(x.icao, UNKNOWN)], x.distance_to_start))
     limited_airports = airports_along_route[:max_airports]
     
+    # Sort by distance from start point
+    limited_airports.sort(key=lambda x: x.distance_to_start)
+    
     if len(airports_along_route) > max_airports:
-        print(f"   ⚡ Limited to {max_airports} airports (found {len(airports_along_route)} total)")
+        log.debug("Limited corridor airports", extra={'limit': max_airports, 'found': len(airports_along_route)})
     
     return limited_airports
 
-def generate_complete_route_with_intermediates(route_points):
+def generate_complete_route_with_intermediates(route_points, max_airports_per_segment=3, max_total_airports=8):
     """Generate complete route including intermediate airports within 50 NM"""
     
     complete_route = []
@@ -254,14 +592,17 @@ def generate_complete_route_with_intermediates(route_points):
         # Add start point
         complete_route.append(start_point)
         
-        print(f"🔍 Finding airports within 50 NM between {start_point['icao']} and {end_point['icao']}...")
+        log.debug("Finding airports within 50 NM", extra={'start': start_point.icao, 'end': end_point.icao})
         
-        # Find intermediate airports within 50 NM (limited to 3 per segment)
-        intermediate_airports = find_airports_along_route(start_point, end_point, max_distance_from_path=50, max_airports=3)
+        # Find intermediate airports within 50 NM (limited per segment)
+        intermediate_airports = find_airports_along_route(start_point, end_point, max_distance_from_path=50,
+                                                          max_airports=max_airports_per_segment)
         
-        print(f"   Found {len(intermediate_airports)} airports within 50 NM of flight path")
-        for airport in intermediate_airports:
-            print(f"   - {airport['icao']}: {airport['distance_from_path']:.1f} NM from path")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Found airports within 50 NM of flight path", extra={
+                'count': len(intermediate_airports),
+                'airports': ", ".join(f"{a.icao}@{a.distance_from_path:.1f}NM" for a in intermediate_airports)
+            })
         
         # Add intermediate airports to route
         complete_route.extend(intermediate_airports)
@@ -269,17 +610,26 @@ def generate_complete_route_with_intermediates(route_points):
     # Add final destination
     complete_route.append(route_points[-1])
     
-    # Global limit to prevent too many airports total
-    max_total_airports = 8  # Conservative limit for API processing
+    # Global limit to prevent too many airports total (conservative for API processing)
     if len(complete_route) > max_total_airports:
-        print(f"⚡ Route has {len(complete_route)} airports, limiting to {max_total_airports} for API efficiency")
+        log.debug("Limiting route airports for API efficiency",
+                  extra={'found': len(complete_route), 'limit': max_total_airports})
         
         # Keep departure and destination, select intermediate airports evenly
         departure = complete_route[0]
         destination = complete_route[-1]
         intermediates = complete_route[1:-1]
         
+        # Drop silent, then unverified, corridor airports while enough others remain to fill the slots
+        statuses = STATION_REGISTRY.statuses()
+        for excluded_status in (SILENT, UNKNOWN):
+            preferred = [a for a in intermediates if a.type != 'intermediate'
+                         or STATUS_RANK[statuses.get(a.icao, UNKNOWN)] < STATUS_RANK[excluded_status]]
+            if len(preferred) >= max_total_airports - 2:
+                intermediates = preferred
+        
         # Select evenly spaced intermediate airports
+        selected_intermediates = intermediates
         if len(intermediates) > (max_total_airports - 2):
             step = len(intermediates) / (max_total_airports - 2)
             selected_intermediates = []
@@ -287,35 +637,95 @@ def generate_complete_route_with_intermediates(route_points):
                 index = int(i * step)
                 if index < len(intermediates):
                     selected_intermediates.append(intermediates[index])
-            
-            complete_route = [departure] + selected_intermediates + [destination]
-            print(f"   Selected airports: {[airport['icao'] for airport in complete_route]}")
+        
+        complete_route = [departure] + selected_intermediates + [destination]
+        log.debug("Selected airports", extra={'airports': [airport.icao for airport in complete_route]})
     
     return complete_route
 
 def convert_icao_to_route_points(icao_codes):
-    """Convert ICAO codes to RoutePoint objects using the airport database"""
+    """Convert ICAO codes to RoutePoints using the airport database"""
     route_points = []
     
     for i, icao in enumerate(icao_codes):
         if icao in AIRPORT_DATABASE:
             airport = AIRPORT_DATABASE[icao]
-            route_point = {
-                'icao': icao,
-                'name': airport.get('name', icao),
-                'lat': airport['lat'],
-                'lng': airport['lng'],
-                'type': 'departure' if i == 0 else ('destination' if i == len(icao_codes) - 1 else 'waypoint')
-            }
+            route_point = RoutePoint(
+                icao=icao,
+                name=airport.get('name', icao),
+                lat=airport['lat'],
+                lng=airport['lng'],
+                type='departure' if i == 0 else ('destination' if i == len(icao_codes) - 1 else 'waypoint')
+            )
             route_points.append(route_point)
-            print(f"   ✅ Found {icao}: {airport['lat']:.4f}, {airport['lng']:.4f}")
+            log.debug("Found airport", extra={'icao': icao, 'lat': airport['lat'], 'lng': airport['lng']})
         else:
-            print(f"   ❌ Airport {icao} not found in database")
+            log.info("Airport not found in database", extra={'icao': icao})
             # You might want to handle this case - skip or use default coordinates
             
     return route_points
 
+RESPONSE_FORMATS = ('full', 'compact')
+
+def summarize_weather(weather_data, total_queried):
+    """Success/failure/timed-out counts for a briefing's weather data, in a single pass"""
+    successful = failed = timed_out = 0
+    for entry in weather_data.values():
+        status = entry.status
+        if status == 'success':
+            successful += 1
+        elif status == 'error':
+            failed += 1
+        elif status == 'timed_out':
+            timed_out += 1
+    return {
+        'total_airports_queried': total_queried,
+        'successful_weather_fetches': successful,
+        'failed_weather_fetches': failed,
+        'timed_out_weather_fetches': timed_out,
+        'weather_fetch_success_rate': round(successful / len(weather_data) * 100, 1) if weather_data else 0
+    }
+
+def compact_briefing(response_data):
+    """
+    Rewrite a full briefing so each airport appears once in a top-level
+    'airports' table and every other airport list holds indexes into it.
+    The full format repeats each airport up to four times.
+    """
+    airports = []
+    index_by_icao = {}
+    for point in response_data['extended_route']['all_points'] + response_data['original_route']['points']:
+        if point.icao not in index_by_icao:
+            index_by_icao[point.icao] = len(airports)
+            airports.append(point)
+
+    def indexes(items):
+        return [index_by_icao[item if isinstance(item, str) else item.icao] for item in items]
+
+    briefing_airports = response_data['weather_briefing_airports']
+    original_route = response_data['original_route']
+    extended_route = response_data['extended_route']
+    return {
+        **response_data,
+        'format': 'compact',
+        'airports': airports,
+        'weather_briefing_airports': {
+            'airports': indexes(briefing_airports['icao_codes']),
+            'original_route': indexes(briefing_airports['original_route_icao']),
+            'intermediate_within_50nm': indexes(briefing_airports['intermediate_icao_within_50nm']),
+            'total_count': briefing_airports['total_count']
+        },
+        'original_route': {**original_route, 'points': indexes(original_route['points'])},
+        'extended_route': {
+            **extended_route,
+            'all_points': indexes(extended_route['all_points']),
+            'original_airports': indexes(extended_route['original_airports']),
+            'intermediate_airports': indexes(extended_route['intermediate_airports'])
+        }
+    }
+
 @app.route('/api/generate-briefing', methods=['POST'])
+@profiled
 def receive_route_coordinates():
     """API endpoint to receive route coordinates and find intermediate airports within 50 NM"""
     try:
@@ -323,20 +733,84 @@ def receive_route_coordinates():
         
         if not briefing_request:
             return jsonify({'error': 'Invalid request - no data provided'}), 400
+
+        # Optional response shaping: 'compact' references airports by index, 'fields' keeps a subset
+        response_format = briefing_request.get('format') or request.args.get('format', 'full')
+        if response_format not in RESPONSE_FORMATS:
+            return jsonify({'error': f"Invalid format - expected one of {', '.join(RESPONSE_FORMATS)}"}), 400
+        g.response_format = response_format
+        fields = briefing_request.get('fields') or request.args.get('fields')
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        elif fields and not (isinstance(fields, list) and all(isinstance(f, str) for f in fields)):
+            return jsonify({'error': 'Invalid fields - expected a list of field names or a comma-separated string'}), 400
+
+        # Deadline for the whole briefing: the configured default, or what the client asks for up to the max
+        requested_deadline_ms = briefing_request.get('deadlineMs')
+        if requested_deadline_ms is None:
+            requested_deadline_ms = request.headers.get('X-Request-Deadline-Ms')
+        if requested_deadline_ms is not None:
+            try:
+                if isinstance(requested_deadline_ms, bool):
+                    raise TypeError(requested_deadline_ms)
+                requested_deadline_ms = float(requested_deadline_ms)
+            except (TypeError, ValueError):
+                requested_deadline_ms = None
+            # nan/inf parse as floats but are no deadline (nan would also fail in round())
+            if requested_deadline_ms is None or not math.isfinite(requested_deadline_ms) or requested_deadline_ms <= 0:
+                return jsonify({'error': 'Invalid deadlineMs - expected a positive number of milliseconds'}), 400
+            budget_seconds = min(requested_deadline_ms / 1000.0, deadline.BRIEFING_DEADLINE_MAX_SECONDS)
+        else:
+            budget_seconds = deadline.BRIEFING_DEADLINE_SECONDS
+        deadline.set_deadline(budget_seconds - (time.perf_counter() - g.request_started))
+
+        # digest: true (default budget) or a token budget for the LLM weather digest
+        digest = briefing_request.get('digest')
+        digest_budget = None
+        if digest is True:
+            digest_budget = DIGEST_TOKEN_BUDGET
+        elif digest:
+            if not isinstance(digest, int) or digest <= 0:
+                return jsonify({'error': 'Invalid digest - expected true or a positive token budget'}), 400
+            digest_budget = digest
+        
+        # Delta refresh: 'delta': true asks for a briefing_token (and 'versions': true for the versions
+        # themselves); a refresh sends the token or {'stations': {icao: version}, 'sections': {...}} as 'since'
+        since = briefing_request.get('since')
+        if since is not None and not isinstance(since, (str, dict)):
+            return jsonify({'error': 'Invalid since - expected a briefing token or a versions object'}), 400
+        if isinstance(since, dict):
+            try:
+                check_versions(since)
+            except ValueError as e:
+                return jsonify({'error': f'Invalid since - {e}'}), 400
+        # A delta keys stations by ICAO and carries only some sections, which the compact layout can't index
+        if since is not None and response_format == 'compact':
+            return jsonify({'error': 'Invalid since - delta refreshes use the full format, not compact'}), 400
+        wants_versions = bool(briefing_request.get('versions') or isinstance(since, dict))
+        refreshable = bool(briefing_request.get('delta') or wants_versions or since is not None)
         
         # Handle both formats: RoutePoint objects or simple ICAO string array
         if 'route' in briefing_request and isinstance(briefing_request['route'], list):
             # Check if we have RoutePoint objects with valid coordinates
             route_points = briefing_request['route']
+            if not all(isinstance(point, dict) for point in route_points):
+                return jsonify({'error': 'Invalid route - route points must be objects'}), 400
             
             # Check if all route points have zero coordinates (from frontend conversion)
             has_valid_coords = any(point.get('lat', 0) != 0 or point.get('lng', 0) != 0 for point in route_points)
             
-            if not has_valid_coords:
+            if has_valid_coords:
+                try:
+                    route_points = [RoutePoint.from_dict(point) for point in route_points]
+                except ValueError as e:
+                    return jsonify({'error': f'Invalid route - {e}'}), 400
+            else:
                 # Extract ICAO codes and look them up in our database
                 icao_codes = [point.get('icao', '') for point in route_points if point.get('icao')]
-                print(f"🔍 Converting ICAO codes to coordinates: {icao_codes}")
-                route_points = convert_icao_to_route_points(icao_codes)
+                log.debug("Converting ICAO codes to coordinates", extra={'icao_codes': icao_codes})
+                with metrics.stage_timer('lookup'):
+                    route_points = convert_icao_to_route_points(icao_codes)
                 
                 if not route_points:
                     return jsonify({'error': 'No valid airports found in database'}), 400
@@ -344,54 +818,60 @@ def receive_route_coordinates():
         elif 'routeString' in briefing_request:
             # Handle simple ICAO string array
             icao_codes = briefing_request['routeString']
-            print(f"🔍 Converting ICAO string array to coordinates: {icao_codes}")
-            route_points = convert_icao_to_route_points(icao_codes)
+            log.debug("Converting ICAO string array to coordinates", extra={'icao_codes': icao_codes})
+            with metrics.stage_timer('lookup'):
+                route_points = convert_icao_to_route_points(icao_codes)
             
             if not route_points:
                 return jsonify({'error': 'No valid airports found in database'}), 400
         else:
             return jsonify({'error': 'Invalid request - route or routeString required'}), 400
         
-        route_string = briefing_request.get('routeString', [point['icao'] for point in route_points])
+        route_string = briefing_request.get('routeString', [point.icao for point in route_points])
         total_distance = briefing_request.get('totalDistance', 0)
         estimated_flight_time = briefing_request.get('estimatedFlightTime', 0)
         
-        print("📍 Received Route Coordinates:")
-        print(f"   Route String: {route_string}")
-        print(f"   Total Distance: {total_distance} NM")
-        print(f"   Estimated Flight Time: {estimated_flight_time} minutes")
-        
-        for i, point in enumerate(route_points):
-            print(f"   {i+1}. {point['icao']} ({point['type']}): {point['lat']:.4f}, {point['lng']:.4f}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Received route coordinates", extra={
+                'route_string': route_string,
+                'total_distance_nm': total_distance,
+                'estimated_flight_time_min': estimated_flight_time,
+                'points': ", ".join(f"{p.icao}({p.type}) {p.lat:.4f},{p.lng:.4f}" for p in route_points)
+            })
         
         # Generate complete route with intermediate airports (within 50 NM)
-        complete_route = generate_complete_route_with_intermediates(route_points)
+        with metrics.stage_timer('corridor'):
+            if digest_budget:
+                complete_route = generate_complete_route_with_intermediates(
+                    route_points, DIGEST_MAX_AIRPORTS_PER_SEGMENT, DIGEST_MAX_AIRPORTS)
+            else:
+                complete_route = generate_complete_route_with_intermediates(route_points)
         
         # Separate original route from intermediate airports
-        original_airports = [p for p in complete_route if p['type'] != 'intermediate']
-        intermediate_airports = [p for p in complete_route if p['type'] == 'intermediate']
+        original_airports = [p for p in complete_route if p.type != 'intermediate']
+        intermediate_airports = [p for p in complete_route if p.type == 'intermediate']
         
         # Extract only ICAO codes for weather briefing
-        original_icao_codes = [airport['icao'] for airport in original_airports]
-        intermediate_icao_codes = [airport['icao'] for airport in intermediate_airports]
+        original_icao_codes = [airport.icao for airport in original_airports]
+        intermediate_icao_codes = [airport.icao for airport in intermediate_airports]
         all_icao_codes_within_50nm = original_icao_codes + intermediate_icao_codes
         
-        print(f"\n✅ Complete Route Analysis (50 NM Filter):")
-        print(f"   Original airports: {len(original_airports)}")
-        print(f"   Intermediate airports within 50 NM: {len(intermediate_airports)}")
-        print(f"   Total airports in extended route: {len(complete_route)}")
-        print(f"   ICAO codes for weather briefing: {', '.join(all_icao_codes_within_50nm)}")
+        log.debug("Complete route analysis (50 NM filter)", extra={
+            'original_airports': len(original_airports),
+            'intermediate_airports': len(intermediate_airports),
+            'total_airports': len(complete_route),
+            'icao_codes': ",".join(all_icao_codes_within_50nm)
+        })
         
         # Get weather data for all airports
-        print(f"\n🌤️ Fetching weather data for {len(all_icao_codes_within_50nm)} airports...")
         weather_data = get_weather_for_route(all_icao_codes_within_50nm)
         
         # Calculate new total distance including intermediates
         total_extended_distance = 0
         for i in range(len(complete_route) - 1):
             segment_distance = calculate_great_circle_distance(
-                complete_route[i]['lat'], complete_route[i]['lng'],
-                complete_route[i + 1]['lat'], complete_route[i + 1]['lng']
+                complete_route[i].lat, complete_route[i].lng,
+                complete_route[i + 1].lat, complete_route[i + 1].lng
             )
             total_extended_distance += segment_distance
         
@@ -405,6 +885,7 @@ def receive_route_coordinates():
                 'total_count': len(all_icao_codes_within_50nm)
             },
             'weather_data': weather_data,  # Add weather data to response
+            'turbulence_summary': PIREP_GRID.summarize_route(complete_route),
             'filter_criteria': {
                 'max_distance_from_path_nm': 50,
                 'tolerance_percentage': 15
@@ -425,37 +906,198 @@ def receive_route_coordinates():
             },
             'analysis': {
                 'intermediate_airports_found': len(intermediate_airports),
-                'max_distance_from_path': max([a['distance_from_path'] for a in intermediate_airports]) if intermediate_airports else 0,
-                'min_distance_from_path': min([a['distance_from_path'] for a in intermediate_airports]) if intermediate_airports else 0,
+                'max_distance_from_path': max([a.distance_from_path for a in intermediate_airports]) if intermediate_airports else 0,
+                'min_distance_from_path': min([a.distance_from_path for a in intermediate_airports]) if intermediate_airports else 0,
                 'average_distance_between_points': round(total_extended_distance / (len(complete_route) - 1), 2) if len(complete_route) > 1 else 0,
                 'route_segments': len(complete_route) - 1
             },
-            'weather_summary': {
-                'total_airports_queried': len(all_icao_codes_within_50nm),
-                'successful_weather_fetches': len([w for w in weather_data.values() if w['status'] == 'success']),
-                'failed_weather_fetches': len([w for w in weather_data.values() if w['status'] == 'error']),
-                'weather_fetch_success_rate': round(
-                    len([w for w in weather_data.values() if w['status'] == 'success']) / len(weather_data) * 100, 1
-                ) if weather_data else 0
+            'weather_summary': summarize_weather(weather_data, len(all_icao_codes_within_50nm)),
+            'deadline': {
+                'budget_ms': round(budget_seconds * 1000),
+                'exceeded': deadline.expired(),
+                'timed_out_stations': [icao for icao, w in weather_data.items() if w.status == 'timed_out']
             },
             'received_at': datetime.now().isoformat()
         }
         
-        return jsonify(response_data)
+        if digest_budget:
+            with metrics.stage_timer('digest'):
+                # Route order, so the endpoints are first and last and the lines read start to finish
+                response_data['weather_digest'] = build_weather_digest(
+                    weather_data, [point.icao for point in complete_route], digest_budget)
+
+        # Hashing every section costs more than serializing the briefing, so only delta clients pay for it
+        if refreshable:
+            with metrics.stage_timer('versions'):
+                versions = briefing_versions(response_data)
+                response_data['briefing_token'] = BRIEFING_TOKENS.issue(versions)
+            if wants_versions:
+                response_data['versions'] = versions
+            previous = BRIEFING_TOKENS.lookup(since) if isinstance(since, str) else since
+            if previous:
+                response_data = {**build_delta(response_data, versions, previous),
+                                 'briefing_token': response_data['briefing_token'],
+                                 **({'versions': versions} if wants_versions else {})}
+                g.response_format = response_format = 'delta'
+            elif since is not None:
+                # Expired or unknown token: the client gets the full briefing and replaces what it has
+                response_data['delta'] = False
+
+        if response_format == 'compact':
+            response_data = compact_briefing(response_data)
+        if fields:
+            response_data = select_fields(response_data, fields)
+
+        with metrics.stage_timer('serialize'):
+            response = json_response(response_data)
+        return response
         
     except Exception as e:
-        print(f"❌ Error processing route: {str(e)}")
+        log.exception("Error processing route")
         return jsonify({'error': f'Failed to process route: {str(e)}'}), 500
 
+@app.route('/api/pireps', methods=['POST'])
+def receive_pireps():
+    """API endpoint to feed raw PIREPs into the turbulence/icing grid"""
+    payload = request.get_json(silent=True) or {}
+    pireps = payload.get('pireps')
+    if not isinstance(pireps, list):
+        return jsonify({'error': 'Invalid request - pireps list required'}), 400
+
+    accepted, rejected = PIREP_GRID.ingest_many(pireps)
+    log.info("Ingested PIREPs into turbulence grid", extra={'accepted': accepted, 'rejected': rejected})
+    return jsonify({'status': 'success', 'accepted': accepted, 'rejected': rejected})
+
+def current_weather_entries(icao_codes):
+    """weather_data entries from the shared cache, the METAR snapshot, or each station's last stored report"""
+    cached = WEATHER_CACHE.get_many([weather_cache_key(icao_code) for icao_code in icao_codes])
+    snapshot = METAR_SNAPSHOT.fresh()
+    entries = {}
+    for icao_code in icao_codes:
+        entry = cached.get(weather_cache_key(icao_code))
+        report = snapshot.get(icao_code) if entry is None and snapshot is not None else None
+        if report is not None:
+            entry = {**build_weather_entry(icao_code, report['raw'],
+                                           datetime.fromtimestamp(snapshot.loaded_at).isoformat()).to_dict(),
+                     'observed_at': report['observed_at'], 'source': 'snapshot'}
+        if entry is None:
+            stored = WEATHER_STORE.latest(icao_code, 'metar')
+            if stored:
+                entry = build_weather_entry(icao_code, stored['raw'], stored['fetched_at']).to_dict()
+        if entry is not None:
+            entries[icao_code] = entry
+    return entries
+
+@app.route('/api/briefing/stream', methods=['GET'])
+def briefing_updates():
+    """
+    Server-sent events for a briefing's stations (?stations=KLAX,KSFO,...):
+    each 'weather' event carries only the stations with a new report, whether
+    it was fetched for that station or arrived in a METAR snapshot.
+    """
+    stations = list(dict.fromkeys(code.strip().upper() for code in request.args.get('stations', '').split(',')
+                                  if code.strip()))
+    if not stations:
+        return jsonify({'error': 'Invalid request - stations list required'}), 400
+    if len(stations) > BRIEFING_STREAM_MAX_STATIONS:
+        return jsonify({'error': f'Too many stations - at most {BRIEFING_STREAM_MAX_STATIONS} per stream'}), 400
+    unknown = [code for code in stations if code not in AIRPORT_DATABASE]
+    if unknown:
+        return jsonify({'error': f"Unknown stations: {', '.join(unknown)}"}), 400
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+    
+    stream = StationUpdateStream.open(STATION_EVENTS, stations, last_event_id,
+                                      current_weather_entries, STATION_DEMAND.record)
+    if stream is None:
+        return jsonify({'error': 'Too many open update streams - retry shortly'}), 503, {'Retry-After': '5'}
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/history/<icao>', methods=['GET'])
+def station_history(icao):
+    """Stored METAR/TAF history for one station, newest first"""
+    kind = request.args.get('kind', 'metar')
+    hours = request.args.get('hours', 24, type=float)
+    return jsonify({
+        'station': icao.upper(),
+        'kind': kind,
+        'reports': WEATHER_STORE.history(icao.upper(), kind, hours=hours)
+    })
+
+@app.route('/api/stations/status', methods=['GET'])
+def station_status():
+    """
+    Flight category for every airport with a current report, in the whole
+    database or a bbox (min_lng,min_lat,max_lng,max_lat). Columnar: category[i]
+    indexes into categories and belongs to stations[i].
+    """
+    bbox = request.args.get('bbox')
+    try:
+        positions = AIRPORT_GRID.query(parse_bbox(bbox)) if bbox else range(len(STATION_CODES))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid bbox - {e}'}), 400
+    
+    categories = station_categories(positions)
+    known = [n for n, category in enumerate(categories) if category >= 0]
+    return json_response({
+        'status': 'success',
+        'categories': FLIGHT_CATEGORIES,
+        'stations': [STATION_CODES[positions[n]] for n in known],
+        'category': [categories[n] for n in known],
+        'unknown': len(categories) - len(known)
+    })
+
+@app.route('/api/tiles/<int:z>/<int:x>/<int:y>', methods=['GET'])
+def map_tile(z, x, y):
+    """Airports and their latest decoded weather in one Web Mercator map tile"""
+    try:
+        bbox = tile_bbox(z, x, y)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid tile - {e}'}), 400
+    return tile_response(('tile', z, x, y), bbox, {'tile': {'z': z, 'x': x, 'y': y}})
+
+@app.route('/api/tiles', methods=['GET'])
+def map_area():
+    """Airports and their latest decoded weather in a bbox (min_lng,min_lat,max_lng,max_lat)"""
+    try:
+        bbox = parse_bbox(request.args.get('bbox', ''))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid bbox - {e}'}), 400
+    # Round so nearby viewports share cache entries
+    bbox = tuple(round(value, 2) for value in bbox)
+    return tile_response(('bbox',) + bbox, bbox, {'bbox': list(bbox)})
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus-style metrics: stage histograms, upstream latency/status by station, cache hit ratios"""
+    return metrics.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'Route Analysis Service (50 NM Filter)'})
+    """Health check endpoint; reports 'degraded' while the upstream circuit breaker is not closed"""
+    health = {'status': 'healthy', 'service': 'Route Analysis Service (50 NM Filter)'}
+    if UPSTREAM_GUARD is not None:
+        health['upstream'] = UPSTREAM_GUARD.snapshot()
+        if health['upstream']['breaker']['state'] != 'closed':
+            health['status'] = 'degraded'
+    if METAR_SNAPSHOT.current is not None:
+        health['metar_snapshot'] = METAR_SNAPSHOT.current.summary()
+    return jsonify(health)
 
 if __name__ == '__main__':
     print(" Starting Route Analysis Service...")
     print(" API available at: http://localhost:5000")
     print("Health check: http://localhost:5000/api/health")
+    print(" Metrics: http://localhost:5000/api/metrics")
     print(" Route endpoint: POST http://localhost:5000/api/generate-briefing")
+    print(" PIREP feed: POST http://localhost:5000/api/pireps")
+    print(" Station categories: GET http://localhost:5000/api/stations/status[?bbox=min_lng,min_lat,max_lng,max_lat]")
+    print(" Map tiles: GET http://localhost:5000/api/tiles/<z>/<x>/<y> or /api/tiles?bbox=...")
+    print(" Briefing updates (SSE): GET http://localhost:5000/api/briefing/stream?stations=KLAX,KSFO")
     print(" Will find airports within 50 NM of flight path")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
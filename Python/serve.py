@@ -0,0 +1,65 @@
+import argparse
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", "4"))
+WEB_BIND = os.environ.get("WEB_BIND", "0.0.0.0:5000")
+# A cold briefing can wait on several sequential 10 s upstream timeouts
+WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", "120"))
+
+
+class BriefingServer(BaseApplication):
+    """
+    Gunicorn running route_weather_service with several worker processes.
+
+    The app is imported once in the master (preload_app) and workers are
+    forked from it, so AIRPORT_DATABASE is loaded once and shared
+    copy-on-write instead of parsed per worker. Weather results are shared
+    through the SQLite-backed WEATHER_CACHE, so a METAR fetched by one
+    worker is served by all of them.
+
+    Briefing update streams each hold a request thread while open, so a
+    worker serves at most WEB_THREADS - BRIEFING_STREAM_RESERVED_THREADS of
+    them and answers further subscriptions with 503 (see briefing_stream).
+    Raise --threads to allow more open streams.
+    """
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from route_weather_service import app
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the route weather service with multiple workers")
+    parser.add_argument("-w", "--workers", type=int, default=WEB_WORKERS)
+    parser.add_argument("-t", "--threads", type=int, default=WEB_THREADS, help="Threads per worker")
+    parser.add_argument("-b", "--bind", default=WEB_BIND)
+    parser.add_argument("--timeout", type=int, default=WEB_TIMEOUT)
+    args = parser.parse_args()
+    # briefing_stream sizes its per-worker stream limit from this
+    os.environ["WEB_THREADS"] = str(args.threads)
+
+    print(f" Starting Route Analysis Service with {args.workers} workers x {args.threads} threads on {args.bind}")
+    BriefingServer({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+        'timeout': args.timeout,
+        'preload_app': True,
+        'accesslog': '-',
+    }).run()
+
+if __name__ == "__main__":
+    main()
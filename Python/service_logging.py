@@ -0,0 +1,145 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()  # "text" or "json"
+# Fraction of per-station debug lines kept; the rest are dropped before they reach the queue
+LOG_STATION_SAMPLE_RATE = float(os.environ.get("LOG_STATION_SAMPLE_RATE", "0.1"))
+
+ROOT_LOGGER = "pilot_brief"
+# Per-station lines (fetch previews, per-airport results) go through this logger so they can be sampled
+STATION_LOGGER = f"{ROOT_LOGGER}.station"
+
+_request_id = contextvars.ContextVar('request_id', default='-')
+_listener = None
+
+# Attributes every LogRecord has; anything else was passed through extra= and is a structured field
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+def get_logger(name):
+    """Logger under the service's namespace, e.g. get_logger('aviation_api')"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def get_station_logger():
+    return logging.getLogger(STATION_LOGGER)
+
+
+def new_request_id(incoming=None):
+    """Set (or generate) the request ID attached to every log line for this request"""
+    request_id = (incoming or uuid.uuid4().hex[:12])[:64]
+    _request_id.set(request_id)
+    return request_id
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of DEBUG records; INFO and above always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED}
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = (f"{datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds')} "
+                f"{record.levelname:<7} [{record.request_id}] {record.name}: {record.getMessage()}")
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': record.request_id,
+            'msg': record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that skips formatting on the caller's thread; the listener
+    thread does all formatting and I/O. The request ID is captured first,
+    because the listener runs outside the request's context.
+    """
+
+    def prepare(self, record):
+        record.request_id = _request_id.get()
+        return record
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, station_sample_rate=LOG_STATION_SAMPLE_RATE, stream=None):
+    """
+    Route the service's loggers through a queue so writes happen on a background thread.
+    Safe to call more than once; later calls only adjust the level and sampling.
+    """
+    global _listener
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    station_logger = logging.getLogger(STATION_LOGGER)
+    station_logger.filters = [f for f in station_logger.filters if not isinstance(f, SamplingFilter)]
+    if station_sample_rate < 1.0:
+        station_logger.addFilter(SamplingFilter(station_sample_rate))
+
+    if _listener is not None:
+        return logger
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_DeferredQueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_stop_listener)
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+    return logger
+
+
+def _stop_listener():
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_listener_after_fork():
+    # Threads don't survive fork(); pre-forked workers need their own listener on the inherited queue
+    global _listener
+    if _listener is None:
+        return
+    _listener = logging.handlers.QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=False)
+    _listener.start()
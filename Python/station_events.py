@@ -0,0 +1,205 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import metrics
+from service_logging import get_logger
+from weather_cache import VAR_DIR
+
+STATION_EVENTS_PATH = os.environ.get("STATION_EVENTS_PATH", os.path.join(VAR_DIR, 'station_events.db'))
+# How often each worker checks for changes published by the others
+STATION_EVENTS_POLL = float(os.environ.get("STATION_EVENTS_POLL", "1"))
+# The change log is only for catching up; older entries are pruned
+STATION_EVENTS_RETENTION = float(os.environ.get("STATION_EVENTS_RETENTION", "3600"))
+_PRUNE_EVERY = 500
+
+PUBLISHED = metrics.Counter('station_events_total', 'Station report changes published, by kind', labels=('kind',))
+metrics.REGISTRY.append(PUBLISHED)
+
+log = get_logger('station_events')
+
+
+def report_digest(raw):
+    """Short stable fingerprint of a report's text"""
+    return hashlib.blake2b(" ".join((raw or "").split()).encode(), digest_size=8).hexdigest()
+
+
+class StationEvents:
+    """
+    Change feed for station reports, shared by every worker through SQLite.
+    publish() records a report only when its text differs from the last one
+    for that station and kind, and gives it the next sequence number, so a
+    station's sequence doubles as its version. publish_many() does the same
+    for a whole METAR snapshot in one transaction. Subscribers in this process
+    are called from one listener thread with each batch of new changes,
+    whichever worker published them.
+    """
+
+    def __init__(self, path=STATION_EVENTS_PATH, poll_interval=STATION_EVENTS_POLL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._subscribers = []
+        self._subscribers_lock = threading.Lock()
+        self._pid = None
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, station TEXT NOT NULL, kind TEXT NOT NULL,"
+            " digest TEXT NOT NULL, published_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS latest ("
+            " station TEXT NOT NULL, kind TEXT NOT NULL, digest TEXT NOT NULL, seq INTEGER NOT NULL,"
+            " observed_at REAL, PRIMARY KEY (station, kind))"
+        )
+        if 'observed_at' not in {row[1] for row in conn.execute("PRAGMA table_info(latest)")}:
+            conn.execute("ALTER TABLE latest ADD COLUMN observed_at REAL")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def publish(self, station, kind, raw, observed_at=None):
+        """Record a report; returns its sequence number, or None if it hasn't changed"""
+        digest = report_digest(raw)
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT digest FROM latest WHERE station = ? AND kind = ?", (station, kind)).fetchone()
+            if row and row[0] == digest:
+                conn.execute("COMMIT")
+                return None
+            seq = conn.execute(
+                "INSERT INTO events (station, kind, digest, published_at) VALUES (?, ?, ?, ?)",
+                (station, kind, digest, now)
+            ).lastrowid
+            conn.execute("INSERT OR REPLACE INTO latest (station, kind, digest, seq, observed_at)"
+                         " VALUES (?, ?, ?, ?, ?)", (station, kind, digest, seq, observed_at))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        PUBLISHED.inc(kind)
+        self._written(conn, 1, now)
+        return seq
+
+    def publish_many(self, kind, reports):
+        """
+        Record a batch of (station, raw, observed_at epoch seconds) reports in
+        one transaction. A report is skipped when its text hasn't changed or
+        it is no newer than the station's latest, so an older snapshot never
+        replaces a report fetched since.
+
+        Returns:
+            list: (station, seq) for every report that was recorded
+        """
+        conn = self._connect()
+        now = time.time()
+        published = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            latest = {station: (digest, observed_at) for station, digest, observed_at in conn.execute(
+                "SELECT station, digest, observed_at FROM latest WHERE kind = ?", (kind,))}
+            for station, raw, observed_at in reports:
+                digest = report_digest(raw)
+                previous = latest.get(station)
+                if previous and (previous[0] == digest or
+                                 (previous[1] is not None and observed_at is not None and observed_at <= previous[1])):
+                    continue
+                seq = conn.execute(
+                    "INSERT INTO events (station, kind, digest, published_at) VALUES (?, ?, ?, ?)",
+                    (station, kind, digest, now)
+                ).lastrowid
+                conn.execute("INSERT OR REPLACE INTO latest (station, kind, digest, seq, observed_at)"
+                             " VALUES (?, ?, ?, ?, ?)", (station, kind, digest, seq, observed_at))
+                published.append((station, seq))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if published:
+            PUBLISHED.inc(kind, amount=len(published))
+            self._written(conn, len(published), now)
+        return published
+
+    def _written(self, conn, count, now):
+        # Prune whenever the write count crosses a multiple of _PRUNE_EVERY
+        before = self._writes
+        self._writes += count
+        if self._writes // _PRUNE_EVERY != before // _PRUNE_EVERY:
+            conn.execute("DELETE FROM events WHERE published_at < ?", (now - STATION_EVENTS_RETENTION,))
+
+    def versions(self, stations):
+        """{station: sequence of its latest change, any kind} for stations that have one"""
+        if not stations:
+            return {}
+        placeholders = ",".join("?" * len(stations))
+        return dict(self._connect().execute(
+            f"SELECT station, MAX(seq) FROM latest WHERE station IN ({placeholders}) GROUP BY station",
+            tuple(stations)
+        ).fetchall())
+
+    def last_seq(self):
+        row = self._connect().execute("SELECT MAX(seq) FROM events").fetchone()
+        return row[0] or 0
+
+    def changes_since(self, seq, limit=1000):
+        """[(seq, station, kind)] published after seq, oldest first"""
+        return self._connect().execute(
+            "SELECT seq, station, kind FROM events WHERE seq > ? ORDER BY seq LIMIT ?", (seq, limit)
+        ).fetchall()
+
+    def subscribe(self, callback):
+        """Call callback(changes) for every batch of new changes; returns a function that unsubscribes"""
+        self.ensure_started()
+        with self._subscribers_lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._subscribers_lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._subscribers_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="station-events", daemon=True).start()
+
+    def _run(self):
+        seq = self.last_seq()
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                with self._subscribers_lock:
+                    subscribers = list(self._subscribers)
+                if not subscribers:
+                    seq = self.last_seq()
+                    continue
+                changes = self.changes_since(seq)
+                if not changes:
+                    continue
+                seq = changes[-1][0]
+                for callback in subscribers:
+                    try:
+                        callback(changes)
+                    except Exception:
+                        log.exception("Station event subscriber failed")
+            except Exception:
+                log.exception("Reading station events failed")
@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from weather_cache import VAR_DIR
+
+STATION_REGISTRY_PATH = os.environ.get("STATION_REGISTRY_PATH", os.path.join(VAR_DIR, 'station_registry.db'))
+# Consecutive no_data results before a station is treated as not reporting
+STATION_SILENT_AFTER = int(os.environ.get("STATION_SILENT_AFTER", "2"))
+# How often each process reloads the registry to pick up other workers' results
+STATION_REGISTRY_REFRESH = float(os.environ.get("STATION_REGISTRY_REFRESH", "30"))
+
+REPORTING = "reporting"
+UNKNOWN = "unknown"
+SILENT = "silent"
+
+# Lower ranks are preferred when choosing corridor airports
+STATUS_RANK = {REPORTING: 0, UNKNOWN: 1, SILENT: 2}
+
+
+def _status(reported, consecutive_no_data):
+    if consecutive_no_data >= STATION_SILENT_AFTER:
+        return SILENT
+    return REPORTING if reported else UNKNOWN
+
+
+class StationRegistry:
+    """
+    Which stations actually issue METARs, learned from fetch results and
+    optionally seeded from a station list. Persisted in SQLite so all
+    workers and restarts share it; reads go to an in-memory snapshot that
+    is reloaded every STATION_REGISTRY_REFRESH seconds.
+    """
+
+    def __init__(self, path=STATION_REGISTRY_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._statuses = {}
+        self._loaded_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stations ("
+            " icao TEXT PRIMARY KEY,"
+            " reported INTEGER NOT NULL DEFAULT 0,"
+            " consecutive_no_data INTEGER NOT NULL DEFAULT 0,"
+            " last_report_at REAL,"
+            " last_no_data_at REAL,"
+            " source TEXT NOT NULL DEFAULT 'learned')"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _reload(self):
+        rows = self._connect().execute("SELECT icao, reported, consecutive_no_data FROM stations").fetchall()
+        self._statuses = {icao: _status(reported, no_data) for icao, reported, no_data in rows}
+        self._loaded_at = time.monotonic()
+
+    def statuses(self):
+        """{icao: 'reporting' | 'silent' | 'unknown'} for every station seen so far"""
+        if time.monotonic() - self._loaded_at > STATION_REGISTRY_REFRESH:
+            with self._lock:
+                if time.monotonic() - self._loaded_at > STATION_REGISTRY_REFRESH:
+                    self._reload()
+        return self._statuses
+
+    def status(self, icao):
+        return self.statuses().get(icao, UNKNOWN)
+
+    def record_report(self, icao):
+        """A METAR came back for this station"""
+        self._connect().execute(
+            "INSERT INTO stations (icao, reported, consecutive_no_data, last_report_at) VALUES (?, 1, 0, ?)"
+            " ON CONFLICT(icao) DO UPDATE SET reported = 1, consecutive_no_data = 0,"
+            " last_report_at = excluded.last_report_at",
+            (icao, time.time())
+        )
+        self._statuses[icao] = REPORTING
+
+    def record_no_data(self, icao):
+        """The upstream answered but had no METAR for this station"""
+        row = self._connect().execute(
+            "INSERT INTO stations (icao, consecutive_no_data, last_no_data_at) VALUES (?, 1, ?)"
+            " ON CONFLICT(icao) DO UPDATE SET consecutive_no_data = consecutive_no_data + 1,"
+            " last_no_data_at = excluded.last_no_data_at"
+            " RETURNING reported, consecutive_no_data",
+            (icao, time.time())
+        ).fetchone()
+        self._statuses[icao] = _status(*row)
+
+    def seed(self, icao_codes, source='seed'):
+        """Mark stations from a published station list as reporting; learned results are kept"""
+        self._connect().executemany(
+            "INSERT INTO stations (icao, reported, source) VALUES (?, 1, ?)"
+            " ON CONFLICT(icao) DO NOTHING",
+            [(icao, source) for icao in icao_codes]
+        )
+        self._reload()
+
+    def counts(self):
+        totals = {REPORTING: 0, UNKNOWN: 0, SILENT: 0}
+        for status in self.statuses().values():
+            totals[status] += 1
+        return totals
+
+
+def read_station_list(path):
+    """
+    ICAO codes from a station list: a JSON array of codes or of objects
+    with an 'icaoId'/'icao' field (aviationweather.gov stations.cache.json),
+    or plain text with the code as the first field of each line.
+    """
+    with open(path) as f:
+        content = f.read()
+    if content.lstrip().startswith('['):
+        codes = []
+        for item in json.loads(content):
+            code = item if isinstance(item, str) else (item.get('icaoId') or item.get('icao'))
+            if code:
+                codes.append(code.upper())
+        return codes
+    return [line.split()[0].upper() for line in content.splitlines()
+            if line.strip() and not line.startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or seed the reporting-station registry")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    seed_parser = subparsers.add_parser("seed", help="Mark stations from a station list as reporting")
+    seed_parser.add_argument("station_list")
+    subparsers.add_parser("status", help="Print station counts by status")
+    args = parser.parse_args()
+
+    registry = StationRegistry()
+    if args.command == "seed":
+        codes = read_station_list(args.station_list)
+        registry.seed(codes)
+        print(f"Seeded {len(codes)} stations from {args.station_list}")
+    print(json.dumps(registry.counts()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import os
+import random
+import threading
+import time
+import zlib
+
+from flask import Flask, request, jsonify, Response, send_file
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'bench_corpus')
+
+app = Flask(__name__)
+
+# Behaviour knobs, set from the command line in main()
+CONFIG = {
+    'latency': ('lognormal', 120.0, 0.6),  # distribution name + parameters, in ms
+    'error_rate': 0.0,      # fraction answered with HTTP 5xx
+    'empty_rate': 0.0,      # fraction answered 200 with an empty body
+    'timeout_rate': 0.0,    # fraction that stalls past the client's 10 s timeout
+    'unknown_stations': 'synthesize',  # or 'empty' to mimic non-reporting stations
+    'seed': None,
+}
+
+_rng = random.Random()
+_stats_lock = threading.Lock()
+_stats = {'requests': 0, 'by_endpoint': {}, 'by_outcome': {}, 'stations_requested': 0}
+
+
+def load_recorded_payloads(name):
+    """
+    Load recorded reports from bench_corpus/<name>.txt keyed by station.
+
+    Returns:
+        dict: ICAO -> raw report line
+    """
+    payloads = {}
+    with open(os.path.join(CORPUS_DIR, f'{name}.txt'), 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            tokens = line.split()
+            while tokens and tokens[0] in ('METAR', 'SPECI', 'TAF', 'AMD', 'COR'):
+                tokens = tokens[1:]
+            if tokens:
+                payloads.setdefault(tokens[0], line)
+    return payloads
+
+
+RECORDED = {
+    'metar': load_recorded_payloads('metar'),
+    'taf': load_recorded_payloads('taf'),
+}
+
+
+def sample_latency_ms():
+    """Draw one response delay from the configured distribution"""
+    kind, *params = CONFIG['latency']
+    if kind == 'fixed':
+        return params[0]
+    if kind == 'uniform':
+        return _rng.uniform(params[0], params[1])
+    if kind == 'exponential':
+        return _rng.expovariate(1.0 / params[0])
+    if kind == 'lognormal':
+        # params: median in ms, sigma of the underlying normal
+        return params[0] * _rng.lognormvariate(0, params[1])
+    raise ValueError(f"Unknown latency distribution: {kind}")
+
+
+def parse_latency_spec(spec):
+    """
+    Parse a latency spec such as "fixed:50", "uniform:20:200",
+    "exponential:80" or "lognormal:120:0.6" (all values in ms).
+    """
+    kind, *values = spec.split(':')
+    expected = {'fixed': 1, 'uniform': 2, 'exponential': 1, 'lognormal': 2}
+    if kind not in expected or len(values) != expected[kind]:
+        raise argparse.ArgumentTypeError(f"Invalid latency spec '{spec}'")
+    return (kind, *[float(v) for v in values])
+
+
+def record(endpoint, outcome, stations):
+    with _stats_lock:
+        _stats['requests'] += 1
+        _stats['stations_requested'] += stations
+        _stats['by_endpoint'][endpoint] = _stats['by_endpoint'].get(endpoint, 0) + 1
+        _stats['by_outcome'][outcome] = _stats['by_outcome'].get(outcome, 0) + 1
+
+
+def report_for(kind, station):
+    recorded = RECORDED[kind].get(station)
+    if recorded:
+        return recorded
+    if CONFIG['unknown_stations'] != 'synthesize' or not RECORDED[kind]:
+        return None
+    # Reuse a recorded report with the station swapped so every airport "reports"
+    template = RECORDED[kind][sorted(RECORDED[kind])[zlib.crc32(station.encode()) % len(RECORDED[kind])]]
+    tokens = template.split()
+    for i, token in enumerate(tokens):
+        if token not in ('METAR', 'SPECI', 'TAF', 'AMD', 'COR'):
+            tokens[i] = station
+            break
+    return " ".join(tokens)
+
+
+def serve(kind):
+    ids = [s.strip().upper() for s in request.args.get('ids', '').split(',') if s.strip()]
+    time.sleep(sample_latency_ms() / 1000.0)
+
+    roll = _rng.random()
+    if roll < CONFIG['timeout_rate']:
+        record(kind, 'timeout', len(ids))
+        time.sleep(15)
+        return Response("", status=504)
+    roll -= CONFIG['timeout_rate']
+    if roll < CONFIG['error_rate']:
+        record(kind, 'error', len(ids))
+        return Response("upstream error", status=_rng.choice([500, 502, 503]))
+    roll -= CONFIG['error_rate']
+    if roll < CONFIG['empty_rate']:
+        record(kind, 'empty', len(ids))
+        return Response("", status=200, mimetype='text/plain')
+
+    reports = [r for r in (report_for(kind, station) for station in ids) if r]
+    record(kind, 'ok' if reports else 'empty', len(ids))
+    return Response("\n".join(reports), status=200, mimetype='text/plain')
+
+
+@app.route('/api/data/metar', methods=['GET'])
+def metar():
+    return serve('metar')
+
+
+@app.route('/api/data/taf', methods=['GET'])
+def taf():
+    return serve('taf')
+
+
+@app.route('/data/cache/metars.cache.csv.gz', methods=['GET'])
+def metar_cache_dump():
+    # Whole-network dump for metar_snapshot.py; ETag lets the loader skip unchanged files
+    record('metar_cache', 'ok', len(RECORDED['metar']))
+    return send_file(os.path.join(CORPUS_DIR, 'metars.cache.csv.gz'), mimetype='application/x-gzip',
+                     conditional=True, etag=True)
+
+
+@app.route('/stub/stats', methods=['GET'])
+def stats():
+    with _stats_lock:
+        return jsonify({**_stats, 'by_endpoint': dict(_stats['by_endpoint']),
+                        'by_outcome': dict(_stats['by_outcome'])})
+
+
+@app.route('/stub/reset', methods=['POST'])
+def reset():
+    with _stats_lock:
+        _stats.update({'requests': 0, 'by_endpoint': {}, 'by_outcome': {}, 'stations_requested': 0})
+    return jsonify({'status': 'reset'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local aviationweather.gov stand-in for load tests")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--latency", type=parse_latency_spec, default=CONFIG['latency'],
+                        help="fixed:MS | uniform:MIN:MAX | exponential:MEAN | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--empty-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--unknown-stations", choices=['synthesize', 'empty'], default='synthesize')
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    CONFIG.update({
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'empty_rate': args.empty_rate,
+        'timeout_rate': args.timeout_rate,
+        'unknown_stations': args.unknown_stations,
+        'seed': args.seed,
+    })
+    _rng.seed(args.seed)
+
+    print(f" Stub weather server on http://localhost:{args.port}")
+    print(f" Recorded payloads: {len(RECORDED['metar'])} METAR, {len(RECORDED['taf'])} TAF")
+    print(f" Point the service at it with AVIATION_WEATHER_BASE_URL=http://localhost:{args.port}"
+          " (and UPSTREAM_RATE_PER_SECOND=0 to lift the production rate limit)")
+    print(f" METAR dump for the snapshot loader: METAR_SNAPSHOT_URL=http://localhost:{args.port}"
+          "/data/cache/metars.cache.csv.gz METAR_SNAPSHOT_INTERVAL=60")
+    app.run(host='0.0.0.0', port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
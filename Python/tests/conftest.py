@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# The service modules live one directory up and read their paths from the environment at import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PILOT_BRIEF_VAR_DIR", tempfile.mkdtemp(prefix="pilot-brief-tests-"))
+
+
+class Upstream:
+    """A local aviationweather.gov answering /api/data/metar from `reports`; unknown stations get an empty body"""
+
+    def __init__(self):
+        self.reports = {}
+        self.requests = []
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                ids = parse_qs(urlparse(self.path).query).get('ids', [''])[0]
+                upstream.requests.append(ids)
+                body = "\n".join(upstream.reports.get(icao, "") for icao in ids.split(',')).strip().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    import aviation_api
+    server = Upstream()
+    monkeypatch.setattr(aviation_api, 'AVIATION_WEATHER_BASE_URL', server.url)
+    yield server
+    server.server.shutdown()
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    """route_weather_service with its caches, stores and registries empty and private to the test"""
+    import route_weather_service
+    from negative_cache import NegativeCache
+    from pirep_grid import PirepGrid
+    from station_events import StationEvents
+    from station_registry import StationRegistry
+    from weather_cache import SharedCache
+    from weather_store import WeatherStore
+
+    monkeypatch.setattr(route_weather_service, 'WEATHER_CACHE', SharedCache(str(tmp_path / 'cache.db')))
+    monkeypatch.setattr(route_weather_service, 'WEATHER_STORE', WeatherStore(str(tmp_path / 'store.db')))
+    monkeypatch.setattr(route_weather_service, 'STATION_REGISTRY', StationRegistry(str(tmp_path / 'registry.db')))
+    monkeypatch.setattr(route_weather_service, 'NEGATIVE_CACHE', NegativeCache(str(tmp_path / 'negative.db')))
+    monkeypatch.setattr(route_weather_service, 'STATION_EVENTS', StationEvents(str(tmp_path / 'events.db')))
+    monkeypatch.setattr(route_weather_service, 'PIREP_GRID',
+                        PirepGrid(route_weather_service.AIRPORT_DATABASE, path=str(tmp_path / 'pirep_grid.db')))
+    return route_weather_service
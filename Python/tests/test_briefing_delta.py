@@ -0,0 +1,30 @@
+ROUTE = {'routeString': ['KLAX', 'KSFO']}
+
+
+def _brief(service, **options):
+    response = service.app.test_client().post('/api/generate-briefing', json={**ROUTE, **options})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_plain_briefings_skip_versions(upstream, service):
+    briefing = _brief(service)
+    assert 'briefing_token' not in briefing
+    assert 'versions' not in briefing
+
+
+def test_unchanged_refresh_returns_an_empty_delta(upstream, service):
+    upstream.reports['KLAX'] = "KLAX 251953Z 25012KT 10SM FEW020 22/14 A2992"
+    token = _brief(service, delta=True)['briefing_token']
+
+    refresh = _brief(service, since=token)
+    assert refresh['delta'] is True
+    assert refresh['weather_data'] == {}
+    assert refresh['removed_stations'] == []
+    assert refresh['briefing_token'] == token
+
+
+def test_unknown_token_returns_the_full_briefing(upstream, service):
+    briefing = _brief(service, since='not-a-token')
+    assert briefing['delta'] is False
+    assert 'extended_route' in briefing
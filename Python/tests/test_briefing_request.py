@@ -0,0 +1,50 @@
+import pytest
+
+ROUTE = [{'icao': 'KLAX', 'lat': 33.9425, 'lng': -118.4081, 'type': 'departure'},
+         {'icao': 'KSFO', 'lat': 37.619, 'lng': -122.375, 'type': 'destination'}]
+
+
+def _brief(service, **options):
+    return service.app.test_client().post('/api/generate-briefing', json={'route': ROUTE, **options})
+
+
+@pytest.mark.parametrize('deadline_ms', [0, -500, 'nan', 'inf', 'soon', True])
+def test_invalid_deadline_is_a_bad_request(upstream, service, deadline_ms):
+    response = _brief(service, deadlineMs=deadline_ms)
+    assert response.status_code == 400
+    assert 'deadlineMs' in response.get_json()['error']
+
+
+def test_invalid_deadline_header_is_a_bad_request(upstream, service):
+    response = service.app.test_client().post('/api/generate-briefing', json={'route': ROUTE},
+                                              headers={'X-Request-Deadline-Ms': 'NaN'})
+    assert response.status_code == 400
+
+
+def test_deadline_is_accepted(upstream, service):
+    assert _brief(service, deadlineMs=5000).status_code == 200
+
+
+def test_delta_refresh_with_compact_format_is_a_bad_request(upstream, service):
+    response = _brief(service, since='token', format='compact')
+    assert response.status_code == 400
+    assert 'compact' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('since', [{'stations': 'x'}, {'stations': {'KLAX': 1}}, {'sections': ['route']}])
+def test_malformed_versions_are_a_bad_request(upstream, service, since):
+    response = _brief(service, since=since)
+    assert response.status_code == 400
+    assert 'since' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('fields', [[1], {'weather_data': True}, 5])
+def test_invalid_fields_are_a_bad_request(upstream, service, fields):
+    response = _brief(service, fields=fields)
+    assert response.status_code == 400
+    assert 'fields' in response.get_json()['error']
+
+
+def test_fields_select_a_subset(upstream, service):
+    body = _brief(service, fields='weather_data,extended_route.total_airports').get_json()
+    assert set(body) == {'status', 'weather_data', 'extended_route'}
@@ -0,0 +1,48 @@
+import time
+
+from negative_cache import NEGATIVE_BACKOFF, NegativeCacheProber
+from station_registry import REPORTING, SILENT, UNKNOWN
+
+
+def test_empty_upstream_body_is_no_data_and_makes_the_station_silent(upstream, service):
+    entry = service.fetch_weather_entry('KLGA')
+    assert entry.status == 'error'
+    assert entry.error_type == 'no_data'
+    assert service.STATION_REGISTRY.status('KLGA') == UNKNOWN
+
+    # The negative-cache prober re-fetches the same way; a second empty answer marks it silent
+    service.fetch_weather_entry('KLGA')
+    assert service.STATION_REGISTRY.status('KLGA') == SILENT
+    assert upstream.requests == ['KLGA', 'KLGA']
+
+
+def test_report_makes_the_station_reporting(upstream, service):
+    upstream.reports['KJFK'] = "KJFK 251951Z 31012KT 10SM FEW250 12/M03 A3012"
+    entry = service.fetch_weather_entry('KJFK')
+    assert entry.status == 'success'
+    assert entry.metar.startswith('KJFK 251951Z')
+    assert service.STATION_REGISTRY.status('KJFK') == REPORTING
+
+
+def test_empty_upstream_body_gets_the_no_data_backoff(upstream, service):
+    started = time.time()
+    service.fetch_weather_entry('KHPN')
+
+    listed = service.NEGATIVE_CACHE.get_many(['KHPN'])['KHPN']
+    assert listed['error_type'] == 'no_data'
+    assert listed['failures'] == 1
+    base, _ = NEGATIVE_BACKOFF['no_data']
+    assert started + base <= listed['retry_at'] <= time.time() + base
+
+
+def test_failed_probe_counts_one_failure(upstream, service):
+    service.fetch_weather_entry('KISP')
+    # Make it due now, as if its backoff had expired
+    service.NEGATIVE_CACHE._connect().execute("UPDATE negative SET retry_at = 0 WHERE icao = 'KISP'")
+
+    prober = NegativeCacheProber(service.NEGATIVE_CACHE, service.fetch_weather_entry)
+    assert prober.probe_due() == 0
+
+    listed = service.NEGATIVE_CACHE.get_many(['KISP'])['KISP']
+    assert listed['failures'] == 2
+    assert upstream.requests == ['KISP', 'KISP']
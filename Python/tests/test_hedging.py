@@ -0,0 +1,31 @@
+import time
+
+from hedging import Hedger, HEDGES
+
+
+def test_only_the_request_counts_toward_the_hedge_delay():
+    hedger = Hedger(enabled=True, min_delay=0)
+    request = hedger.hedged(lambda: time.sleep(0.001))
+
+    def guarded():
+        # Time spent waiting for a rate-limit or concurrency slot before the request goes out
+        time.sleep(0.02)
+        return request()
+
+    for _ in range(30):
+        guarded()
+
+    assert hedger.latency.value() < 0.015
+
+
+def test_hedge_delay_starts_when_the_request_does():
+    hedger = Hedger(enabled=True, min_delay=0, max_ratio=1.0, max_workers=1)
+    request = hedger.hedged(lambda: time.sleep(0.001) or 'ok')
+    for _ in range(30):
+        request()
+
+    # The primary waits behind this in the pool before it is sent
+    hedger._pool().submit(time.sleep, 0.1)
+    sent = HEDGES.value('sent')
+    assert request() == 'ok'
+    assert HEDGES.value('sent') == sent
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+from briefing_records import RoutePoint
+from pirep_grid import PirepGrid
+
+AIRPORTS = {'KDEN': {'lat': 39.8617, 'lng': -104.6731}, 'KORD': {'lat': 41.9786, 'lng': -87.9048}}
+NOW = datetime(2026, 10, 19, 16, 0, tzinfo=timezone.utc)
+ROUTE = [RoutePoint('KDEN', 'Denver', 39.8617, -104.6731, 'departure'),
+         RoutePoint('KORD', 'Chicago', 41.9786, -87.9048, 'destination')]
+
+
+def test_workers_share_the_grid(tmp_path):
+    path = str(tmp_path / 'pirep_grid.db')
+    # Two instances on one file stand in for two gunicorn workers
+    receiving, briefing = PirepGrid(AIRPORTS, path=path), PirepGrid(AIRPORTS, path=path)
+
+    accepted, rejected = receiving.ingest_many([
+        "DEN UA /OV KDEN/TM 1530/FL310/TP B737/TB LGT-MOD",
+        "DEN UA /OV KDEN/TM 1545/FL320/TP A320/TB SEV/IC LGT",
+        "DEN UA /OV NOWHERE/TM 1545/FL320/TP A320/TB SEV",
+    ], now=NOW)
+
+    assert (accepted, rejected) == (2, 1)
+    summary = briefing.summarize_route(ROUTE, now=NOW)
+    assert summary['reports'] == 2
+    assert summary['max_turbulence'] == 'SEV'
+    assert summary['turbulence_counts'] == {'MOD': 1, 'SEV': 1}
+    assert summary['max_icing'] == 'LGT'
+    assert [band['fl_from'] for band in summary['by_flight_level']] == [280, 320]
+
+
+def test_expired_buckets_are_not_summarized(tmp_path):
+    grid = PirepGrid(AIRPORTS, path=str(tmp_path / 'pirep_grid.db'))
+    grid.ingest("DEN UA /OV KDEN/TM 1530/FL310/TP B737/TB MOD", now=NOW)
+
+    later = NOW + timedelta(hours=4)
+    assert grid.summarize_route(ROUTE, now=later)['reports'] == 0
+    grid.expire(now=later)
+    assert grid.summarize_route(ROUTE, now=NOW)['reports'] == 0
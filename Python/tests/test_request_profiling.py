@@ -0,0 +1,29 @@
+import os
+
+import request_profiling
+
+ROUTE = [{'icao': 'KLAX', 'lat': 33.9425, 'lng': -118.4081, 'type': 'departure'},
+         {'icao': 'KSFO', 'lat': 37.619, 'lng': -122.375, 'type': 'destination'}]
+
+
+def _brief(service, headers):
+    return service.app.test_client().post('/api/generate-briefing', json={'route': ROUTE}, headers=headers)
+
+
+def test_profile_stays_in_profile_dir(upstream, service, tmp_path, monkeypatch):
+    monkeypatch.setattr(request_profiling, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(request_profiling, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+
+    response = _brief(service, {'X-Profile': 'secret', 'X-Request-ID': '../../escaped'})
+
+    path = response.headers['X-Profile-Path']
+    assert os.path.dirname(path) == str(tmp_path / 'profiles')
+    assert '..' not in os.path.basename(path) and '/' not in os.path.basename(path)
+    assert not list(tmp_path.glob('escaped*'))
+
+
+def test_wrong_token_is_not_profiled(upstream, service, tmp_path, monkeypatch):
+    monkeypatch.setattr(request_profiling, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(request_profiling, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+
+    assert 'X-Profile-Path' not in _brief(service, {'X-Profile': 'secreT'}).headers
@@ -0,0 +1,16 @@
+from response_encoding import RESPONSE_BYTES
+
+
+def _observed():
+    return sum(int(line.rsplit(' ', 1)[1]) for line in RESPONSE_BYTES.render() if line.startswith(f"{RESPONSE_BYTES.name}_count"))
+
+
+def test_only_briefings_are_measured(upstream, service):
+    client = service.app.test_client()
+    before = _observed()
+    client.get('/api/health', headers={'Accept-Encoding': 'gzip'})
+    client.get('/api/stations/status', headers={'Accept-Encoding': 'gzip'})
+    assert _observed() == before
+
+    client.post('/api/generate-briefing', json={'routeString': ['KLAX', 'KSFO']}, headers={'Accept-Encoding': 'gzip'})
+    assert _observed() == before + 1
@@ -0,0 +1,33 @@
+import pytest
+
+from briefing_records import RoutePoint
+
+
+def _brief(service, route):
+    return service.app.test_client().post('/api/generate-briefing', json={'route': route})
+
+
+def test_null_coordinate_is_a_bad_request(upstream, service):
+    response = _brief(service, [{'icao': 'KLAX', 'lat': 33.9425, 'lng': None},
+                                {'icao': 'KSFO', 'lat': 37.619, 'lng': -122.375}])
+    assert response.status_code == 400
+    assert 'lng' in response.get_json()['error']
+
+
+def test_client_coordinates_are_used(upstream, service):
+    response = _brief(service, [{'icao': 'KLAX', 'lat': 33.9425, 'lng': -118.4081, 'type': 'departure'},
+                                {'icao': 'KSFO', 'lat': 37.619, 'lng': -122.375, 'type': 'destination'}])
+    assert response.status_code == 200
+    assert response.get_json()['original_route']['points'][0]['lng'] == -118.4081
+
+
+@pytest.mark.parametrize('point', [
+    {'icao': 'KLAX', 'lat': 'north', 'lng': -118.4},
+    {'icao': 'KLAX', 'lat': 95, 'lng': -118.4},
+    {'icao': 'KLAX', 'lat': True, 'lng': -118.4},
+    {'lat': 33.9, 'lng': -118.4},
+    'KLAX',
+])
+def test_invalid_points_are_rejected(point):
+    with pytest.raises(ValueError):
+        RoutePoint.from_dict(point)
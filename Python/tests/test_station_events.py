@@ -0,0 +1,38 @@
+import io
+import time
+
+from metar_snapshot import ingest
+from weather_store import observation_time
+
+STATIONS = ('KLAX', 'KSFO', 'KSJC')
+
+
+def _snapshot(*reports):
+    rows = "\n".join(f"{raw},{raw.split()[0]},{observation_time(raw).strftime('%Y-%m-%dT%H:%M:%SZ')}"
+                     for raw in reports)
+    return ingest(io.BytesIO(f"raw_text,station_id,observation_time\n{rows}\n".encode()), STATIONS)
+
+
+def _metar(station, minutes_ago):
+    observed = time.gmtime(time.time() - minutes_ago * 60)
+    return f"{station} {time.strftime('%d%H%MZ', observed)} 25012KT 10SM FEW020 22/14 A2992"
+
+
+def test_snapshot_changes_are_published_and_replace_cached_entries(upstream, service):
+    service.accept_metar('KLAX', _metar('KLAX', 60))
+    service.accept_metar('KSFO', _metar('KSFO', 5))
+    before = service.STATION_EVENTS.versions(STATIONS)
+
+    # KLAX has a newer report; KSFO's is older than the one already fetched; KSJC is new
+    ksjc = _metar('KSJC', 3)
+    service.publish_snapshot_changes(_snapshot(_metar('KLAX', 2), _metar('KSFO', 30), ksjc))
+
+    after = service.STATION_EVENTS.versions(STATIONS)
+    assert after['KLAX'] > before['KLAX']
+    assert after['KSFO'] == before['KSFO']
+    assert 'KSJC' in after
+    cached = service.WEATHER_CACHE.get_many([service.weather_cache_key(icao) for icao in STATIONS])
+    assert set(cached) == {service.weather_cache_key('KSFO')}
+
+    # Loading the same snapshot again publishes nothing
+    assert service.STATION_EVENTS.publish_many('metar', _snapshot(ksjc).station_reports()) == []
@@ -0,0 +1,16 @@
+def test_digest_lists_stations_in_route_order(upstream, service):
+    upstream.reports.update({
+        'KLAX': "KLAX 251953Z 25012KT 10SM FEW020 22/14 A2992",
+        'KSFO': "KSFO 251956Z 29018G26KT 10SM FEW015 17/11 A2995",
+    })
+    response = service.app.test_client().post('/api/generate-briefing',
+                                              json={'routeString': ['KLAX', 'KSFO'], 'digest': True})
+    briefing = response.get_json()
+
+    route_order = [point['icao'] for point in briefing['extended_route']['all_points']]
+    assert len(route_order) > 2, "the route should have intermediate airports"
+    assert route_order[0] == 'KLAX' and route_order[-1] == 'KSFO'
+
+    digest = briefing['weather_digest']
+    assert digest['stations_included'] == route_order
+    assert [line.split()[0] for line in digest['text'].splitlines()] == route_order
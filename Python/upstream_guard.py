@@ -0,0 +1,228 @@
+import collections
+import os
+import threading
+import time
+
+import deadline
+import metrics
+
+# Breaker: judged over the calls in the last window, once there are enough of them
+BREAKER_WINDOW_SECONDS = float(os.environ.get("UPSTREAM_BREAKER_WINDOW", "30"))
+BREAKER_MIN_CALLS = int(os.environ.get("UPSTREAM_BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.environ.get("UPSTREAM_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_RATE = float(os.environ.get("UPSTREAM_BREAKER_SLOW_RATE", "0.5"))
+# A call slower than this counts against the breaker even if it succeeds
+BREAKER_SLOW_SECONDS = float(os.environ.get("UPSTREAM_BREAKER_SLOW_SECONDS", "5"))
+BREAKER_OPEN_SECONDS = float(os.environ.get("UPSTREAM_BREAKER_OPEN_SECONDS", "30"))
+BREAKER_TRIAL_CALLS = int(os.environ.get("UPSTREAM_BREAKER_TRIAL_CALLS", "3"))
+
+# AIMD concurrency limit on in-flight upstream calls
+CONCURRENCY_INITIAL = float(os.environ.get("UPSTREAM_CONCURRENCY_INITIAL", "8"))
+CONCURRENCY_MIN = float(os.environ.get("UPSTREAM_CONCURRENCY_MIN", "1"))
+CONCURRENCY_MAX = float(os.environ.get("UPSTREAM_CONCURRENCY_MAX", "32"))
+# Calls slower than this shrink the limit; faster ones grow it
+CONCURRENCY_TARGET_SECONDS = float(os.environ.get("UPSTREAM_CONCURRENCY_TARGET_SECONDS", "2"))
+CONCURRENCY_BACKOFF = 0.5
+# How long a caller waits for a free slot before failing fast
+CONCURRENCY_QUEUE_TIMEOUT = float(os.environ.get("UPSTREAM_QUEUE_TIMEOUT", "2"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+UPSTREAM_REJECTED = metrics.Counter('upstream_rejected_total', 'Upstream calls refused before being sent',
+                                    labels=('reason',))
+BREAKER_TRANSITIONS = metrics.Counter('upstream_breaker_transitions_total', 'Circuit breaker state changes',
+                                      labels=('state',))
+metrics.REGISTRY.extend([UPSTREAM_REJECTED, BREAKER_TRANSITIONS])
+
+
+class UpstreamUnavailable(Exception):
+    """The call was refused locally (breaker open or no concurrency slot) without reaching upstream"""
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass and outcomes are recorded over a sliding window;
+    too many errors or slow calls open it. Open: calls are refused until
+    the cool-down ends. Half-open: a few trial calls go through, and all
+    of them succeeding closes it again while any failure re-opens it.
+    """
+
+    def __init__(self):
+        self.state = CLOSED
+        self.opened_at = None
+        self.open_reason = None
+        self._outcomes = collections.deque()  # (time, failed, slow)
+        self._trials_started = 0
+        self._trials_passed = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state, reason=None):
+        self.state = state
+        self.open_reason = reason
+        self.opened_at = time.monotonic() if state == OPEN else self.opened_at
+        self._outcomes.clear()
+        self._trials_started = self._trials_passed = 0
+        BREAKER_TRANSITIONS.inc(state)
+
+    def allow(self):
+        """Raise UpstreamUnavailable unless a call may go out now"""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = BREAKER_OPEN_SECONDS - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise UpstreamUnavailable('circuit_open', retry_after=remaining)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trials_started >= BREAKER_TRIAL_CALLS:
+                    raise UpstreamUnavailable('circuit_half_open', retry_after=1.0)
+                self._trials_started += 1
+
+    def cancel(self):
+        """Give back a trial slot taken by allow() for a call that never went out"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials_started > 0:
+                self._trials_started -= 1
+
+    def record(self, failed, elapsed):
+        slow = elapsed > BREAKER_SLOW_SECONDS
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN, 'trial call failed')
+                else:
+                    self._trials_passed += 1
+                    if self._trials_passed >= BREAKER_TRIAL_CALLS:
+                        self._transition(CLOSED)
+                return
+            if self.state != CLOSED:
+                return
+
+            now = time.monotonic()
+            self._outcomes.append((now, failed, slow))
+            while self._outcomes and self._outcomes[0][0] < now - BREAKER_WINDOW_SECONDS:
+                self._outcomes.popleft()
+            calls = len(self._outcomes)
+            if calls < BREAKER_MIN_CALLS:
+                return
+            error_rate = sum(1 for _, f, _ in self._outcomes if f) / calls
+            slow_rate = sum(1 for _, _, s in self._outcomes if s) / calls
+            if error_rate >= BREAKER_ERROR_RATE:
+                self._transition(OPEN, f"error rate {error_rate:.0%} over {calls} calls")
+            elif slow_rate >= BREAKER_SLOW_RATE:
+                self._transition(OPEN, f"slow-call rate {slow_rate:.0%} over {calls} calls")
+
+    def snapshot(self):
+        with self._lock:
+            info = {'state': self.state, 'window_calls': len(self._outcomes)}
+            if self.state == OPEN:
+                info['reason'] = self.open_reason
+                info['retry_in_seconds'] = round(
+                    max(0.0, BREAKER_OPEN_SECONDS - (time.monotonic() - self.opened_at)), 1)
+            return info
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on concurrent upstream calls: each fast, successful call adds
+    1/limit (about +1 per limit's worth of calls); a slow or failed call
+    halves it, at most once per target latency so one burst of timeouts
+    doesn't collapse it to the floor.
+    """
+
+    def __init__(self):
+        self.limit = CONCURRENCY_INITIAL
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=CONCURRENCY_QUEUE_TIMEOUT):
+        timeout, truncated = deadline.clamp(timeout)
+        give_up_at = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = give_up_at - time.monotonic()
+                if remaining <= 0:
+                    if truncated:
+                        raise deadline.DeadlineExceeded()
+                    raise UpstreamUnavailable('concurrency_limit', retry_after=CONCURRENCY_TARGET_SECONDS)
+                self._condition.wait(remaining)
+            self.in_flight += 1
+
+    def release(self, failed, elapsed):
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if failed or elapsed > CONCURRENCY_TARGET_SECONDS:
+                if now - self._last_decrease > CONCURRENCY_TARGET_SECONDS:
+                    self.limit = max(CONCURRENCY_MIN, self.limit * CONCURRENCY_BACKOFF)
+                    self._last_decrease = now
+            else:
+                self.limit = min(CONCURRENCY_MAX, self.limit + 1 / self.limit)
+            self._condition.notify()
+
+    def snapshot(self):
+        with self._condition:
+            return {'limit': round(self.limit, 2), 'in_flight': self.in_flight}
+
+
+class UpstreamGuard:
+    """
+    Circuit breaker plus concurrency limit around every upstream call, per
+    worker process, and optionally a rate limiter shared by all workers.
+    Time spent waiting for a rate-limit token is not counted as upstream latency.
+    """
+
+    def __init__(self, rate_limiter=None):
+        self.breaker = CircuitBreaker()
+        self.limiter = AdaptiveLimiter()
+        self.rate_limiter = rate_limiter
+
+    def call(self, func, *args, is_failure, **kwargs):
+        """
+        Run func through the breaker and limiter. is_failure(result, exc)
+        decides whether the outcome counts against the upstream.
+        """
+        try:
+            self.breaker.allow()
+        except UpstreamUnavailable as e:
+            UPSTREAM_REJECTED.inc(e.reason)
+            raise
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            self.limiter.acquire()
+        except UpstreamUnavailable as e:
+            self.breaker.cancel()
+            UPSTREAM_REJECTED.inc(e.reason)
+            raise
+        except deadline.DeadlineExceeded:
+            self.breaker.cancel()
+            UPSTREAM_REJECTED.inc('deadline')
+            raise
+
+        started = time.perf_counter()
+        result = error = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            failed = is_failure(result, error)
+            self.limiter.release(failed, elapsed)
+            self.breaker.record(failed, elapsed)
+
+    def snapshot(self):
+        snapshot = {'breaker': self.breaker.snapshot(), 'concurrency': self.limiter.snapshot()}
+        if self.rate_limiter is not None:
+            snapshot['rate_limit'] = self.rate_limiter.snapshot()
+        return snapshot
@@ -0,0 +1,86 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+VAR_DIR = os.environ.get("PILOT_BRIEF_VAR_DIR", os.path.join(os.path.dirname(__file__), 'var'))
+WEATHER_CACHE_PATH = os.environ.get("WEATHER_CACHE_PATH", os.path.join(VAR_DIR, 'weather_cache.db'))
+# METARs are issued hourly (plus SPECIs); five minutes keeps briefings fresh while absorbing bursts
+WEATHER_CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", "300"))
+
+# Purge expired rows once every this many writes
+_PURGE_EVERY = 500
+
+
+class SharedCache:
+    """
+    Key/value cache with per-entry TTL backed by a local SQLite file in WAL
+    mode, so every worker process on the host reads and writes the same
+    entries. Values are stored as JSON.
+    """
+
+    def __init__(self, path=WEATHER_CACHE_PATH, default_ttl=WEATHER_CACHE_TTL):
+        self.path = path
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # One connection per thread per process; a connection inherited across fork() is unusable
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def get_many(self, keys):
+        """Return {key: value} for every key that is cached and fresh"""
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connect().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({placeholders}) AND expires_at >= ?",
+            (*keys, time.time())
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_many(self, keys):
+        if not keys:
+            return
+        placeholders = ",".join("?" * len(keys))
+        self._connect().execute(f"DELETE FROM cache WHERE key IN ({placeholders})", tuple(keys))
@@ -0,0 +1,117 @@
+import math
+import os
+
+from metar_decode import decode_metar, FLIGHT_CATEGORIES
+
+# Default prompt budget for the station lines (the legend is counted too)
+DIGEST_TOKEN_BUDGET = int(os.environ.get("DIGEST_TOKEN_BUDGET", "600"))
+# Dense codes like "W270/15G25" tokenize worse than prose; 3 chars/token keeps estimates on the safe side
+DIGEST_CHARS_PER_TOKEN = float(os.environ.get("DIGEST_CHARS_PER_TOKEN", "3"))
+
+DIGEST_LEGEND = (
+    "One line per station, route order: STN DDHHMMZ CAT W<dir>/<kt>[G<gust>] V<vis SM> "
+    "<sky cover+base in 100s ft> <wx codes> T<temp>/<dew C> A<altimeter inHg>. "
+    "CAT is VFR/MVFR/IFR/LIFR. NIL = no report."
+)
+
+# Higher sorts first when the budget can't fit every station
+_CATEGORY_RANK = {category: rank for rank, category in enumerate(FLIGHT_CATEGORIES)}
+
+
+def estimate_tokens(text):
+    """Rough LLM token count for a string, biased high"""
+    return math.ceil(len(text) / DIGEST_CHARS_PER_TOKEN)
+
+
+def _visibility(value):
+    if value >= 10:
+        return "10"
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.2f}".rstrip('0')
+
+
+def digest_line(icao_code, weather_entry):
+    """
+    Encode one station as a single fixed-vocabulary line (see DIGEST_LEGEND).
+
+    Returns:
+        tuple: (line, decoded METAR dict or None)
+    """
+    if not weather_entry or weather_entry.status != 'success' or not weather_entry.metar:
+        return f"{icao_code} NIL", None
+
+    decoded = decode_metar(weather_entry.metar)
+    if decoded is None:
+        return f"{icao_code} NIL", None
+
+    parts = [icao_code]
+    if decoded['time']:
+        parts.append(decoded['time'] + "Z")
+    parts.append(decoded['flight_category'])
+    if decoded['wind_kt'] is not None:
+        direction = decoded['wind_dir'] if decoded['wind_dir'] == 'VRB' else f"{decoded['wind_dir']:03d}"
+        wind = f"W{direction}/{decoded['wind_kt']}"
+        if decoded['gust_kt']:
+            wind += f"G{decoded['gust_kt']}"
+        parts.append(wind)
+    if decoded['visibility_sm'] is not None:
+        parts.append("V" + _visibility(decoded['visibility_sm']))
+    for cover, base in decoded['sky']:
+        parts.append(cover if base is None else f"{cover}{base // 100:03d}")
+    parts.extend(decoded['weather'])
+    if decoded['temp_c'] is not None:
+        dew = "" if decoded['dewpoint_c'] is None else decoded['dewpoint_c']
+        parts.append(f"T{decoded['temp_c']}/{dew}")
+    if decoded['altimeter_inhg'] is not None:
+        parts.append(f"A{decoded['altimeter_inhg']:.2f}")
+    return " ".join(parts), decoded
+
+
+def _priority(position, last_position, decoded):
+    """Sort key: route endpoints first, then worst conditions, then route order"""
+    endpoint = position in (0, last_position)
+    rank = _CATEGORY_RANK.get(decoded['flight_category'], 0) if decoded else -1
+    hazard = bool(decoded and (decoded['weather'] or (decoded['gust_kt'] or 0) >= 25))
+    return (not endpoint, -rank, not hazard, position)
+
+
+def build_weather_digest(weather_data, icao_codes, token_budget=DIGEST_TOKEN_BUDGET):
+    """
+    Pack as many stations as fit into token_budget, one dense line each.
+
+    Stations are admitted by priority (departure/destination, then the
+    worst flight category and active weather) and printed in route order,
+    so the model reads the route start to finish.
+
+    Returns:
+        dict: text, legend, stations_included, stations_omitted,
+        estimated_tokens and token_budget
+    """
+    lines = {}
+    ranked = []
+    last_position = len(icao_codes) - 1
+    for position, icao_code in enumerate(icao_codes):
+        line, decoded = digest_line(icao_code, weather_data.get(icao_code))
+        lines[position] = line
+        ranked.append((_priority(position, last_position, decoded), position))
+    ranked.sort()
+
+    used = estimate_tokens(DIGEST_LEGEND)
+    included = set()
+    for _, position in ranked:
+        cost = estimate_tokens(lines[position]) + 1
+        if used + cost > token_budget:
+            continue
+        used += cost
+        included.add(position)
+
+    ordered = sorted(included)
+    return {
+        'text': "\n".join(lines[position] for position in ordered),
+        'legend': DIGEST_LEGEND,
+        'stations_included': [icao_codes[position] for position in ordered],
+        'stations_omitted': [icao_codes[position] for position in range(len(icao_codes)) if position not in included],
+        'estimated_tokens': used,
+        'token_budget': token_budget
+    }
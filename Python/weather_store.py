@@ -0,0 +1,128 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+from weather_cache import VAR_DIR
+
+WEATHER_STORE_PATH = os.environ.get("WEATHER_STORE_PATH", os.path.join(VAR_DIR, 'weather_store.db'))
+# Reports older than this are not loaded back on startup (still kept for history)
+WEATHER_STORE_WARM_MAX_AGE = float(os.environ.get("WEATHER_STORE_WARM_MAX_AGE", "5400"))
+
+REPORT_KINDS = ("metar", "taf")
+
+_OBS_TIME = re.compile(r'\b(\d{2})(\d{2})(\d{2})Z\b')
+
+
+def observation_time(raw, now=None):
+    """
+    Resolve the DDHHMMZ group of a METAR/TAF to a full UTC datetime: the
+    most recent matching day at or before now (allowing a little clock skew).
+
+    Returns:
+        datetime: Observation time, or None if the report has no time group
+    """
+    match = _OBS_TIME.search(raw or "")
+    if not match:
+        return None
+    day, hour, minute = (int(g) for g in match.groups())
+    now = now or datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    for _ in range(3):
+        try:
+            observed = datetime(year, month, day, hour % 24, minute % 60, tzinfo=timezone.utc)
+        except ValueError:
+            observed = None
+        if observed and observed <= now + timedelta(hours=1):
+            return observed
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return None
+
+
+class WeatherStore:
+    """
+    Append-only history of fetched reports in SQLite (WAL mode), keyed by
+    station, kind and observation time and indexed for latest-by-station
+    lookups.
+    """
+
+    def __init__(self, path=WEATHER_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS reports ("
+            " station TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " observed_at TEXT NOT NULL,"
+            " raw TEXT NOT NULL,"
+            " fetched_at TEXT NOT NULL,"
+            " PRIMARY KEY (station, kind, observed_at))"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS reports_latest ON reports (kind, station, observed_at DESC)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def append(self, station, kind, raw, fetched_at=None):
+        """
+        Store a fetched report. Re-fetches of an observation already stored are ignored.
+
+        Returns:
+            bool: True if this observation was new
+        """
+        observed = observation_time(raw)
+        if observed is None:
+            return False
+        fetched_at = fetched_at or datetime.now(timezone.utc).isoformat()
+        cursor = self._connect().execute(
+            "INSERT OR IGNORE INTO reports (station, kind, observed_at, raw, fetched_at) VALUES (?, ?, ?, ?, ?)",
+            (station, kind, observed.isoformat(), raw, fetched_at)
+        )
+        return cursor.rowcount == 1
+
+    def latest(self, station, kind="metar"):
+        """Most recent stored report for a station as a dict, or None"""
+        row = self._connect().execute(
+            "SELECT station, kind, observed_at, raw, fetched_at FROM reports"
+            " WHERE kind = ? AND station = ? ORDER BY observed_at DESC LIMIT 1",
+            (kind, station)
+        ).fetchone()
+        return _row_to_report(row) if row else None
+
+    def latest_all(self, kind="metar", max_age_seconds=None):
+        """Most recent report per station, optionally only those observed within max_age_seconds"""
+        since = ""
+        if max_age_seconds is not None:
+            since = (datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)).isoformat()
+        rows = self._connect().execute(
+            "SELECT station, kind, MAX(observed_at), raw, fetched_at FROM reports"
+            " WHERE kind = ? AND observed_at >= ? GROUP BY station",
+            (kind, since)
+        ).fetchall()
+        return {row[0]: _row_to_report(row) for row in rows}
+
+    def history(self, station, kind="metar", hours=24, limit=200):
+        """Reports for a station observed in the last `hours`, newest first"""
+        since = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+        rows = self._connect().execute(
+            "SELECT station, kind, observed_at, raw, fetched_at FROM reports"
+            " WHERE kind = ? AND station = ? AND observed_at >= ? ORDER BY observed_at DESC LIMIT ?",
+            (kind, station, since, limit)
+        ).fetchall()
+        return [_row_to_report(row) for row in rows]
+
+
+def _row_to_report(row):
+    return {'station': row[0], 'kind': row[1], 'observed_at': row[2], 'raw': row[3], 'fetched_at': row[4]}
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import random
+import time
+from datetime import datetime
+
+import requests
+
+# live:   go straight to the upstream
+# record: go to the upstream and write every request/response to the cassette store
+# replay: answer only from the cassette store, never touching the network
+TRANSPORT_MODE = os.environ.get("AVIATION_API_TRANSPORT", "live").lower()
+CASSETTE_DIR = os.environ.get("AVIATION_API_CASSETTE_DIR",
+                              os.path.join(os.path.dirname(__file__), 'cassettes'))
+# Replay delay: "0" (none), a fixed ms value, "MIN:MAX" ms, or "recorded" to reuse recorded timings
+REPLAY_LATENCY = os.environ.get("AVIATION_API_REPLAY_LATENCY", "0")
+
+TRANSPORT_MODES = ("live", "record", "replay")
+
+if TRANSPORT_MODE not in TRANSPORT_MODES:
+    raise ValueError(f"AVIATION_API_TRANSPORT must be one of {TRANSPORT_MODES}, got '{TRANSPORT_MODE}'")
+
+
+class CassetteMissError(requests.exceptions.RequestException):
+    """Raised in replay mode when no cassette matches the request"""
+
+
+def cassette_key(url, params):
+    """Stable key for a request: the URL path plus its sorted query parameters"""
+    path = url.split("://", 1)[-1].split("/", 1)[-1]
+    canonical = json.dumps({'path': path, 'params': sorted((params or {}).items())})
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def cassette_path(url, params):
+    return os.path.join(CASSETTE_DIR, f"{cassette_key(url, params)}.json")
+
+
+def build_response(url, status_code, text):
+    """Build a requests.Response so callers can use raise_for_status() and .text as usual"""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = url
+    return response
+
+
+def _write_cassette(url, params, elapsed_ms, response=None, error=None):
+    os.makedirs(CASSETTE_DIR, exist_ok=True)
+    cassette = {
+        'request': {'url': url, 'params': params},
+        'recorded_at': datetime.now().isoformat(),
+        'elapsed_ms': round(elapsed_ms, 1),
+    }
+    if response is not None:
+        cassette['response'] = {'status_code': response.status_code, 'text': response.text}
+    else:
+        cassette['error'] = error
+    # Write then rename so a concurrent replay never reads a half-written file
+    path = cassette_path(url, params)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cassette, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _replay_delay(cassette):
+    if REPLAY_LATENCY == "recorded":
+        return cassette.get('elapsed_ms', 0) / 1000.0
+    if ":" in REPLAY_LATENCY:
+        low, high = (float(v) for v in REPLAY_LATENCY.split(":", 1))
+        return random.uniform(low, high) / 1000.0
+    return float(REPLAY_LATENCY) / 1000.0
+
+
+def _live_get(url, params, timeout):
+    return requests.get(url=url, params=params, timeout=timeout)
+
+
+def _record_get(url, params, timeout):
+    started = time.perf_counter()
+    try:
+        response = _live_get(url, params, timeout)
+    except requests.exceptions.Timeout:
+        _write_cassette(url, params, (time.perf_counter() - started) * 1000, error='timeout')
+        raise
+    except requests.exceptions.ConnectionError:
+        _write_cassette(url, params, (time.perf_counter() - started) * 1000, error='connection')
+        raise
+    _write_cassette(url, params, (time.perf_counter() - started) * 1000, response=response)
+    return response
+
+
+def _replay_get(url, params, timeout):
+    path = cassette_path(url, params)
+    try:
+        with open(path, 'r') as f:
+            cassette = json.load(f)
+    except FileNotFoundError:
+        raise CassetteMissError(f"No recorded response in {CASSETTE_DIR}")
+
+    delay = _replay_delay(cassette)
+    if delay:
+        time.sleep(min(delay, timeout))
+
+    error = cassette.get('error')
+    if error == 'timeout':
+        raise requests.exceptions.Timeout("Recorded timeout")
+    if error == 'connection':
+        raise requests.exceptions.ConnectionError("Recorded connection error")
+    recorded = cassette['response']
+    return build_response(url, recorded['status_code'], recorded['text'])
+
+
+_TRANSPORTS = {
+    'live': _live_get,
+    'record': _record_get,
+    'replay': _replay_get,
+}
+
+
+def get(url, params=None, timeout=10):
+    """
+    GET through the configured transport (AVIATION_API_TRANSPORT).
+
+    Args:
+        url (str): Upstream URL
+        params (dict): Query parameters
+        timeout (float): Seconds before giving up
+
+    Returns:
+        requests.Response: Live or replayed response
+    """
+    return _TRANSPORTS[TRANSPORT_MODE](url, params, timeout)
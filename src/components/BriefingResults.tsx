@@ -1,12 +1,12 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Loader2, Eye, EyeOff, Brain, AlertCircle } from 'lucide-react';
-import { generateFlightPathSummary } from '@/utils/geminiApi';
+import { generateFlightPathSummary, WeatherDigest } from '@/utils/geminiApi';
 
 type BriefingStatus = 'initial' | 'loading' | 'success' | 'error';
 
 interface WeatherData {
-  status: 'success' | 'error';
+  status: 'success' | 'error' | 'timed_out';
   metar?: string;
   parsed_metar?: string;
   error?: string;
@@ -19,7 +19,9 @@ interface BriefingResultsProps {
   errorMessage: string | null;
   route: string[];
   weatherData?: { [icao: string]: WeatherData };
+  weatherDigest?: WeatherDigest;
   icaoOrder?: string[]; // Add this to preserve order
+  updatedStations?: string[]; // Stations pushed by the update stream after the summary was made
 }
 
 const BriefingResults: React.FC<BriefingResultsProps> = ({ 
@@ -28,7 +30,9 @@ const BriefingResults: React.FC<BriefingResultsProps> = ({
   errorMessage, 
   route,
   weatherData,
-  icaoOrder
+  weatherDigest,
+  icaoOrder,
+  updatedStations = []
 }) => {
   const sourceIcao = route[0] || 'N/A';
   const destinationIcao = route[route.length - 1] || 'N/A';
@@ -52,18 +56,24 @@ const BriefingResults: React.FC<BriefingResultsProps> = ({
     }));
   };
 
-  // Generate AI summary when weather data is available
+  // Streamed station updates replace weatherData without a new digest; read it
+  // through a ref so they don't trigger another (paid) summary request
+  const weatherDataRef = useRef(weatherData);
+  weatherDataRef.current = weatherData;
+
+  // Generate AI summary when a briefing arrives
   useEffect(() => {
     let isCancelled = false;
     
     const generateAISummary = async () => {
+      const weatherData = weatherDataRef.current;
       if (weatherData && icaoOrder && icaoOrder.length > 0 && status === 'success' && !isGeneratingSummary) {
         console.log('🤖 Starting AI summary generation...');
         setIsGeneratingSummary(true);
         setSummaryError(null);
         
         try {
-          const summary = await generateFlightPathSummary(weatherData, icaoOrder, route);
+          const summary = await generateFlightPathSummary(weatherData, icaoOrder, route, weatherDigest);
           if (!isCancelled) {
             setAiSummary(summary);
             console.log('✅ AI summary generated successfully');
@@ -86,7 +96,7 @@ const BriefingResults: React.FC<BriefingResultsProps> = ({
     return () => {
       isCancelled = true;
     };
-  }, [weatherData, icaoOrder, route, status]);
+  }, [weatherDigest, icaoOrder, route, status]);
 
   return (
     <div className="w-full">
@@ -177,6 +187,11 @@ const BriefingResults: React.FC<BriefingResultsProps> = ({
                     <div className="text-white/90 whitespace-pre-line text-sm leading-relaxed">
                       {aiSummary}
                     </div>
+                    {updatedStations.length > 0 && (
+                      <p className="text-xs text-yellow-200/80 mt-3">
+                        🔄 New reports since this summary: {updatedStations.join(', ')} (see detailed reports)
+                      </p>
+                    )}
                   </div>
                 )}
                 
@@ -231,6 +246,11 @@ const BriefingResults: React.FC<BriefingResultsProps> = ({
                           }`}>
                             {weather.status === 'success' ? '✅ Current' : '❌ Unavailable'}
                           </div>
+                          {updatedStations.includes(icao) && (
+                            <div className="glass-tag text-xs font-medium bg-yellow-400/20 border-yellow-400/30 text-yellow-200">
+                              🔄 Updated
+                            </div>
+                          )}
                         </div>
                       </div>
                       
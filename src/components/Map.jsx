@@ -16,13 +16,93 @@ import airportDatabase from '../data/airports.json';
 // Use imported airport database
 const airportData = airportDatabase;
 
+// Airports with their latest weather, one backend tile at a time
+const WEATHER_TILE_URL = 'http://localhost:5000/api/tiles';
+// Coarser tiles past this zoom; an airport tile at zoom 7 is already a few hundred NM across
+const WEATHER_TILE_MAX_ZOOM = 7;
+const CATEGORY_COLORS = {
+  VFR: '#28A745',
+  MVFR: '#007BFF',
+  IFR: '#DC3545',
+  LIFR: '#C026D3',
+};
+
 const MapComponent = ({ selectedRoute = [], currentInput = '' }) => {
   const mapRef = useRef(null);
   const mapInstanceRef = useRef(null);
   const markersRef = useRef({}); // Store marker references
   const routeLineRef = useRef(null); // Store route line reference
+  const categoryLayerRef = useRef(null); // Flight category dots for all airports
+  const categoryMarkersRef = useRef({}); // ICAO -> flight category dot
   const [mapError, setMapError] = useState(null);
 
+  // Slippy-map tiles covering the current viewport
+  const visibleTiles = (map) => {
+    const zoom = Math.max(0, Math.min(WEATHER_TILE_MAX_ZOOM, Math.floor(map.getZoom())));
+    const count = 2 ** zoom;
+    const bounds = map.getBounds();
+    const clamp = (value) => Math.max(0, Math.min(count - 1, value));
+    const column = (lng) => Math.floor(((lng + 180) / 360) * count);
+    const row = (lat) => {
+      const radians = (Math.max(-85.05, Math.min(85.05, lat)) * Math.PI) / 180;
+      return clamp(Math.floor(((1 - Math.log(Math.tan(radians) + 1 / Math.cos(radians)) / Math.PI) / 2) * count));
+    };
+
+    const tiles = [];
+    for (let x = column(bounds.getWest()); x <= column(bounds.getEast()); x++) {
+      for (let y = row(bounds.getNorth()); y <= row(bounds.getSouth()); y++) {
+        // Wrap columns when the view spans the antimeridian
+        tiles.push({ z: zoom, x: ((x % count) + count) % count, y });
+      }
+    }
+    return tiles;
+  };
+
+  // Color each reporting airport in view by its flight category
+  const loadWeatherTiles = async () => {
+    const map = mapInstanceRef.current;
+    const layer = categoryLayerRef.current;
+    if (!map || !layer) return;
+
+    await Promise.all(visibleTiles(map).map(async ({ z, x, y }) => {
+      try {
+        // The backend sends an ETag per tile, so repeat visits revalidate cheaply
+        const response = await fetch(`${WEATHER_TILE_URL}/${z}/${x}/${y}`);
+        if (!response.ok) return;
+        const data = await response.json();
+
+        data.stations.forEach((station) => {
+          const category = station.weather?.flight_category;
+          const existing = categoryMarkersRef.current[station.icao];
+          if (existing) {
+            layer.removeLayer(existing);
+            delete categoryMarkersRef.current[station.icao];
+          }
+          if (!category) return;
+
+          categoryMarkersRef.current[station.icao] = L.circleMarker([station.lat, station.lng], {
+            radius: 5,
+            color: 'white',
+            weight: 1,
+            fillColor: CATEGORY_COLORS[category],
+            fillOpacity: 0.9,
+          })
+            .bindTooltip(`${station.icao} ${category}`)
+            .bindPopup(`
+              <div>
+                <h3 style="font-weight: bold; margin: 0; color: ${CATEGORY_COLORS[category]};">${station.icao} ${category}</h3>
+                <p style="margin: 5px 0;">${station.name || ''}</p>
+                <p style="font-size: 12px; font-family: monospace; margin: 0;">${station.weather.raw}</p>
+              </div>
+            `)
+            .addTo(layer);
+        });
+      } catch (error) {
+        console.warn(`Could not load weather tile ${z}/${x}/${y}:`, error);
+      }
+    }));
+  };
+
   // Map initialization effect
   useEffect(() => {
     const timer = setTimeout(() => {
@@ -65,11 +145,16 @@ const MapComponent = ({ selectedRoute = [], currentInput = '' }) => {
             })
           };
 
+          // Flight categories from the backend, drawn once the status request returns
+          categoryLayerRef.current = L.layerGroup();
+          overlayLayers["Flight Categories"] = categoryLayerRef.current;
+
           // Add default satellite layer
           baseLayers["Satellite"].addTo(mapInstanceRef.current);
           
           // Add default borders overlay
           overlayLayers["Borders & Places"].addTo(mapInstanceRef.current);
+          categoryLayerRef.current.addTo(mapInstanceRef.current);
 
           // Add layer control - collapsed by default (shows as icon)
           L.control.layers(baseLayers, overlayLayers, {
@@ -78,6 +163,9 @@ const MapComponent = ({ selectedRoute = [], currentInput = '' }) => {
           }).addTo(mapInstanceRef.current);
 
           console.log('✅ Map initialized successfully');
+
+          loadWeatherTiles();
+          mapInstanceRef.current.on('moveend', loadWeatherTiles);
           
           // Force a resize after initialization
           setTimeout(() => {
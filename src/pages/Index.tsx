@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import Header from '@/components/Header';
 import Footer from '@/components/Footer';
 import BriefingForm from '@/components/BriefingForm';
@@ -23,6 +23,9 @@ interface BriefingRequest {
 
 type BriefingStatus = 'initial' | 'loading' | 'success' | 'error';
 
+// Pushes new weather for the briefing's stations as reports come in
+const BRIEFING_STREAM_URL = 'http://localhost:5000/api/briefing/stream';
+
 const Index: React.FC = () => {
   const [briefingStatus, setBriefingStatus] = useState<BriefingStatus>('initial');
   const [briefingSummary, setBriefingSummary] = useState<string | null>(null);
@@ -31,9 +34,32 @@ const Index: React.FC = () => {
   const [currentRoute, setCurrentRoute] = useState<string[]>([]);
   const [routePoints, setRoutePoints] = useState<RoutePoint[]>([]);
   const [icaoOrder, setIcaoOrder] = useState<string[]>([]);
+  // Stations the stream has changed since the briefing (and its AI summary) came in
+  const [updatedStations, setUpdatedStations] = useState<string[]>([]);
   const [isLoading, setIsLoading] = useState(false);
   const [currentInput, setCurrentInput] = useState<string>('');
 
+  // Keep the shown briefing current: merge each pushed station into weather_data.
+  // weather_digest is left as it was, so the AI summary is not regenerated; the
+  // changed stations are marked instead.
+  useEffect(() => {
+    if (briefingStatus !== 'success' || icaoOrder.length === 0) return;
+
+    const source = new EventSource(`${BRIEFING_STREAM_URL}?stations=${icaoOrder.join(',')}`);
+    source.addEventListener('weather', (event) => {
+      const update = JSON.parse((event as MessageEvent).data);
+      setBriefingData((previous: any) => previous && ({
+        ...previous,
+        weather_data: { ...previous.weather_data, ...update.weather_data },
+      }));
+      setUpdatedStations(previous => Array.from(new Set([...previous, ...Object.keys(update.weather_data || {})])));
+    });
+    // EventSource reconnects on its own (with Last-Event-ID); only log here
+    source.onerror = () => console.warn('Briefing update stream interrupted, reconnecting');
+
+    return () => source.close();
+  }, [briefingStatus, icaoOrder]);
+
   const handleRouteChange = (route: string[], inputValue: string, points?: RoutePoint[]) => {
     setCurrentRoute(route);
     setCurrentInput(inputValue);
@@ -55,8 +81,14 @@ const Index: React.FC = () => {
     }));
   };
 
+  // The briefing on screen; re-running the same route only asks for what changed since it
+  const heldBriefing = briefingData;
+
   const handleGenerateBriefing = async (briefingData: BriefingRequest) => {
     try {
+      const sameRoute = heldBriefing?.briefing_token &&
+        JSON.stringify(heldBriefing.original_route?.route_string) === JSON.stringify(briefingData.routeString);
+
       setBriefingStatus('loading');
       setBriefingError(null);
       
@@ -67,14 +99,28 @@ const Index: React.FC = () => {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify(briefingData)
+        // digest: ask the service for the token-budgeted station lines used in the AI summary prompt
+        // delta: ask for a briefing_token, so briefing the same route again returns only what changed
+        body: JSON.stringify({
+          ...briefingData,
+          digest: true,
+          delta: true,
+          ...(sameRoute ? { since: heldBriefing.briefing_token } : {}),
+        })
       });
 
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
+      let data = await response.json();
+
+      // A delta carries only changed stations and sections; fold it into the held briefing
+      if (data.delta) {
+        const weatherData = { ...heldBriefing.weather_data, ...data.weather_data };
+        (data.removed_stations || []).forEach((icao: string) => delete weatherData[icao]);
+        data = { ...heldBriefing, ...data, weather_data: weatherData };
+      }
       
       if (data.status === 'success') {
         // Extract weather data and format it for display
@@ -88,7 +134,7 @@ const Index: React.FC = () => {
           const weather = weatherData[icao];
           if (weather && weather.status === 'success') {
             weatherSummary += `${icao}: ${weather.metar}\n\n`;
-          } else if (weather && weather.status === 'error') {
+          } else if (weather && (weather.status === 'error' || weather.status === 'timed_out')) {
             weatherSummary += `${icao}: Weather data unavailable (${weather.error})\n\n`;
           }
         });
@@ -103,6 +149,7 @@ const Index: React.FC = () => {
         
         setBriefingSummary(weatherSummary);
         setBriefingData(data);
+        setUpdatedStations([]);
         setIcaoOrder(icaoCodes); // Store the order of ICAO codes
         setBriefingStatus('success');
       } else {
@@ -177,7 +224,9 @@ const Index: React.FC = () => {
               errorMessage={briefingError}
               route={currentRoute}
               weatherData={briefingData?.weather_data}
+              weatherDigest={briefingData?.weather_digest}
               icaoOrder={icaoOrder}
+              updatedStations={updatedStations}
             />
           </div>
         </div>
@@ -1,11 +1,21 @@
 interface WeatherData {
-  status: 'success' | 'error';
+  status: 'success' | 'error' | 'timed_out';
   metar?: string;
   parsed_metar?: string;
   error?: string;
   fetched_at: string;
 }
 
+// Token-budgeted station lines from the briefing service (weather_digest.py)
+export interface WeatherDigest {
+  text: string;
+  legend: string;
+  stations_included: string[];
+  stations_omitted: string[];
+  estimated_tokens: number;
+  token_budget: number;
+}
+
 interface GeminiResponse {
   candidates?: Array<{
     content?: {
@@ -245,7 +255,8 @@ ${weatherSummary}
 export async function generateFlightPathSummary(
   weatherData: { [icao: string]: WeatherData },
   icaoOrder: string[],
-  route: string[]
+  route: string[],
+  digest?: WeatherDigest
 ): Promise<string> {
   try {
     // Create a unique key for this request to prevent duplicates
@@ -259,14 +270,17 @@ export async function generateFlightPathSummary(
     
     console.log('🚀 Starting new AI summary request...');
     
-    // Prepare the weather data for the prompt
-    const weatherSummary = icaoOrder.map(icao => {
-      const weather = weatherData[icao];
-      if (weather && weather.status === 'success') {
-        return `${icao}: ${weather.parsed_metar || weather.metar || 'No data'}`;
-      }
-      return `${icao}: Weather data unavailable`;
-    }).join('\n\n');
+    // Prepare the weather data for the prompt: the compact digest when the service sent one,
+    // otherwise the decoded prose per station
+    const weatherSummary = digest && digest.text
+      ? `${digest.legend}\n${digest.text}`
+      : icaoOrder.map(icao => {
+        const weather = weatherData[icao];
+        if (weather && weather.status === 'success') {
+          return `${icao}: ${weather.parsed_metar || weather.metar || 'No data'}`;
+        }
+        return `${icao}: Weather data unavailable`;
+      }).join('\n\n');
 
     const prompt = `
 Flight Route: ${route[0]} → ${route[route.length - 1]}